@@ -1 +1,4 @@
+# NOTE: only registers the names of the sources and protocols, their modules
+# are imported on first use
+from . import sources
 from . import protocols
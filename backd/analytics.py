@@ -0,0 +1,292 @@
+"""Event analytics computed by the database, without replaying the state
+
+Each analysis is a MongoDB aggregation pipeline over the ``events``
+collection. Events are first grouped per block so that the ``blocks``
+collection is only joined once per block when miners or dates are needed.
+Results are streamed to the output one row at a time.
+"""
+
+import csv
+import sys
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, List
+
+from . import db
+from .constants import AMOUNT_FIELDS, BLOCK_KEYS, DATE_FORMATS, LIQUIDATION_KEYS
+
+
+def lookup_blocks() -> List[dict]:
+    """Joins each document, grouped by ``_id.block``, with its block"""
+    return [
+        {
+            "$lookup": {
+                "from": "blocks",
+                "localField": "_id.block",
+                "foreignField": "blockNumber",
+                "as": "block",
+            }
+        },
+        {"$unwind": "$block"},
+    ]
+
+
+def block_key_expression(key: str):
+    """Expression of a key derived from the joined ``block``"""
+    if key == "miner":
+        return {"$toLower": "$block.miner"}
+    milliseconds = {"$multiply": [{"$toLong": "$block.timestamp"}, 1000]}
+    return {
+        "$dateToString": {
+            "format": DATE_FORMATS[key],
+            "date": {"$toDate": milliseconds},
+        }
+    }
+
+
+def liquidations_pipeline(key: str) -> List[dict]:
+    """Counts the liquidations per ``key``, one of ``LIQUIDATION_KEYS``
+    or ``BLOCK_KEYS``
+    """
+    match = {"$match": {"event": "LiquidateBorrow"}}
+    if key in LIQUIDATION_KEYS:
+        return [
+            match,
+            {
+                "$group": {
+                    "_id": {"$toLower": LIQUIDATION_KEYS[key]},
+                    "liquidations": {"$sum": 1},
+                    "first_block": {"$min": "$blockNumber"},
+                    "last_block": {"$max": "$blockNumber"},
+                }
+            },
+            {"$sort": {"liquidations": -1, "_id": 1}},
+        ]
+    if key not in BLOCK_KEYS:
+        raise ValueError(f"cannot group liquidations by {key}")
+    return [
+        match,
+        {"$group": {"_id": {"block": "$blockNumber"}, "liquidations": {"$sum": 1}}},
+        *lookup_blocks(),
+        {
+            "$group": {
+                "_id": block_key_expression(key),
+                "liquidations": {"$sum": "$liquidations"},
+                "first_block": {"$min": "$_id.block"},
+                "last_block": {"$max": "$_id.block"},
+            }
+        },
+        {"$sort": {"_id": 1} if key in DATE_FORMATS else {"liquidations": -1}},
+    ]
+
+
+def amount_expression(events: Iterable[str]) -> dict:
+    """Underlying amount of the ``events``, as a decimal"""
+    branches = [
+        {
+            "case": {"$eq": ["$event", event]},
+            "then": f"$returnValues.{AMOUNT_FIELDS[event]}",
+        }
+        for event in sorted(events)
+    ]
+    return {"$toDecimal": {"$switch": {"branches": branches}}}
+
+
+def volume_pipeline(events: List[str], period: str = "day") -> List[dict]:
+    """Sums the amounts of ``events`` per market and ``period``. Amounts are
+    in the smallest unit of the underlying token of each market
+    """
+    unknown = set(events) - set(AMOUNT_FIELDS)
+    if unknown:
+        raise ValueError(f"no amount known for {', '.join(sorted(unknown))}")
+    return [
+        {"$match": {"event": {"$in": list(events)}}},
+        {
+            "$group": {
+                "_id": {
+                    "block": "$blockNumber",
+                    "event": "$event",
+                    "market": {"$toLower": "$address"},
+                },
+                "count": {"$sum": 1},
+                "amount": {"$sum": amount_expression(events)},
+            }
+        },
+        *lookup_blocks(),
+        {
+            "$group": {
+                "_id": {
+                    "period": block_key_expression(period),
+                    "event": "$_id.event",
+                    "market": "$_id.market",
+                },
+                "count": {"$sum": "$count"},
+                "amount": {"$sum": "$amount"},
+            }
+        },
+        {"$sort": {"_id.period": 1, "_id.event": 1, "_id.market": 1}},
+    ]
+
+
+def liquidator_miner_pipeline(top: int = None) -> List[dict]:
+    """Counts the liquidations of each liquidator in the blocks of each miner,
+    sorted by decreasing number of blocks with liquidations
+    """
+    pipeline = [
+        {"$match": {"event": "LiquidateBorrow"}},
+        {
+            "$group": {
+                "_id": {
+                    "block": "$blockNumber",
+                    "liquidator": {"$toLower": "$returnValues.liquidator"},
+                },
+                "liquidations": {"$sum": 1},
+            }
+        },
+        *lookup_blocks(),
+        {
+            "$group": {
+                "_id": {
+                    "miner": {"$toLower": "$block.miner"},
+                    "liquidator": "$_id.liquidator",
+                },
+                "liquidations": {"$sum": "$liquidations"},
+                "blocks": {"$addToSet": "$_id.block"},
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id.miner",
+                "liquidations": {"$sum": "$liquidations"},
+                "blocks": {"$push": "$blocks"},
+                "liquidators": {
+                    "$push": {
+                        "liquidator": "$_id.liquidator",
+                        "liquidations": "$liquidations",
+                    }
+                },
+            }
+        },
+        {
+            "$addFields": {
+                "blocks": {
+                    "$size": {
+                        "$reduce": {
+                            "input": "$blocks",
+                            "initialValue": [],
+                            "in": {"$setUnion": ["$$value", "$$this"]},
+                        }
+                    }
+                }
+            }
+        },
+        {"$sort": {"blocks": -1, "_id": 1}},
+    ]
+    if top:
+        pipeline.append({"$limit": top})
+    return pipeline
+
+
+def aggregate(pipeline: List[dict], collection: str = "events") -> Iterator[dict]:
+    return db.get_collection(collection).aggregate(pipeline, allowDiskUse=True)
+
+
+def flatten(row: dict) -> dict:
+    """Moves the fields of a compound ``_id`` to the top level of ``row``"""
+    row = dict(row)
+    key = row.pop("_id")
+    if isinstance(key, dict):
+        return {**key, **row}
+    return {"key": key, **row}
+
+
+def top_liquidators(row: dict, n: int = None) -> List[dict]:
+    liquidators = sorted(
+        row["liquidators"], key=lambda v: (-v["liquidations"], v["liquidator"])
+    )
+    return liquidators[:n]
+
+
+def liquidator_miner_rows(rows: Iterable[dict], n: int = None) -> Iterator[dict]:
+    for row in rows:
+        for liquidator in top_liquidators(row, n):
+            yield {
+                "miner": row["_id"],
+                "miner_blocks": row["blocks"],
+                "miner_liquidations": row["liquidations"],
+                "liquidator": liquidator["liquidator"],
+                "liquidations": liquidator["liquidations"],
+            }
+
+
+def format_latex(rows: Iterable[dict], n: int) -> Iterator[str]:
+    """Formats the result of :func:`liquidator_miner_pipeline` as the rows of a
+    LaTeX table with the top ``n`` liquidators of each miner
+    """
+
+    def multirow(string: str) -> str:
+        return r"\multirow{" + str(n) + "}{*}{" + string + "}"
+
+    for row in rows:
+        address = row["_id"]
+        line = (
+            multirow(f"\\contractaddr{{{address}}}")
+            + " & "
+            + multirow(f"{row['blocks']:n}")
+            + " & "
+        )
+        prefix = ""
+        for liquidator in top_liquidators(row, n):
+            line += (
+                f"{prefix}\\contractaddr{{{liquidator['liquidator']}}}"
+                f" & {liquidator['liquidations']:3}\\\\"
+            )
+            yield line
+            line = ""
+            prefix = len(liquidator["liquidator"]) * " " + " & " + " " * 5 + " & "
+        yield r"\hline"
+
+
+@contextmanager
+def open_output(filepath: str = None) -> IO:
+    if filepath is None:
+        yield sys.stdout
+        return
+    with open(filepath, "w") as f:
+        yield f
+
+
+def write_csv(rows: Iterable[dict], fields: List[str], filepath: str = None):
+    with open_output(filepath) as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+
+def analyze_liquidations(args: dict):
+    rows = aggregate(liquidations_pipeline(args["by"]))
+    fields = ["key", "liquidations", "first_block", "last_block"]
+    write_csv(map(flatten, rows), fields, args["output"])
+
+
+def analyze_volume(args: dict):
+    rows = aggregate(volume_pipeline(args["events"], args["period"]))
+    fields = ["period", "event", "market", "count", "amount"]
+    write_csv(map(flatten, rows), fields, args["output"])
+
+
+def analyze_liquidator_miner_correlation(args: dict):
+    rows = aggregate(liquidator_miner_pipeline(args["top"]))
+    if not args["latex"]:
+        fields = [
+            "miner",
+            "miner_blocks",
+            "miner_liquidations",
+            "liquidator",
+            "liquidations",
+        ]
+        write_csv(liquidator_miner_rows(rows, args["n"]), fields, args["output"])
+        return
+    with open_output(args["output"]) as f:
+        for line in format_latex(rows, args["n"]):
+            print(line, file=f)
@@ -1,3 +1,4 @@
+import importlib
 from functools import lru_cache
 
 
@@ -33,7 +34,8 @@ class BaseFactory:
         """
 
         def wrapper(klass):
-            if name in cls._entities:
+            # NOTE: lazily registered entities are replaced once imported
+            if name in cls._entities and not isinstance(cls._entities[name], str):
                 raise ValueError(f"{name} already registered")
             cls._entities[name] = klass
             klass.__registered_name__ = name
@@ -41,6 +43,18 @@ class BaseFactory:
 
         return wrapper
 
+    @classmethod
+    def register_lazy(cls, name: str, path: str):
+        """registers an entity without importing the module defining it,
+        which is only imported the first time the entity is needed
+
+        :param name: name with which the entity should be accessed
+        :param path: ``module:attribute`` path of the entity
+        """
+        if name in cls._entities:
+            raise ValueError(f"{name} already registered")
+        cls._entities[name] = path
+
     @classmethod
     def get(cls, name: str):
         """gets an entity from the factory by named
@@ -51,7 +65,12 @@ class BaseFactory:
         """
         if name not in cls._entities:
             raise ValueError("{0} not registered".format(name))
-        return cls._entities[name]
+        entity = cls._entities[name]
+        if isinstance(entity, str):
+            module_name, attribute = entity.split(":")
+            entity = getattr(importlib.import_module(module_name), attribute)
+            cls._entities[name] = entity
+        return entity
 
     @classproperty
     def registered_name(cls):  # pylint: disable=no-self-argument
@@ -0,0 +1,270 @@
+"""Compact, pre-normalized representation of the events collection
+
+Canonical events are computed once by ``backd canonicalize-events`` so
+that replays do not have to normalize and parse every event again:
+
+* ``_id`` is the position of the event packed by
+  :func:`backd.entities.event_position`, so the natural order of the
+  collection is the replay order
+* ``e`` is a small integer code of the event name, see :class:`EventTypes`
+* ``a`` is the lowercased address of the emitting contract
+* ``v`` are the named return values, with addresses lowercased and numbers
+  parsed, stored as native integers if they fit in 64 bits and as
+  big-endian two's complement bytes otherwise
+* ``h`` is the transaction hash as bytes, the only other field used by hooks
+
+Positional return values, raw logs, block hashes, etc. are dropped.
+"""
+
+from typing import Iterable, Iterator, List, Tuple
+
+import pymongo
+
+from . import constants, db
+from .entities import POSITION_INDEX_MASK, POSITION_INDEX_OFFSET, event_position
+from .logger import logger
+from .normalizer import NORMALIZED_KEY
+
+CANONICAL_COLLECTION = constants.CANONICAL_COLLECTION
+EVENT_TYPES_COLLECTION = "event_types"
+
+DEFAULT_BATCH_SIZE = constants.CANONICAL_BATCH_SIZE
+
+# names of the event fields in canonical documents, see backd.relevance
+EVENT_FIELDS = {"event": "e", "address": "a", "returnValues": "v"}
+
+INT64_MIN = -(2 ** 63)
+INT64_MAX = 2 ** 63 - 1
+
+
+def encode_int(value: int):
+    if INT64_MIN <= value <= INT64_MAX:
+        return value
+    length = (value.bit_length() + 8) // 8
+    return value.to_bytes(length, "big", signed=True)
+
+
+def decode_int(value: bytes) -> int:
+    return int.from_bytes(value, "big", signed=True)
+
+
+def _is_integer(value: str) -> bool:
+    if value.startswith("-"):
+        value = value[1:]
+    return value.isdigit()
+
+
+def encode_value(value):
+    if isinstance(value, str):
+        if value.startswith("0x"):
+            return value.lower()
+        if _is_integer(value):
+            return encode_int(int(value))
+        return value
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return encode_int(value)
+    if isinstance(value, list):
+        return [encode_value(v) for v in value]
+    return value
+
+
+def decode_value(value):
+    if isinstance(value, bytes):
+        return decode_int(value)
+    if isinstance(value, list):
+        return [decode_value(v) for v in value]
+    return value
+
+
+def pack_position(
+    block_number: int, transaction_index: int, log_index: int
+) -> int:
+    return event_position(
+        {
+            "blockNumber": block_number,
+            "transactionIndex": transaction_index,
+            "logIndex": log_index,
+        }
+    )
+
+
+def unpack_position(position: int) -> Tuple[int, int, int]:
+    """Inverse of :func:`backd.entities.event_position`
+
+    :return: a ``(block_number, transaction_index, log_index)`` tuple
+    """
+    return (
+        position >> 32,
+        ((position >> 16) & POSITION_INDEX_MASK) - POSITION_INDEX_OFFSET,
+        (position & POSITION_INDEX_MASK) - POSITION_INDEX_OFFSET,
+    )
+
+
+def block_range_condition(min_block: int = None, max_block: int = None) -> dict:
+    condition = {}
+    if min_block is not None:
+        condition["$gte"] = min_block << 32
+    if max_block is not None:
+        condition["$lt"] = (max_block + 1) << 32
+    return {"_id": condition} if condition else {}
+
+
+class EventTypes:
+    """Two-way mapping between event names and their codes
+
+    :param names: names indexed by code
+    """
+
+    def __init__(self, names: List[str] = None):
+        self.names = list(names or [])
+        self.codes = {name: code for code, name in enumerate(self.names)}
+
+    def get_code(self, name: str) -> int:
+        """Returns the code of ``name``, assigning a new one if needed"""
+        code = self.codes.get(name)
+        if code is None:
+            code = len(self.names)
+            self.names.append(name)
+            self.codes[name] = code
+        return code
+
+    def get_name(self, code: int) -> str:
+        return self.names[code]
+
+    @classmethod
+    def load(cls) -> "EventTypes":
+        rows = db.db[EVENT_TYPES_COLLECTION].find().sort("_id")
+        return cls([row["name"] for row in rows])
+
+    def save(self):
+        collection = db.db[EVENT_TYPES_COLLECTION]
+        for code, name in enumerate(self.names):
+            collection.replace_one({"_id": code}, {"name": name}, upsert=True)
+
+
+def encode_event(event: dict, event_types: EventTypes) -> dict:
+    values = {
+        key: encode_value(value)
+        for key, value in event["returnValues"].items()
+        if not key.isdigit()
+    }
+    document = {
+        "_id": event_position(event),
+        "e": event_types.get_code(event["event"]),
+        "a": event["address"].lower(),
+        "v": values,
+    }
+    if event.get("transactionHash"):
+        document["h"] = bytes.fromhex(event["transactionHash"][2:])
+    return document
+
+
+def decode_event(document: dict, event_types: EventTypes) -> dict:
+    block_number, transaction_index, log_index = unpack_position(document["_id"])
+    values = document["v"]
+    for key, value in values.items():
+        if isinstance(value, (bytes, list)):
+            values[key] = decode_value(value)
+    event = {
+        "event": event_types.get_name(document["e"]),
+        "address": document["a"],
+        "returnValues": values,
+        "blockNumber": block_number,
+        "transactionIndex": transaction_index,
+        "logIndex": log_index,
+        NORMALIZED_KEY: True,
+    }
+    if "h" in document:
+        event["transactionHash"] = "0x" + document["h"].hex()
+    return event
+
+
+def decode_events(
+    documents: Iterable[dict], event_types: EventTypes
+) -> Iterator[dict]:
+    for document in documents:
+        yield decode_event(document, event_types)
+
+
+def encode_events(events: Iterable[dict], event_types: EventTypes) -> Iterator[dict]:
+    """Encodes ``events``, sorted in replay order, skipping the documents
+    that are not events
+
+    :raises ValueError: if two events have the same position, which would
+        make one overwrite the other
+    """
+    last_position = -1
+    for event in events:
+        if "event" not in event:
+            continue
+        document = encode_event(event, event_types)
+        if document["_id"] <= last_position:
+            raise ValueError(
+                f"event at {unpack_position(document['_id'])} is not after "
+                f"the previous one at {unpack_position(last_position)}"
+            )
+        last_position = document["_id"]
+        yield document
+
+
+def canonicalize_events(
+    source: str = "events",
+    target: str = CANONICAL_COLLECTION,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Writes the canonical version of every event of ``source`` into ``target``
+
+    Documents are upserted by position, so the migration can be run again
+    after new events have been added.
+
+    :return: the number of events written
+    :raises ValueError: if the positions of two events collide, or if
+        ``target`` does not end up with as many events as ``source``
+    """
+    event_types = EventTypes.load()
+    projection = {"_id": False, "raw": False}
+    cursor = (
+        db.db[source]
+        .find(projection=projection, no_cursor_timeout=True)
+        .sort(db.SORT_KEY)
+        .batch_size(batch_size)
+    )
+
+    count = 0
+    try:
+        batch: List[pymongo.ReplaceOne] = []
+        for document in encode_events(cursor, event_types):
+            query = {"_id": document["_id"]}
+            batch.append(pymongo.ReplaceOne(query, document, upsert=True))
+            if len(batch) >= batch_size:
+                # save codes first so that written events can always be decoded
+                event_types.save()
+                count += _flush(db.db[target], batch)
+                batch = []
+        event_types.save()
+        if batch:
+            count += _flush(db.db[target], batch)
+    finally:
+        cursor.close()
+    verify_count(source, target)
+    return count
+
+
+def verify_count(source: str = "events", target: str = CANONICAL_COLLECTION):
+    """Checks that ``target`` has exactly one canonical event per event of
+    ``source``
+    """
+    source_count = db.db[source].count_documents({"event": {"$exists": True}})
+    target_count = db.db[target].count_documents({})
+    if source_count != target_count:
+        raise ValueError(
+            f"{target} has {target_count} events but {source} has {source_count}"
+        )
+
+
+def _flush(collection, batch: List[pymongo.ReplaceOne]) -> int:
+    collection.bulk_write(batch, ordered=False)
+    logger.info("canonicalized %s events", len(batch))
+    return len(batch)
@@ -0,0 +1,269 @@
+"""Catalog of the data stored in the database
+
+For each collection, the catalog keeps the block range covered, the number
+of documents per event type and range of ``BUCKET_SIZE`` blocks, the last
+block at which each contract emitted each event, and a data version that
+is increased on every change. This allows to size replays without scanning
+the collections.
+
+The catalog is updated incrementally with :func:`record` as data is
+ingested, or fully recomputed with :func:`rebuild`.
+"""
+
+import datetime as dt
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from . import db
+from .logger import logger
+
+CATALOG_COLLECTION = "catalog"
+BUCKET_SIZE = 100_000
+
+# key used in the buckets of collections without event names
+ALL_KEY = "*"
+
+
+def bucket_start(block: int) -> int:
+    return block - block % BUCKET_SIZE
+
+
+@dataclass
+class CollectionStats:
+    """Catalog entry of a single collection
+
+    :param buckets: number of documents indexed by the start block of their
+        bucket and by event name
+    :param last_blocks: last block at which each address emitted each event
+    """
+
+    collection: str
+    min_block: int = None
+    max_block: int = None
+    count: int = 0
+    buckets: Dict[int, Dict[str, int]] = field(default_factory=dict)
+    last_blocks: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    version: int = 0
+    updated_at: dt.datetime = None
+
+    def add(self, document: dict):
+        block = document["blockNumber"]
+        if self.min_block is None or block < self.min_block:
+            self.min_block = block
+        if self.max_block is None or block > self.max_block:
+            self.max_block = block
+        self.count += 1
+        event = document.get("event", ALL_KEY)
+        bucket = self.buckets.setdefault(bucket_start(block), {})
+        bucket[event] = bucket.get(event, 0) + 1
+        if "address" in document and "event" in document:
+            last_blocks = self.last_blocks.setdefault(event, {})
+            address = document["address"].lower()
+            last_blocks[address] = max(last_blocks.get(address, block), block)
+
+    def count_between(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        events: Set[str] = None,
+        count_range: Callable[[int, int], int] = None,
+    ) -> int:
+        """Counts the documents in the given block range
+
+        Buckets fully inside the range are answered from the catalog and
+        ``count_range(first_block, last_block)`` is called for the part of
+        the buckets only partially inside the range
+
+        :param events: only count these events
+        """
+        total = 0
+        for start, counts in self.buckets.items():
+            end = start + BUCKET_SIZE - 1
+            first = start if min_block is None else max(start, min_block)
+            last = end if max_block is None else min(end, max_block)
+            if first > last:
+                continue
+            if (first == start and last == end) or count_range is None:
+                total += sum(
+                    count
+                    for event, count in counts.items()
+                    if events is None or event in events
+                )
+            else:
+                total += count_range(first, last)
+        return total
+
+    def is_current(self, max_block: Optional[int], count: int) -> bool:
+        """Whether the entry still describes a collection whose last block is
+        ``max_block`` and which holds ``count`` documents
+        """
+        return self.max_block == max_block and self.count == count
+
+    def to_document(self) -> dict:
+        return {
+            "_id": self.collection,
+            "min_block": self.min_block,
+            "max_block": self.max_block,
+            "count": self.count,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+            "last_blocks": self.last_blocks,
+            "version": self.version,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_document(cls, document: dict) -> "CollectionStats":
+        return cls(
+            collection=document["_id"],
+            min_block=document.get("min_block"),
+            max_block=document.get("max_block"),
+            count=document.get("count", 0),
+            buckets={int(k): v for k, v in document.get("buckets", {}).items()},
+            last_blocks=document.get("last_blocks", {}),
+            version=document.get("version", 0),
+            updated_at=document.get("updated_at"),
+        )
+
+
+def load(collection: str) -> Optional[CollectionStats]:
+    document = db.db[CATALOG_COLLECTION].find_one({"_id": collection})
+    if document is None:
+        return None
+    return CollectionStats.from_document(document)
+
+
+def data_version() -> Dict[str, int]:
+    """Returns the version of each collection in the catalog"""
+    rows = db.db[CATALOG_COLLECTION].find(projection={"version": True})
+    return {row["_id"]: row["version"] for row in rows}
+
+
+def record(collection: str, documents: Iterable[dict]):
+    """Adds newly inserted ``documents`` to the catalog of ``collection``"""
+    stats = CollectionStats(collection)
+    for document in documents:
+        stats.add(document)
+    if stats.count == 0:
+        return
+
+    update = {
+        "$inc": {"count": stats.count, "version": 1},
+        "$set": {"updated_at": dt.datetime.now(dt.timezone.utc)},
+        "$min": {"min_block": stats.min_block},
+        "$max": {"max_block": stats.max_block},
+    }
+    for start, counts in stats.buckets.items():
+        for event, count in counts.items():
+            update["$inc"][f"buckets.{start}.{event}"] = count
+    for event, last_blocks in stats.last_blocks.items():
+        for address, block in last_blocks.items():
+            update["$max"][f"last_blocks.{event}.{address}"] = block
+    db.db[CATALOG_COLLECTION].update_one({"_id": collection}, update, upsert=True)
+
+
+def find_max_block(collection: str) -> Optional[int]:
+    """Returns the last block of ``collection``, read from its index"""
+    cursor = db.db[collection].find(projection={"_id": False, "blockNumber": True})
+    rows = list(cursor.sort("blockNumber", -1).limit(1))
+    return rows[0]["blockNumber"] if rows else None
+
+
+def is_stale(stats: CollectionStats) -> bool:
+    """Whether ``stats`` was left behind by a writer bypassing :func:`record`,
+    logs a warning if so
+    """
+    max_block = find_max_block(stats.collection)
+    count = db.db[stats.collection].estimated_document_count()
+    if stats.is_current(max_block, count):
+        return False
+    logger.warning(
+        "catalog of %s is stale (max block %s, %s documents, catalog has "
+        "%s and %s), run `backd catalog --rebuild`",
+        stats.collection,
+        max_block,
+        count,
+        stats.max_block,
+        stats.count,
+    )
+    return True
+
+
+def load_current(collection: str) -> Optional[CollectionStats]:
+    """Returns the catalog of ``collection`` unless it is missing or stale"""
+    stats = load(collection)
+    if stats is None or is_stale(stats):
+        return None
+    return stats
+
+
+def rebuild(collection: str) -> CollectionStats:
+    """Recomputes the catalog of ``collection`` from scratch"""
+    block_offset = {"$mod": ["$blockNumber", BUCKET_SIZE]}
+    bucket_key = {"$subtract": ["$blockNumber", block_offset]}
+    group_key = {"bucket": bucket_key, "event": {"$ifNull": ["$event", ALL_KEY]}}
+    rows = db.db[collection].aggregate(
+        [
+            {"$match": {"blockNumber": {"$exists": True}}},
+            {
+                "$group": {
+                    "_id": group_key,
+                    "count": {"$sum": 1},
+                    "min_block": {"$min": "$blockNumber"},
+                    "max_block": {"$max": "$blockNumber"},
+                }
+            },
+        ],
+        allowDiskUse=True,
+    )
+
+    previous = load(collection)
+    stats = CollectionStats(collection)
+    stats.version = previous.version + 1 if previous else 1
+    stats.updated_at = dt.datetime.now(dt.timezone.utc)
+    for row in rows:
+        bucket = stats.buckets.setdefault(int(row["_id"]["bucket"]), {})
+        bucket[row["_id"]["event"]] = row["count"]
+        stats.count += row["count"]
+        if stats.min_block is None or row["min_block"] < stats.min_block:
+            stats.min_block = row["min_block"]
+        if stats.max_block is None or row["max_block"] > stats.max_block:
+            stats.max_block = row["max_block"]
+
+    if collection == "events":
+        rows = db.db[collection].aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": {
+                            "event": "$event",
+                            "address": {"$toLower": "$address"},
+                        },
+                        "block": {"$max": "$blockNumber"},
+                    }
+                }
+            ],
+            allowDiskUse=True,
+        )
+        for row in rows:
+            if row["_id"].get("event") is None or row["_id"]["address"] == "":
+                continue
+            last_blocks = stats.last_blocks.setdefault(row["_id"]["event"], {})
+            last_blocks[row["_id"]["address"]] = row["block"]
+
+    db.db[CATALOG_COLLECTION].replace_one(
+        {"_id": collection}, stats.to_document(), upsert=True
+    )
+    return stats
+
+
+def rebuild_all(collections: List[str]) -> Dict[str, CollectionStats]:
+    return {collection: rebuild(collection) for collection in collections}
+
+
+def count_by_event(stats: CollectionStats) -> Dict[str, int]:
+    counts = defaultdict(int)
+    for bucket in stats.buckets.values():
+        for event, count in bucket.items():
+            counts[event] += count
+    return dict(counts)
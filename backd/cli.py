@@ -1,8 +1,15 @@
 import argparse
+import csv
 import pickle
-
-from . import executor
-from .db import create_indices
+import sys
+
+# NOTE: the modules running the commands are imported by each ``run_*``
+# function, most of them load the database and numerical libraries
+from . import constants, settings
+from .entities import State
+from .event_source import EventSource
+from .hook import Hook
+from .logger import logger
 from .protocol import Protocol
 
 
@@ -29,20 +36,243 @@ def add_protocol_choice(subparser):
     )
 
 
+def add_source_choice(subparser):
+    subparser.add_argument(
+        "--source",
+        help="where to read the events from, defaults to settings.EVENT_SOURCE",
+        choices=EventSource.registered(),
+    )
+
+
 subparsers = parser.add_subparsers(dest="command")
 
-subparsers.add_parser("create-indices")
+subparsers.add_parser("create-indices", help="alias of indexes")
+
+indexes_parser = subparsers.add_parser(
+    "indexes",
+    help="creates the indexes and checks that no built-in query scans a collection",
+)
+indexes_parser.add_argument(
+    "--no-create", action="store_true", help="only check the query plans"
+)
+indexes_parser.add_argument(
+    "--no-verify", action="store_true", help="only create the indexes"
+)
+indexes_parser.add_argument(
+    "--foreground",
+    action="store_true",
+    help="build the indexes in the foreground, ignored by MongoDB 4.2+",
+)
+add_protocol_choice(indexes_parser)
+
+convert_events_parser = subparsers.add_parser(
+    "convert-events", help="converts the replay collections to Parquet files"
+)
+convert_events_parser.add_argument(
+    "-o", "--output", default=settings.PARQUET_PATH, help="output directory"
+)
+convert_events_parser.add_argument(
+    "--partition-size",
+    type=int,
+    default=constants.PARQUET_PARTITION_SIZE,
+    help="number of blocks per Parquet file",
+)
+convert_events_parser.add_argument(
+    "-c",
+    "--collections",
+    nargs="+",
+    default=constants.REPLAY_COLLECTIONS,
+    choices=constants.REPLAY_COLLECTIONS,
+    help="collections to convert",
+)
+
+catalog_parser = subparsers.add_parser(
+    "catalog", help="shows the catalog of the data stored in the database"
+)
+catalog_parser.add_argument(
+    "--rebuild", action="store_true", help="recompute the catalog from the data"
+)
+catalog_parser.add_argument(
+    "-c",
+    "--collections",
+    nargs="+",
+    default=constants.REPLAY_COLLECTIONS,
+    help="collections to show or rebuild",
+)
+
+ingest_parser = subparsers.add_parser(
+    "ingest", help="loads JSON lines dumps in bulk, skipping already loaded files"
+)
+ingest_parser.add_argument("paths", nargs="+", help="files or directories to load")
+ingest_parser.add_argument(
+    "-c", "--collection", default="events", help="collection where to load data"
+)
+ingest_parser.add_argument(
+    "-w",
+    "--workers",
+    type=int,
+    default=constants.INGEST_WORKERS,
+    help="number of processes loading files",
+)
+ingest_parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=constants.INGEST_BATCH_SIZE,
+    help="number of documents written per bulk operation",
+)
+ingest_parser.add_argument(
+    "--force", action="store_true", help="load files again even if unchanged"
+)
+ingest_parser.add_argument(
+    "--no-indices",
+    action="store_true",
+    help="do not build indices and catalog after loading",
+)
+
+canonicalize_events_parser = subparsers.add_parser(
+    "canonicalize-events",
+    help="writes a slim, pre-normalized copy of the events for replays",
+)
+canonicalize_events_parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=constants.CANONICAL_BATCH_SIZE,
+    help="number of events written per bulk operation",
+)
+canonicalize_events_parser.add_argument(
+    "-o",
+    "--output",
+    default=constants.CANONICAL_COLLECTION,
+    help="collection where to write the canonical events",
+)
+
+record_stream_parser = subparsers.add_parser(
+    "record-stream",
+    help="writes the merged event stream of a protocol to a replay log",
+)
+add_protocol_choice(record_stream_parser)
+add_source_choice(record_stream_parser)
+record_stream_parser.add_argument("--min-block", type=int, help="first block to record")
+record_stream_parser.add_argument("--max-block", type=int, help="last block to record")
+record_stream_parser.add_argument(
+    "--frame-size",
+    type=int,
+    default=constants.REPLAY_LOG_FRAME_SIZE,
+    help="minimum number of events per frame",
+)
+record_stream_parser.add_argument(
+    "-o", "--output", default=settings.REPLAY_LOG_PATH, help="output directory"
+)
 
 process_all_events_parser = subparsers.add_parser("process-all-events")
 add_protocol_choice(process_all_events_parser)
+add_source_choice(process_all_events_parser)
 process_all_events_parser.add_argument(
     "--max-block", type=int, help="block up to which the simulation should run"
 )
 process_all_events_parser.add_argument("--hooks", nargs="+", help="hooks to execute")
+process_all_events_parser.add_argument(
+    "--lazy",
+    action="store_true",
+    help="only fetch and decode the event fields used during the replay",
+)
+process_all_events_parser.add_argument(
+    "--batch-size", type=int, help="number of events fetched per database round trip"
+)
+process_all_events_parser.add_argument(
+    "--prefetch",
+    type=int,
+    help="read each event stream in a background worker with a queue of this depth",
+)
+process_all_events_parser.add_argument(
+    "--markets",
+    nargs="+",
+    type=str.lower,
+    help="only replay the events affecting these markets, implies --relevant-only",
+)
+process_all_events_parser.add_argument(
+    "--relevant-only",
+    action="store_true",
+    help="only fetch the events used by the processor or declared by the hooks",
+)
+process_all_events_parser.add_argument(
+    "--resume",
+    help="state pickle file of an interrupted replay to continue",
+)
+process_all_events_parser.add_argument(
+    "--checkpoint",
+    help="where to save the state if the replay is interrupted by a database error",
+)
 process_all_events_parser.add_argument(
     "-o", "--output", required=True, help="output pickle file"
 )
 
+account_history_parser = subparsers.add_parser(
+    "account-history",
+    help="replays the history of a single account and its markets",
+)
+add_protocol_choice(account_history_parser)
+add_source_choice(account_history_parser)
+account_history_parser.add_argument("address", help="address of the account")
+account_history_parser.add_argument(
+    "--max-block", type=int, help="block up to which the simulation should run"
+)
+account_history_parser.add_argument(
+    "--interval",
+    type=int,
+    help="also record the position every this many blocks, not only on changes",
+)
+account_history_parser.add_argument(
+    "-o", "--output", help="output CSV file, printed to stdout by default"
+)
+
+analyze_parser = subparsers.add_parser(
+    "analyze", help="event analytics computed by the database, without replay"
+)
+analyze_subparsers = analyze_parser.add_subparsers(dest="subcommand")
+
+analyze_liquidations_parser = analyze_subparsers.add_parser(
+    "liquidations", help="counts the liquidations per liquidator, miner, day, etc."
+)
+analyze_liquidations_parser.add_argument(
+    "--by",
+    default="liquidator",
+    choices=list(constants.LIQUIDATION_KEYS) + constants.BLOCK_KEYS,
+    help="how to group the liquidations",
+)
+analyze_liquidations_parser.add_argument("-o", "--output", help="output CSV file")
+
+analyze_volume_parser = analyze_subparsers.add_parser(
+    "volume", help="sums the amounts minted, borrowed, etc. per market over time"
+)
+analyze_volume_parser.add_argument(
+    "-e",
+    "--events",
+    nargs="+",
+    default=["Mint", "Borrow"],
+    choices=sorted(constants.AMOUNT_FIELDS),
+    help="events to sum",
+)
+analyze_volume_parser.add_argument(
+    "--period", default="day", choices=list(constants.DATE_FORMATS)
+)
+analyze_volume_parser.add_argument("-o", "--output", help="output CSV file")
+
+analyze_correlation_parser = analyze_subparsers.add_parser(
+    "liquidator-miner-correlation",
+    help="counts the liquidations of each liquidator in the blocks of each miner",
+)
+analyze_correlation_parser.add_argument(
+    "--top", type=int, default=10, help="number of miners, by blocks with liquidations"
+)
+analyze_correlation_parser.add_argument(
+    "-n", type=int, default=5, help="number of liquidators per miner"
+)
+analyze_correlation_parser.add_argument(
+    "--latex", action="store_true", help="output the rows of a LaTeX table"
+)
+analyze_correlation_parser.add_argument("-o", "--output", help="output file")
+
 
 def add_state_arg(subparser):
     subparser.add_argument("-s", "--state", required=True, help="state pickle file")
@@ -106,6 +336,14 @@ plot_supbow_ratios_time_parser.add_argument(
     help="thresholds to use for plotting",
 )
 
+plot_dsr_apy_parser = plot_subparsers.add_parser(
+    "dsr-apy", help="plots the APY of the DAI Savings Rate over time"
+)
+add_output_arg(plot_dsr_apy_parser)
+plot_dsr_apy_parser.add_argument(
+    "-i", "--interval", default=5760, type=int, help="number of blocks between points"
+)
+
 plot_liquidations_time_parser = plot_subparsers.add_parser(
     "liquidations-over-time",
     help="plots liquidations over time",
@@ -176,17 +414,161 @@ export_borsup_time_parser.add_argument("-t", "--threshold", default=10_000, type
 
 
 def run_create_indices(_args):
+    from .db import create_indices  # pylint: disable=import-outside-toplevel
+
     create_indices()
 
 
+def run_indexes(args):
+    from . import indexes  # pylint: disable=import-outside-toplevel
+
+    if not args["no_create"]:
+        indexes.create_indexes(background=not args["foreground"])
+    if args["no_verify"]:
+        return
+    plans = indexes.verify(indexes.builtin_queries(args["protocol"]))
+    for plan in plans:
+        print(indexes.describe_plan(plan))
+    scanning = indexes.get_scanning_plans(plans)
+    for plan in scanning:
+        logger.error(
+            "%s scans %s: %s",
+            plan.query.name,
+            plan.query.collection,
+            ", ".join(plan.stages),
+        )
+    if scanning:
+        sys.exit(1)
+
+
+def run_convert_events(args):
+    from . import columnar  # pylint: disable=import-outside-toplevel
+
+    for collection in args["collections"]:
+        count = columnar.export_collection(
+            collection, args["output"], partition_size=args["partition_size"]
+        )
+        logger.info("%s: %s rows written", collection, count)
+
+
+def run_catalog(args):
+    from . import catalog  # pylint: disable=import-outside-toplevel
+
+    for collection in args["collections"]:
+        stale = False
+        if args["rebuild"]:
+            stats = catalog.rebuild(collection)
+        else:
+            stats = catalog.load(collection)
+            stale = stats is not None and catalog.is_stale(stats)
+        if stats is None:
+            logger.info("%s: not in the catalog", collection)
+            continue
+        logger.info(
+            "%s: %s rows, blocks %s to %s, version %s%s",
+            collection,
+            stats.count,
+            stats.min_block,
+            stats.max_block,
+            stats.version,
+            " (stale)" if stale else "",
+        )
+
+
+def run_ingest(args):
+    from . import ingest  # pylint: disable=import-outside-toplevel
+
+    count = ingest.ingest(
+        args["paths"],
+        collection=args["collection"],
+        workers=args["workers"],
+        batch_size=args["batch_size"],
+        force=args["force"],
+        build_indices=not args["no_indices"],
+    )
+    logger.info("%s documents inserted into %s", count, args["collection"])
+
+
+def run_canonicalize_events(args):
+    from . import canonical  # pylint: disable=import-outside-toplevel
+
+    count = canonical.canonicalize_events(
+        target=args["output"], batch_size=args["batch_size"]
+    )
+    logger.info("%s events canonicalized", count)
+
+
+def run_record_stream(args):
+    from . import replay_log  # pylint: disable=import-outside-toplevel
+
+    count = replay_log.record_stream(
+        args["protocol"],
+        args["output"],
+        min_block=args["min_block"],
+        max_block=args["max_block"],
+        frame_size=args["frame_size"],
+        source=args["source"],
+    )
+    logger.info("%s events recorded in %s", count, args["output"])
+
+
 def run_process_all_events(args):
+    from . import executor  # pylint: disable=import-outside-toplevel
+
+    state, resume_token = None, None
+    if args["resume"]:
+        state = State.load(args["resume"])
+        resume_token = executor.get_resume_token(state)
+        logger.info("resuming replay after %s", resume_token)
     state = executor.process_all_events(
-        args["protocol"], hooks=args["hooks"], max_block=args["max_block"]
+        args["protocol"],
+        hooks=args["hooks"],
+        max_block=args["max_block"],
+        lazy=args["lazy"],
+        batch_size=args["batch_size"],
+        prefetch=args["prefetch"],
+        markets=args["markets"],
+        relevant_only=args["relevant_only"] or bool(args["markets"]),
+        state=state,
+        resume_token=resume_token,
+        checkpoint=args["checkpoint"],
+        source=args["source"],
     )
     with open(args["output"], "wb") as f:
         pickle.dump(state, f)
 
 
+def run_account_history(args):
+    from . import executor  # pylint: disable=import-outside-toplevel
+
+    hook = Hook.get("account-history")(args["address"], interval=args["interval"])
+    state = executor.process_account_events(
+        args["protocol"],
+        args["address"],
+        hooks=[hook],
+        max_block=args["max_block"],
+        source=args["source"],
+    )
+    fields = ["block", "timestamp", "supply", "collateral", "borrows", "ratio"]
+    output = open(args["output"], "w") if args["output"] else sys.stdout
+    try:
+        writer = csv.DictWriter(output, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(state.extra[hook.extra_key])
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def run_analyze(args):
+    from . import analytics  # pylint: disable=import-outside-toplevel
+
+    if not args["subcommand"]:
+        analyze_parser.error("no subcommand provided")
+    func_name = "analyze_{0}".format(args["subcommand"].replace("-", "_"))
+    getattr(analytics, func_name)(args)
+
+
 def run_plot(args):
     protocol = Protocol.get(args["protocol"])()
     plots = protocol.get_plots()
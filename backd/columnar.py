@@ -0,0 +1,248 @@
+"""Block-range partitioned Parquet storage for the collections used
+during replays
+
+Each collection is stored in its own directory, with one Parquet file
+per range of ``partition_size`` blocks, named ``{start}-{end}.parquet``
+where both bounds are inclusive. Rows are written in replay order, so a
+partition can be streamed back without sorting it again.
+"""
+
+import json
+import os
+from os import path
+from typing import Iterable, Iterator, List, Tuple
+
+from bson import Decimal128
+
+from . import constants, db
+
+# NOTE: pyarrow is slow to import and only loaded once Parquet files are used
+pa = None
+pq = None
+
+
+REPLAY_COLLECTIONS = constants.REPLAY_COLLECTIONS
+DEFAULT_PARTITION_SIZE = constants.PARQUET_PARTITION_SIZE
+
+# fields never read during replays
+DROPPED_FIELDS = {"_id", "raw"}
+
+JSON_COLUMNS_KEY = b"backd.json_columns"
+DECIMAL_COLUMNS_KEY = b"backd.decimal_columns"
+PARTITION_EXTENSION = ".parquet"
+
+
+def _require_pyarrow():
+    global pa, pq  # pylint: disable=global-statement,invalid-name
+    if pq is not None:
+        return
+    try:
+        import pyarrow  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        raise ImportError("pyarrow is required, install backd[parquet]")
+    pa, pq = pyarrow, pyarrow.parquet
+
+
+def partition_filename(start: int, partition_size: int) -> str:
+    end = start + partition_size - 1
+    return f"{start:010d}-{end:010d}{PARTITION_EXTENSION}"
+
+
+def parse_partition_filename(filename: str) -> Tuple[int, int]:
+    start, end = filename[: -len(PARTITION_EXTENSION)].split("-")
+    return int(start), int(end)
+
+
+def list_partitions(
+    directory: str, min_block: int = None, max_block: int = None
+) -> List[Tuple[int, int, str]]:
+    """Lists the partitions of ``directory`` overlapping with the given
+    block range, sorted by block number
+
+    :return: a list of ``(start, end, filepath)`` tuples
+    """
+    if not path.isdir(directory):
+        return []
+    partitions = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(PARTITION_EXTENSION):
+            continue
+        start, end = parse_partition_filename(filename)
+        if min_block is not None and end < min_block:
+            continue
+        if max_block is not None and start > max_block:
+            continue
+        partitions.append((start, end, path.join(directory, filename)))
+    return partitions
+
+
+def _encode_rows(documents: List[dict]):
+    columns = {}
+    json_columns = set()
+    decimal_columns = set()
+    for document in documents:
+        for key, value in document.items():
+            if key in DROPPED_FIELDS:
+                continue
+            if isinstance(value, Decimal128):
+                decimal_columns.add(key)
+            elif isinstance(value, (dict, list)):
+                json_columns.add(key)
+            columns.setdefault(key, None)
+
+    arrays = {}
+    for key in columns:
+        values = [document.get(key) for document in documents]
+        if key in decimal_columns:
+            values = [None if v is None else str(v.to_decimal()) for v in values]
+        elif key in json_columns:
+            values = [None if v is None else json.dumps(v) for v in values]
+        arrays[key] = values
+
+    metadata = {
+        JSON_COLUMNS_KEY: json.dumps(sorted(json_columns)),
+        DECIMAL_COLUMNS_KEY: json.dumps(sorted(decimal_columns)),
+    }
+    return pa.table(arrays).replace_schema_metadata(metadata)
+
+
+def _write_partition(documents: List[dict], directory: str, start: int, size: int):
+    table = _encode_rows(documents)
+    filepath = path.join(directory, partition_filename(start, size))
+    pq.write_table(table, filepath)
+
+
+def write_collection(
+    documents: Iterable[dict],
+    directory: str,
+    partition_size: int = DEFAULT_PARTITION_SIZE,
+) -> int:
+    """Writes ``documents`` into block-range partitions inside ``directory``
+
+    :param documents: documents to write, must be sorted by block number
+    :param directory: directory where to write the partitions
+    :param partition_size: number of blocks contained in each partition
+    :return: the number of documents written
+    """
+    _require_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+
+    count = 0
+    current_partition = None
+    rows = []
+    for document in documents:
+        partition = document["blockNumber"] // partition_size
+        if current_partition is not None and partition != current_partition:
+            if partition < current_partition:
+                raise ValueError("documents must be sorted by block number")
+            start = current_partition * partition_size
+            _write_partition(rows, directory, start, partition_size)
+            rows = []
+        current_partition = partition
+        rows.append(document)
+        count += 1
+    if rows:
+        start = current_partition * partition_size
+        _write_partition(rows, directory, start, partition_size)
+    return count
+
+
+def _block_filters(min_block: int = None, max_block: int = None):
+    filters = []
+    if min_block is not None:
+        filters.append(("blockNumber", ">=", min_block))
+    if max_block is not None:
+        filters.append(("blockNumber", "<=", max_block))
+    return filters or None
+
+
+def _decode_metadata(schema, key: bytes) -> List[str]:
+    metadata = schema.metadata or {}
+    return json.loads(metadata.get(key, b"[]"))
+
+
+def read_collection(
+    directory: str,
+    min_block: int = None,
+    max_block: int = None,
+    columns: List[str] = None,
+    filters: list = None,
+) -> Iterator[dict]:
+    """Streams back the rows written by :func:`write_collection`
+
+    Partitions outside of the block range are never opened and the
+    block range is pushed down to the Parquet reader.
+
+    :param filters: additional pyarrow filters to push down
+    """
+    _require_pyarrow()
+    block_filters = _block_filters(min_block, max_block) or []
+    all_filters = block_filters + (filters or [])
+
+    for _start, _end, filepath in list_partitions(directory, min_block, max_block):
+        # a column only exists in a partition if one of its rows has the field
+        # so filters on a missing column can never match
+        names = pq.read_schema(filepath).names
+        if any(column not in names for column, _op, _value in all_filters):
+            continue
+        table = pq.read_table(filepath, columns=columns, filters=all_filters or None)
+        json_columns = _decode_metadata(table.schema, JSON_COLUMNS_KEY)
+        decimal_columns = _decode_metadata(table.schema, DECIMAL_COLUMNS_KEY)
+        for batch in table.to_batches():
+            for row in batch.to_pylist():
+                yield _decode_row(row, json_columns, decimal_columns)
+
+
+def _decode_row(row: dict, json_columns: List[str], decimal_columns: List[str]):
+    # missing fields are stored as nulls, drop them to match the stored document
+    document = {key: value for key, value in row.items() if value is not None}
+    for key in json_columns:
+        if key in document:
+            document[key] = json.loads(document[key])
+    for key in decimal_columns:
+        if key in document:
+            document[key] = Decimal128(document[key])
+    return document
+
+
+def count_collection(
+    directory: str, min_block: int = None, max_block: int = None
+) -> int:
+    """Counts the rows in the given block range, using only the Parquet
+    metadata for partitions fully included in the range
+    """
+    _require_pyarrow()
+    count = 0
+    for start, end, filepath in list_partitions(directory, min_block, max_block):
+        fully_included = (min_block is None or start >= min_block) and (
+            max_block is None or end <= max_block
+        )
+        if fully_included:
+            count += pq.ParquetFile(filepath).metadata.num_rows
+        else:
+            table = pq.read_table(
+                filepath,
+                columns=["blockNumber"],
+                filters=_block_filters(min_block, max_block),
+            )
+            count += table.num_rows
+    return count
+
+
+def export_collection(
+    collection: str, output_dir: str, partition_size: int = DEFAULT_PARTITION_SIZE
+) -> int:
+    """Exports a MongoDB collection to ``output_dir/collection``"""
+    sort_key = db.SORT_KEY if collection == "events" else "blockNumber"
+    projection = {field: False for field in DROPPED_FIELDS}
+    cursor = (
+        db.db[collection]
+        .find(projection=projection, no_cursor_timeout=True)
+        .sort(sort_key)
+    )
+    try:
+        directory = path.join(output_dir, collection)
+        return write_collection(cursor, directory, partition_size=partition_size)
+    finally:
+        cursor.close()
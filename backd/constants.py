@@ -1,3 +1,5 @@
+import os
+
 TOOL_NAME = "backd"
 LOG_FORMAT = "%(asctime)-15s - %(levelname)s - %(message)s"
 
@@ -8,3 +10,40 @@ DEFAULT_DECIMALS = 10 ** 18
 RAY = 10 ** 27
 
 DAY = 3600 * 24
+
+# NOTE: defaults of the data commands, kept here so that the command-line
+# interface can show them without importing the modules using them
+
+# collections read during replays, exported to Parquet
+REPLAY_COLLECTIONS = ["events", "ds_values", "chi_values", "prices", "blocks", "dsr"]
+PARQUET_PARTITION_SIZE = 100_000
+
+INGEST_BATCH_SIZE = 10_000
+INGEST_WORKERS = os.cpu_count() or 1
+
+CANONICAL_COLLECTION = "canonical_events"
+CANONICAL_BATCH_SIZE = 10_000
+
+# minimum number of events per frame of the replay logs
+REPLAY_LOG_FRAME_SIZE = 1_000
+
+# fields of the events that can be used to group liquidations
+LIQUIDATION_KEYS = {
+    "liquidator": "$returnValues.liquidator",
+    "borrower": "$returnValues.borrower",
+    "market": "$address",
+    "collateral": "$returnValues.cTokenCollateral",
+}
+# keys derived from the block of the events
+BLOCK_KEYS = ["miner", "day", "month"]
+
+DATE_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+
+# underlying amount of the events supported by the volume analysis
+AMOUNT_FIELDS = {
+    "Borrow": "borrowAmount",
+    "LiquidateBorrow": "repayAmount",
+    "Mint": "mintAmount",
+    "Redeem": "redeemAmount",
+    "RepayBorrow": "repayAmount",
+}
@@ -1,10 +1,10 @@
-import datetime as dt
+from typing import Iterable
 
 import pymongo
 from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 
-from . import constants, settings
-from .caching import cache
+from . import settings
 
 SORT_KEY = [
     ("blockNumber", pymongo.ASCENDING),
@@ -12,51 +12,75 @@ SORT_KEY = [
     ("logIndex", pymongo.ASCENDING),
 ]
 
+# fields of the events collection read by the processors
+EVENT_FIELDS = [
+    "event",
+    "address",
+    "returnValues",
+    "blockNumber",
+    "transactionIndex",
+    "logIndex",
+]
 
-client = pymongo.MongoClient(settings.DATABASE_URL)
-db = client.get_database()
 
+_client = None
 
-def create_indices():
-    db.events.create_index("event")
-    db.events.create_index("address")
 
-    db.events.create_index(SORT_KEY, unique=True)
+def get_client() -> pymongo.MongoClient:
+    """Returns the client of ``settings.DATABASE_URL``, created on first use"""
+    global _client  # pylint: disable=global-statement
+    if _client is None:
+        _client = pymongo.MongoClient(settings.DATABASE_URL)
+    return _client
 
-    for key in ["minter", "redeemer", "borrower"]:
-        db.events.create_index(f"returnValues.{key}")
 
-    db.dsr.create_index("blockNumber", unique=True)
+def get_db() -> pymongo.database.Database:
+    return get_client().get_database()
 
-    db.ds_values.create_index("blockNumber", unique=True)
-    db.ds_values.create_index("address")
 
-    db.chi_values.create_index("blockNumber", unique=True)
+def __getattr__(name: str):
+    # NOTE: ``client`` and ``db`` are resolved lazily so that importing
+    # this module does not create a client
+    if name == "client":
+        return get_client()
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    db.blocks.create_index("blockNumber", unique=True)
 
-    db.prices.create_index("blockNumber", unique=True)
+def create_indices(background: bool = True):
+    """Creates the indexes declared in :mod:`backd.indexes`"""
+    from .indexes import create_indexes  # pylint: disable=import-outside-toplevel
 
+    create_indexes(background=background)
 
-def iterate_events():
-    return db.events.find().sort(SORT_KEY)
 
+def get_collection(name: str, raw: bool = False):
+    """Returns the collection called ``name``. If ``raw`` is set,
+    documents are returned as ``RawBSONDocument`` and each document
+    is only decoded when one of its fields is accessed
+    """
+    db = get_db()
+    if not raw:
+        return db[name]
+    options = CodecOptions(document_class=RawBSONDocument)
+    return db.get_collection(name, codec_options=options)
 
-def count_events():
-    return db.events.count_documents({})
+
+def make_projection(fields: Iterable[str]) -> dict:
+    projection = {field: True for field in fields}
+    projection["_id"] = False
+    return projection
 
 
-@cache(constants.DAY)
-def get_block_dates():
-    projection = {"_id": False, "blockNumber": True, "timestamp": True}
-    return {
-        b["blockNumber"]: dt.datetime.fromtimestamp(
-            int(b["timestamp"]), dt.timezone.utc
-        )
-        for b in db.blocks.find(projection=projection)
-    }
+def iterate_events():
+    return get_db().events.find().sort(SORT_KEY)
+
+
+def count_events():
+    return get_db().events.count_documents({})
 
 
 def prices():
     options = CodecOptions(tz_aware=True)
-    return db.get_collection("prices", codec_options=options)
+    return get_db().get_collection("prices", codec_options=options)
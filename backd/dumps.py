@@ -0,0 +1,227 @@
+"""Readers for the raw data dumps loaded by ``scripts/setup-db.sh``
+
+The rows are returned in the same format as the documents stored in the
+database, so that the dumps can be replayed directly, without importing
+them first. The expected layout of the data directory is::
+
+    blocks.csv.gz
+    ethusdt.csv
+    events/**/*.jsonl.gz
+    compound/chi-values.jsonl.gz
+    compound/medianizer-peek-full.jsonl.gz
+
+The last block of each event is computed once and cached in
+``last-blocks.json``, next to the dumps.
+"""
+
+import csv
+import datetime as dt
+import json
+import os
+from array import array
+from decimal import Decimal
+from os import path
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+from bson import Decimal128
+
+from . import ingest, settings, utils
+from .logger import logger
+from .timestamps import NO_BLOCK, BlockTimestamps
+
+EVENTS_DIRECTORY = "events"
+BLOCKS_FILE = "blocks.csv.gz"
+PRICES_FILE = "ethusdt.csv"
+CHI_VALUES_FILE = path.join("compound", "chi-values.jsonl.gz")
+DS_VALUES_FILE = path.join("compound", "medianizer-peek-full.jsonl.gz")
+DS_VALUES_ADDRESS = "0x729D19f657BD0614b4985Cf1D82531c67569197B"
+LAST_BLOCKS_FILE = "last-blocks.json"
+DSR_RATES_FILE = path.join(settings.PROJECT_ROOT, "data", "dsr-rates.json")
+
+# fields never read during replays
+DROPPED_FIELDS = {"_id", "raw"}
+
+
+def list_event_files(data_path: str) -> List[str]:
+    return ingest.list_files([path.join(data_path, EVENTS_DIRECTORY)])
+
+
+def read_json_lines(filepath: str) -> Iterator[dict]:
+    with utils.open_file(filepath) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_events(filepath: str) -> Iterator[dict]:
+    """Reads the events of ``filepath``, expected to be sorted by position"""
+    for event in read_json_lines(filepath):
+        for field in DROPPED_FIELDS:
+            event.pop(field, None)
+        yield event
+
+
+def fingerprint_files(filepaths: Iterable[str]) -> List[list]:
+    """Returns the name, size and modification time of each file"""
+    fingerprint = []
+    for filepath in filepaths:
+        stat = os.stat(filepath)
+        fingerprint.append([path.basename(filepath), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def compute_last_blocks(filepaths: Iterable[str]) -> Dict[str, Dict[str, int]]:
+    """Returns the last block at which each address emitted each event,
+    indexed by event name and lowercased address
+    """
+    last_blocks: Dict[str, Dict[str, int]] = {}
+    for filepath in filepaths:
+        for event in read_json_lines(filepath):
+            if "event" not in event or not event.get("address"):
+                continue
+            by_address = last_blocks.setdefault(event["event"], {})
+            address = event["address"].lower()
+            by_address[address] = max(by_address.get(address, 0), event["blockNumber"])
+    return last_blocks
+
+
+def read_last_blocks(data_path: str) -> Dict[str, Dict[str, int]]:
+    """Returns :func:`compute_last_blocks` for all the events of ``data_path``,
+    cached in ``LAST_BLOCKS_FILE`` until the event files change
+    """
+    filepaths = list_event_files(data_path)
+    fingerprint = fingerprint_files(filepaths)
+    cache_path = path.join(data_path, LAST_BLOCKS_FILE)
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if cached["files"] == fingerprint:
+            return cached["last_blocks"]
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    logger.info("computing the last blocks of the events in %s", data_path)
+    last_blocks = compute_last_blocks(filepaths)
+    try:
+        with open(cache_path, "w") as f:
+            json.dump({"files": fingerprint, "last_blocks": last_blocks}, f)
+    except OSError as e:
+        # NOTE: dumps may be read-only, the next replays compute them again
+        logger.warning("could not cache the last blocks in %s: %s", cache_path, e)
+    return last_blocks
+
+
+def read_int_values(filepath: str, field: str) -> Iterator[dict]:
+    """Reads the results of a contract call, only keeping the rows where
+    the value changed
+    """
+    current_value = None
+    for parsed in read_json_lines(filepath):
+        value = parsed.get("result", parsed.get(field))
+        if not value:
+            raise ValueError(f"invalid format, {field} not found")
+        block = parsed.get("block", parsed.get("blockNumber"))
+        if not block:
+            raise ValueError("invalid format, block number not found")
+        if value != current_value:
+            current_value = value
+            yield {"blockNumber": block, field: Decimal128(Decimal(current_value))}
+
+
+def read_ds_values(filepath: str, address: str) -> Iterator[dict]:
+    """Reads the prices returned by a DSValue ``peek``, only keeping the rows
+    where the price changed
+    """
+    current_price = None
+    for parsed in read_json_lines(filepath):
+        price, is_set = parsed.get("result", [parsed.get("price"), True])
+        if not price:
+            raise ValueError("invalid format, price not found")
+        if not is_set:
+            price = "0"
+        if price != current_price:
+            current_price = price
+            yield {
+                "blockNumber": parsed["block"],
+                "price": Decimal128(Decimal(int(current_price, 16))),
+                "address": address,
+            }
+
+
+def read_blocks(filepath: str) -> Iterator[dict]:
+    with utils.open_file(filepath) as f:
+        for row in csv.DictReader(f):
+            yield {
+                "blockNumber": int(row["blockNumber"]),
+                "timestamp": int(row["timestamp"]),
+            }
+
+
+def read_block_timestamps(filepath: str) -> BlockTimestamps:
+    blocks, timestamps = array("q"), array("q")
+    for row in read_blocks(filepath):
+        blocks.append(row["blockNumber"])
+        timestamps.append(row["timestamp"])
+    blocks = np.frombuffer(blocks, dtype=np.int64)
+    timestamps = np.frombuffer(timestamps, dtype=np.int64)
+    order = np.argsort(blocks, kind="stable")
+    return BlockTimestamps(blocks[order], timestamps[order])
+
+
+def read_prices(filepath: str) -> List[dict]:
+    """Reads the Binance close prices of ``filepath``, sorted by time"""
+    prices = []
+    with utils.open_file(filepath) as f:
+        for row in csv.DictReader(f):
+            close_time = row["close_time"]
+            # workaround %z in strptime
+            if close_time.endswith("+00"):
+                close_time += "00"
+            prices.append(
+                {
+                    "symbol": row["symbol"],
+                    "price": Decimal128(Decimal(row["close"])),
+                    "timestamp": dt.datetime.strptime(
+                        close_time, "%Y-%m-%d %H:%M:%S%z"
+                    ),
+                }
+            )
+    return sorted(prices, key=lambda v: v["timestamp"])
+
+
+def align_prices(prices: List[dict], block_timestamps: BlockTimestamps) -> List[dict]:
+    """Assigns each price to the first block mined at or after its time,
+    keeping the last price of each block
+    """
+    price_timestamps = np.array(
+        [int(p["timestamp"].timestamp()) for p in prices], dtype=np.int64
+    )
+    blocks = block_timestamps.blocks_at(price_timestamps)
+    aligned = {}
+    for price, block in zip(prices, blocks.tolist()):
+        if block == NO_BLOCK:
+            break
+        price["blockNumber"] = block
+        aligned[block] = price
+    return list(aligned.values())
+
+
+def read_dsr_rates(filepath: str = DSR_RATES_FILE) -> List[dict]:
+    return [
+        {"blockNumber": row["blockNumber"], "rate": Decimal(row["rate"])}
+        for row in read_json_lines(filepath)
+    ]
+
+
+def in_block_range(
+    rows: Iterable[dict], min_block: int = None, max_block: int = None
+) -> Iterator[dict]:
+    """Filters the sorted ``rows`` to the given block range"""
+    for row in rows:
+        block = row["blockNumber"]
+        if min_block is not None and block < min_block:
+            continue
+        if max_block is not None and block > max_block:
+            return
+        yield row
@@ -2,16 +2,45 @@ from __future__ import annotations
 
 import datetime as dt
 import pickle
-from collections import defaultdict
+from collections.abc import Mapping
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Dict, Iterator, List, Set, Type, TypeVar
+from typing import Dict, Iterator, List, Optional, Set, Type, TypeVar
 
 from .base_factory import BaseFactory
 
+# offset applied to transaction and log indices so that the negative indices
+# of synthetic events still fit in 16 unsigned bits
+POSITION_INDEX_OFFSET = 2 ** 15
+POSITION_INDEX_MASK = 0xFFFF
+
+INITIAL_BORROW_INDEX = 10 ** 18
+
+
+def event_position(event: dict) -> int:
+    """Packs the position of an event into a single integer with the same
+    ordering as :class:`PointInTime`, to be used as a cheap sort key
+
+    :raises ValueError: if the transaction or log index does not fit in 16 bits
+    """
+    transaction_index = event["transactionIndex"] + POSITION_INDEX_OFFSET
+    log_index = event["logIndex"] + POSITION_INDEX_OFFSET
+    if (
+        not 0 <= transaction_index <= POSITION_INDEX_MASK
+        or not 0 <= log_index <= POSITION_INDEX_MASK
+    ):
+        # NOTE: would spill into the neighbouring field and break the ordering
+        raise ValueError(
+            f"position of event at block {event['blockNumber']} out of range: "
+            f"transaction {event['transactionIndex']}, log {event['logIndex']}"
+        )
+    return (event["blockNumber"] << 32) | (transaction_index << 16) | log_index
+
 
 @dataclass(order=True)
 class PointInTime:
+    __slots__ = ("block_number", "transaction_index", "log_index")
+
     block_number: int
     transaction_index: int
     log_index: int
@@ -24,6 +53,12 @@ class PointInTime:
             log_index=event["logIndex"],
         )
 
+    def update_from_event(self, event: dict):
+        """Moves this point in time to the position of ``event`` in place"""
+        self.block_number = event["blockNumber"]
+        self.transaction_index = event["transactionIndex"]
+        self.log_index = event["logIndex"]
+
 
 @dataclass
 class UserBalances:
@@ -40,7 +75,7 @@ class Balances(UserBalances):
 class MarketUser:
     balances: UserBalances = None
     entered: bool = False
-    borrow_index: int = 10 ** 18
+    borrow_index: int = INITIAL_BORROW_INDEX
 
     def __post_init__(self):
         if self.balances is None:
@@ -50,31 +85,250 @@ class MarketUser:
         return self.balances.total_borrowed * market_index // self.borrow_index
 
 
+class AccountRegistry:
+    """Interns account addresses to dense integer IDs, shared by the
+    :class:`UserTable` of all the markets of a state
+    """
+
+    def __init__(self, addresses: List[str] = None):
+        if addresses is None:
+            addresses = []
+        self.addresses = addresses
+        self.ids: Dict[str, int] = {
+            address: account_id for account_id, address in enumerate(addresses)
+        }
+
+    def intern(self, address: str) -> int:
+        account_id = self.ids.get(address)
+        if account_id is None:
+            account_id = self.ids[address] = len(self.addresses)
+            self.addresses.append(address)
+        return account_id
+
+    def get_id(self, address: str) -> Optional[int]:
+        return self.ids.get(address)
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def __getstate__(self):
+        return {"addresses": self.addresses}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["addresses"])
+
+
+class UserTable(Mapping):
+    """Balances of the users of a market, stored column by column
+
+    A row is allocated the first time a value of a user is written, with
+    :meth:`get_row`. Reads through :meth:`find_row` or the
+    ``market.users[address]`` views never grow the table and return the
+    values of an empty :class:`MarketUser` for unknown users.
+    """
+
+    def __init__(self, accounts: AccountRegistry = None):
+        if accounts is None:
+            accounts = AccountRegistry()
+        self.accounts = accounts
+        # account ID -> row, and row -> account ID
+        self.rows: Dict[int, int] = {}
+        self.row_accounts: List[int] = []
+        # NOTE: lists rather than fixed-width arrays as balances exceed 64 bits
+        self.token_balances: List[int] = []
+        self.total_borrowed: List[int] = []
+        self.borrow_indexes: List[int] = []
+        self.entered = bytearray()
+
+    @classmethod
+    def from_users(
+        cls, users: Dict[str, MarketUser], accounts: AccountRegistry = None
+    ) -> UserTable:
+        table = cls(accounts)
+        for address, user in users.items():
+            row = table.get_row(address)
+            table.token_balances[row] = user.balances.token_balance
+            table.total_borrowed[row] = user.balances.total_borrowed
+            table.borrow_indexes[row] = user.borrow_index
+            table.entered[row] = user.entered
+        return table
+
+    def find_row(self, address: str) -> Optional[int]:
+        account_id = self.accounts.ids.get(address)
+        if account_id is None:
+            return None
+        return self.rows.get(account_id)
+
+    def get_row(self, address: str) -> int:
+        account_id = self.accounts.intern(address)
+        row = self.rows.get(account_id)
+        if row is None:
+            row = self.rows[account_id] = len(self.row_accounts)
+            self.row_accounts.append(account_id)
+            self.token_balances.append(0)
+            self.total_borrowed.append(0)
+            self.borrow_indexes.append(INITIAL_BORROW_INDEX)
+            self.entered.append(0)
+        return row
+
+    def borrowed_at(self, row: int, market_index: int) -> int:
+        return self.total_borrowed[row] * market_index // self.borrow_indexes[row]
+
+    def attach(self, accounts: AccountRegistry):
+        """Moves the rows of the table to the IDs of ``accounts``"""
+        if accounts is self.accounts:
+            return
+        addresses = self.accounts.addresses
+        self.rows = {}
+        for row, account_id in enumerate(self.row_accounts):
+            account_id = accounts.intern(addresses[account_id])
+            self.row_accounts[row] = account_id
+            self.rows[account_id] = row
+        self.accounts = accounts
+
+    def get_address(self, row: int) -> str:
+        return self.accounts.addresses[self.row_accounts[row]]
+
+    def __getitem__(self, address: str) -> MarketUserView:
+        return MarketUserView(self, address)
+
+    def __contains__(self, address) -> bool:
+        return self.find_row(address) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.get_address(row) for row in range(len(self.row_accounts)))
+
+    def __len__(self):
+        return len(self.row_accounts)
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return id(self)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["rows"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.rows = {
+            account_id: row for row, account_id in enumerate(self.row_accounts)
+        }
+
+
+class _RowView:
+    __slots__ = ("table", "address")
+
+    def __init__(self, table: UserTable, address: str):
+        self.table = table
+        self.address = address
+
+    def _read(self, column, default):
+        row = self.table.find_row(self.address)
+        return default if row is None else column[row]
+
+    def _write(self, column, value):
+        column[self.table.get_row(self.address)] = value
+
+
+class UserBalancesView(_RowView):
+    """:class:`UserBalances` of a user, backed by a :class:`UserTable`"""
+
+    __slots__ = ()
+
+    @property
+    def token_balance(self) -> int:
+        return self._read(self.table.token_balances, 0)
+
+    @token_balance.setter
+    def token_balance(self, value: int):
+        self._write(self.table.token_balances, value)
+
+    @property
+    def total_borrowed(self) -> int:
+        return self._read(self.table.total_borrowed, 0)
+
+    @total_borrowed.setter
+    def total_borrowed(self, value: int):
+        self._write(self.table.total_borrowed, value)
+
+
+class MarketUserView(_RowView):
+    """:class:`MarketUser` of a user, backed by a :class:`UserTable`"""
+
+    __slots__ = ()
+
+    @property
+    def balances(self) -> UserBalancesView:
+        return UserBalancesView(self.table, self.address)
+
+    @property
+    def entered(self) -> bool:
+        return bool(self._read(self.table.entered, 0))
+
+    @entered.setter
+    def entered(self, value: bool):
+        self._write(self.table.entered, value)
+
+    @property
+    def borrow_index(self) -> int:
+        return self._read(self.table.borrow_indexes, INITIAL_BORROW_INDEX)
+
+    @borrow_index.setter
+    def borrow_index(self, value: int):
+        self._write(self.table.borrow_indexes, value)
+
+    def borrowed_at(self, market_index: int) -> int:
+        row = self.table.find_row(self.address)
+        if row is None:
+            return 0
+        return self.table.borrowed_at(row, market_index)
+
+
 @dataclass(eq=False, repr=False)
 class Market:
     address: str
     interest_rate_model: str = None
     balances: Balances = None
-    reserve_factor: Decimal = Decimal("0")
-    collateral_factor: Decimal = Decimal("0")
-    users: Dict[str, MarketUser] = None
+    # factors are kept as mantissas scaled by 1e18, as on chain
+    reserve_factor: int = 0
+    collateral_factor: int = 0
+    users: UserTable = None
     listed: bool = False
     comptroller_address: str = None
     reserves: int = 0
     borrow_index: int = 10 ** 18
 
+    # incremented by the processor each time the market changes, values
+    # derived from the market are cached until the next change
+    version = 0
+    _exchange_rate_cache = (-1, 0)
+
     def __post_init__(self):
         self.address = self.address.lower()
         if self.balances is None:
             self.balances = Balances()
         if self.users is None:
-            self.users = defaultdict(MarketUser)
+            self.users = UserTable()
 
     def get_cash(self):
         return self.balances.total_underlying
 
+    def touch(self):
+        self.version += 1
+
     @property
     def underlying_exchange_rate(self):
+        version, rate = self._exchange_rate_cache
+        if version != self.version:
+            rate = self.compute_underlying_exchange_rate()
+            self._exchange_rate_cache = (self.version, rate)
+        return rate
+
+    def compute_underlying_exchange_rate(self) -> int:
         if self.balances.token_balance == 0:
             return 0
         numerator = self.get_cash() + self.balances.total_borrowed - self.reserves
@@ -92,27 +346,54 @@ class Market:
     def __repr__(self):
         return f"Market(address='{self.address}')"
 
+    def __setstate__(self, state: dict):
+        # states pickled before UserTable stored users in a defaultdict
+        if isinstance(state.get("users"), dict):
+            state = {**state, "users": UserTable.from_users(state["users"])}
+        # and factors as decimals
+        for key in ["reserve_factor", "collateral_factor"]:
+            if isinstance(state.get(key), Decimal):
+                state = {**state, key: int(state[key] * 10 ** 18)}
+        self.__dict__.update(state)
+
 
 @dataclass
 class Markets:
     markets: List[Market]
 
-    def __init__(self, markets: List[Market] = None):
+    def __init__(self, markets: List[Market] = None, accounts: AccountRegistry = None):
         if markets is None:
             markets = []
+        if accounts is None:
+            accounts = AccountRegistry()
         self.markets = markets
+        self.accounts = accounts
+        # lowercase address -> market
+        self._by_address = {market.address: market for market in markets}
+        for market in markets:
+            market.users.attach(accounts)
 
     def find_by_address(self, address: str) -> Market:
-        normalized_address = address.lower()
-        for market in self.markets:
-            if market.address == normalized_address:
-                return market
-        raise ValueError(f"could not find market with address {address}")
+        market = self._by_address.get(address)
+        if market is None:
+            market = self._by_address.get(address.lower())
+            if market is None:
+                raise ValueError(f"could not find market with address {address}")
+        return market
 
     def add_market(self, new_market: Market):
-        if any(market == new_market for market in self.markets):
+        if new_market.address in self._by_address:
             raise ValueError(f"market {new_market} already exists")
+        new_market.users.attach(self.accounts)
         self.markets.append(new_market)
+        self._by_address[new_market.address] = new_market
+
+    def __getstate__(self):
+        return {"markets": self.markets, "accounts": self.accounts}
+
+    def __setstate__(self, state: dict):
+        # NOTE: the index is rebuilt, states pickled before it existed lack it
+        self.__init__(state["markets"], accounts=state.get("accounts"))
 
     def __getitem__(self, key):
         return self.markets[key]
@@ -148,10 +429,17 @@ class Oracles:
     oracles: Dict[str, Oracle] = None
     current_address: str = None
 
+    # incremented by the processor each time a price or the current oracle
+    # changes. Shared by all the oracles as some of them share their prices
+    version = 0
+
     def __post_init__(self):
         if self.oracles is None:
             self.oracles = {}
 
+    def touch(self):
+        self.version += 1
+
     def get_oracle(self, oracle_address: str) -> Oracle:
         oracle_address = oracle_address.lower()
         if oracle_address not in self.oracles:
@@ -176,7 +464,7 @@ class State:
     protocol_name: str
     current_event_time: PointInTime = None
     last_event_time: PointInTime = None
-    timestamp: dt.datetime = None
+    block_timestamp: int = None
     markets: Markets = None
     oracles: Oracles = None
     extra: dict = None  # used by hooks to persist data to state
@@ -195,6 +483,27 @@ class State:
         if self.extra is None:
             self.extra = {}
 
+    @property
+    def timestamp(self) -> dt.datetime:
+        """Timestamp of the current block, only converted when accessed"""
+        if self.block_timestamp is None:
+            return None
+        return dt.datetime.fromtimestamp(self.block_timestamp, dt.timezone.utc)
+
+    @timestamp.setter
+    def timestamp(self, value):
+        if isinstance(value, dt.datetime):
+            value = int(value.timestamp())
+        self.block_timestamp = value
+
+    def __setstate__(self, state: dict):
+        # states pickled before timestamps were stored as integers
+        if "timestamp" in state:
+            state = dict(state)
+            self.timestamp = state.pop("timestamp")
+            state["block_timestamp"] = self.block_timestamp
+        self.__dict__.update(state)
+
     @classmethod
     def load(cls: Type[T], filepath: str) -> T:
         with open(filepath, "rb") as f:
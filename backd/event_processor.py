@@ -1,39 +1,117 @@
+import gc
 from abc import ABC, abstractmethod
-from typing import Iterable
+from typing import Iterable, List, Optional, Set
 
 from tqdm import tqdm
 
-from . import normalizer
+from . import normalizer, utils
 from .entities import PointInTime, State
 from .hook import Hooks
+from .relevance import EventInterest
+
+# number of young collections between two full collections during replays
+FULL_GC_RATIO = 10
 
 
 class Processor(ABC):
     def __init__(self, hooks: Hooks = None):
         self.hooks = hooks
+        # accounts whose balances are followed, all of them if ``None``
+        self.tracked_accounts: Optional[Set[str]] = None
+
+    def process_events(
+        self,
+        state: State,
+        events: Iterable[dict],
+        pbar: tqdm = None,
+        in_place: bool = False,
+        gc_interval: int = None,
+    ):
+        """Processes all ``events`` in order
 
-    def process_events(self, state: State, events: Iterable[dict], pbar: tqdm = None):
+        :param in_place: see :meth:`process_event`
+        :param gc_interval: if set, automatic garbage collection is disabled
+            and young objects are collected every ``gc_interval`` blocks
+            instead, all of them every ``FULL_GC_RATIO`` collections
+        """
+        if not gc_interval:
+            self._process_events(state, events, pbar, in_place)
+            return
+        with utils.deferred_gc():
+            self._process_events(state, events, pbar, in_place, gc_interval)
+
+    def _process_events(
+        self,
+        state: State,
+        events: Iterable[dict],
+        pbar: tqdm,
+        in_place: bool,
+        gc_interval: int = None,
+    ):
         if self.hooks:
             self.hooks.initialize_hooks(state)
+        last_block = None
+        blocks_count = 0
         for event in events:
-            self.process_event(state, event)
+            if gc_interval and event.get("blockNumber") != last_block:
+                last_block = event.get("blockNumber")
+                blocks_count += 1
+                if blocks_count % (gc_interval * FULL_GC_RATIO) == 0:
+                    # NOTE: cycles promoted to the oldest generation are only
+                    # freed by full collections
+                    gc.collect()
+                elif blocks_count % gc_interval == 0:
+                    gc.collect(1)
+            self.process_event(state, event, in_place=in_place)
             if pbar:
                 pbar.update()
         if self.hooks:
             self.hooks.finalize_hooks(state)
 
-    def process_event(self, state: State, event: dict):
+    def process_event(self, state: State, event: dict, in_place: bool = False):
+        """Processes a single event
+
+        :param in_place: normalize ``event`` in place and recycle the
+            :class:`PointInTime` of the previous event instead of allocating
+            new ones. Only valid if the caller does not reuse ``event`` and
+            does not keep references to ``state.last_event_time``
+        """
         if "event" not in event:
             return
-        event = normalizer.normalize_event(event)
+        event = normalizer.normalize_event(event, in_place=in_place)
+        previous_time = state.last_event_time
         state.last_event_time = state.current_event_time
-        state.current_event_time = PointInTime.from_event(event)
+        if in_place and previous_time is not None:
+            previous_time.update_from_event(event)
+            state.current_event_time = previous_time
+        else:
+            state.current_event_time = PointInTime.from_event(event)
         if self.hooks:
             self.hooks.execute_hooks_start(state, event)
         self._process_event(state, event)
         if self.hooks:
             self.hooks.execute_hooks_end(state, event)
 
+    def get_interests(self, markets: List[str] = None) -> List[EventInterest]:
+        """Declares the events needed by the processor, see :mod:`backd.relevance`
+
+        :param markets: only declare the events affecting these markets
+        :return: the interests, an empty list meaning that all events are needed
+        """
+        return []
+
+    def get_account_interests(
+        self, account: str, account_events: Iterable[dict]
+    ) -> List[EventInterest]:
+        """Declares the events needed to follow a single account, replays
+        using them should set ``tracked_accounts``
+
+        :param account: address of the account
+        :param account_events: the events in which ``account`` takes part
+        :return: the interests, an empty list meaning that all events are needed
+        """
+        return self.get_interests()
+
     @abstractmethod
     def _process_event(self, state: State, event: dict):
         pass
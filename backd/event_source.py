@@ -0,0 +1,89 @@
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Union
+
+from . import settings
+from .base_factory import BaseFactory
+from .relevance import EventInterest
+from .resumable import ResumeToken
+
+if TYPE_CHECKING:
+    from .timestamps import BlockTimestamps
+
+
+class EventSource(ABC, BaseFactory):
+    """Storage of the data replayed by the protocols
+
+    Data is organized in collections of rows sorted in replay order, named
+    after the MongoDB collections, e.g. ``events``, ``blocks`` or ``prices``.
+    Implementations are registered with ``EventSource.register`` and selected
+    with ``settings.EVENT_SOURCE`` or the ``--source`` flag
+    """
+
+    # whether rows can be counted without reading all of them
+    can_count = True
+    # whether each fetch builds new rows, which readers may then modify
+    yields_owned_rows = True
+
+    @abstractmethod
+    def count_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> Optional[int]:
+        """Counts the rows of ``collection`` in the given block range,
+        ``None`` if they cannot be counted without reading all of them
+        """
+
+    @abstractmethod
+    def fetch_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        projection: dict = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Iterable[dict]:
+        """Returns the rows of ``collection`` in the given block range,
+        sorted in replay order
+
+        :param projection: fields to fetch, sources may return more fields
+        :param lazy: decode the rows only when a field is accessed
+        :param batch_size: number of rows fetched per round trip
+        :param interests: only fetch the events matching one of these
+        :param resume_token: only fetch the rows after this position
+        """
+
+    @abstractmethod
+    def fetch_dsr_rates(self) -> List[dict]:
+        """Returns the DSR rates as ``blockNumber`` and decimal ``rate`` rows"""
+
+    @abstractmethod
+    def get_last_blocks(self, event: str) -> Dict[str, int]:
+        """Returns the last block at which each address emitted ``event``,
+        indexed by lowercased address
+        """
+
+    @abstractmethod
+    def get_block_timestamps(self) -> "BlockTimestamps":
+        pass
+
+    def fetch_prices(
+        self, min_block: int = None, max_block: int = None
+    ) -> Iterable[dict]:
+        return self.fetch_rows("prices", min_block, max_block)
+
+
+def get_source(source: Union[str, EventSource] = None) -> EventSource:
+    """Returns ``source`` if it is already a source, otherwise creates the
+    source registered with this name, ``settings.EVENT_SOURCE`` by default
+    """
+    if isinstance(source, EventSource):
+        return source
+    if source is None:
+        source = settings.EVENT_SOURCE
+    return EventSource.get(source)()
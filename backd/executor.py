@@ -1,10 +1,19 @@
-from typing import List
+import pickle
+from typing import List, Tuple, Union
 
+from pymongo.errors import PyMongoError
 from tqdm import tqdm
 
-from .hook import Hooks
+from . import fetcher
+from .event_source import EventSource
+from .hook import Hook, Hooks
+from .pipeline import Pipeline
 from .protocol import Protocol
-from .entities import State
+from .entities import State, event_position
+from .logger import logger
+
+# number of blocks between two collections of young objects during replays
+DEFAULT_GC_INTERVAL = 1000
 
 
 def process_all_events(
@@ -14,16 +23,146 @@ def process_all_events(
     max_block: int = None,
     state: State = None,
     pbar: tqdm = None,
+    lazy: bool = False,
+    batch_size: int = None,
+    prefetch: int = None,
+    gc_interval: int = DEFAULT_GC_INTERVAL,
+    markets: List[str] = None,
+    relevant_only: bool = False,
+    resume_token: Tuple[int, int, int] = None,
+    checkpoint: str = None,
+    source: Union[str, EventSource] = None,
 ) -> State:
+    """Replays all the events of ``protocol_name`` in the given block range
+
+    :param prefetch: if set, each event stream is read in a background worker
+        with a queue of ``prefetch`` chunks
+    :param gc_interval: number of blocks between garbage collections, automatic
+        collections are disabled during the replay unless this is ``None``
+    :param markets: only replay the events affecting these markets
+    :param relevant_only: skip the events that neither the processor nor
+        the hooks consume, required to filter by ``markets``. Hooks must
+        declare the other events they read in ``Hook.interests``
+    :param resume_token: continue a replay of ``state`` after this
+        ``(block, transaction, log)`` position
+    :param checkpoint: file where the state is saved if the replay is
+        interrupted by a database error, to be resumed later
+    :param source: where to read the events from, see
+        :func:`backd.event_source.get_source`
+    """
+    if markets and not relevant_only:
+        raise ValueError("markets can only be filtered with relevant_only")
     hooks = Hooks(hooks=hooks)
     protocol_class = Protocol.get(protocol_name)
-    protocol: Protocol = protocol_class()
+    protocol: Protocol = protocol_class(source=source)
     processor = protocol.create_processor(hooks=hooks)
+    interests = None
+    if relevant_only:
+        interests = processor.get_interests(markets=markets)
+        if interests:
+            interests += hooks.interests
     if state is None:
         state = protocol.create_empty_state()
     if pbar is None:
-        events_count = protocol.count_events(min_block=min_block, max_block=max_block)
+        count_from = min_block if resume_token is None else resume_token[0]
+        events_count = protocol.count_events(
+            min_block=count_from, max_block=max_block, interests=interests
+        )
         pbar = tqdm(total=events_count, unit="event")
-    events = protocol.iterate_events(min_block=min_block, max_block=max_block)
-    processor.process_events(state, events, pbar=pbar)
+    iterate_options = dict(
+        min_block=min_block,
+        max_block=max_block,
+        lazy=lazy,
+        batch_size=batch_size,
+        fields=hooks.required_fields,
+        interests=interests,
+        resume_token=resume_token,
+    )
+    # NOTE: events can only be normalized in place if the source does not keep them
+    in_place = protocol.source.yields_owned_rows
+    process_options = dict(pbar=pbar, in_place=in_place, gc_interval=gc_interval)
+    try:
+        if not prefetch:
+            events = protocol.iterate_events(**iterate_options)
+            processor.process_events(state, events, **process_options)
+            return state
+
+        streams = protocol.iterate_streams(**iterate_options)
+        pipeline = Pipeline(streams, depth=prefetch)
+        try:
+            events = pipeline.merge(key=event_position)
+            processor.process_events(state, events, **process_options)
+        finally:
+            pipeline.close()
+            pipeline.log_stats()
+        return state
+    except PyMongoError:
+        # NOTE: cursors only fail between two events so the state is consistent
+        if checkpoint:
+            save_checkpoint(state, checkpoint)
+        raise
+
+
+def process_account_events(
+    protocol_name: str,
+    account: str,
+    hooks: List[Union[Hook, str]] = None,
+    max_block: int = None,
+    pbar: tqdm = None,
+    gc_interval: int = DEFAULT_GC_INTERVAL,
+    source: Union[str, EventSource] = None,
+) -> State:
+    """Replays the history of a single ``account``: only the events in which
+    it takes part and the market-level events needed to value its positions
+    are fetched, see :meth:`backd.event_processor.Processor.get_account_interests`
+
+    Market totals are only exact for the markets the account used
+    """
+    hooks = Hooks(hooks=hooks)
+    protocol_class = Protocol.get(protocol_name)
+    protocol: Protocol = protocol_class(source=source)
+    processor = protocol.create_processor(hooks=hooks)
+    account_events = list(
+        fetcher.fetch_user_events(account, max_block=max_block, source=protocol.source)
+    )
+    if not account_events:
+        raise ValueError(f"no events found for account {account}")
+    logger.info("%s events found for account %s", len(account_events), account)
+    interests = processor.get_account_interests(account, account_events)
+    # NOTE: the transfers of other accounts are not replayed
+    processor.tracked_accounts = {account.lower()}
+    if interests:
+        interests += hooks.interests
+    state = protocol.create_empty_state()
+    if pbar is None:
+        events_count = protocol.count_events(max_block=max_block, interests=interests)
+        pbar = tqdm(total=events_count, unit="event")
+    events = protocol.iterate_events(
+        max_block=max_block, fields=hooks.required_fields, interests=interests
+    )
+    processor.process_events(
+        state,
+        events,
+        pbar=pbar,
+        in_place=protocol.source.yields_owned_rows,
+        gc_interval=gc_interval,
+    )
     return state
+
+
+def get_resume_token(state: State) -> Tuple[int, int, int]:
+    """Returns the position after which a replay of ``state`` should continue"""
+    point = state.current_event_time
+    if point is None:
+        return None
+    return (point.block_number, point.transaction_index, point.log_index)
+
+
+def save_checkpoint(state: State, filepath: str):
+    with open(filepath, "wb") as f:
+        pickle.dump(state, f)
+    logger.error(
+        "replay interrupted after %s, state saved to %s",
+        get_resume_token(state),
+        filepath,
+    )
@@ -1,26 +1,21 @@
-from typing import List
+from typing import Iterable, Union
 
-import pymongo
+from . import relevance
+from .event_source import EventSource, get_source
 
-from .db import db
 
-
-def fetch_user_events(address: str) -> List[dict]:
-    return db.events.find(
-        {
-            "$or": [
-                {"event": "Mint", "returnValues.minter": address},
-                {"event": "Redeem", "returnValues.redeemer": address},
-                {"event": "Borrow", "returnValues.borrower": address},
-                {"event": "RepayBorrow", "returnValues.borrower": address},
-                {"event": "LiquidateBorrow", "returnValues.borrower": address},
-                {"event": "LiquidateBorrow", "returnValues.liquidator": address},
-            ]
-        }
-    ).sort(
-        [
-            ("blockNumber", pymongo.ASCENDING),
-            ("transactionIndex", pymongo.ASCENDING),
-            ("logIndex", pymongo.ASCENDING),
-        ]
+def fetch_user_events(
+    address: str,
+    min_block: int = None,
+    max_block: int = None,
+    source: Union[str, EventSource] = None,
+) -> Iterable[dict]:
+    """Returns the events in which ``address`` takes part, in replay order,
+    see :data:`backd.relevance.ACCOUNT_ROLES`
+    """
+    return get_source(source).fetch_rows(
+        "events",
+        min_block,
+        max_block,
+        interests=relevance.account_interests(address),
     )
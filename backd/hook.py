@@ -4,9 +4,15 @@ from typing import List, Union
 
 from .base_factory import BaseFactory
 from .entities import State
+from .relevance import EventInterest
 
 
 class Hook(BaseFactory):
+    # event fields read by the hook on top of the ones used by the processor
+    required_fields: List[str] = []
+    # events consumed by the hook on top of the ones used by the processor
+    interests: List[EventInterest] = []
+
     @classmethod
     def list_dependencies(cls):
         return []
@@ -80,32 +86,44 @@ class Hooks:
     def hooks(self):
         return [v[1] for v in self.hooks_info]
 
+    @property
+    def required_fields(self) -> List[str]:
+        fields = []
+        for hook in self.hooks:
+            fields.extend(f for f in hook.required_fields if f not in fields)
+        return fields
+
+    @property
+    def interests(self) -> List[EventInterest]:
+        return [interest for hook in self.hooks for interest in hook.interests]
+
     def execute_hooks_start(self, state: State, event: dict):
+        current_time = state.current_event_time
         if (
-            self._last_transaction != state.current_event_time.transaction_index
+            self._last_transaction != current_time.transaction_index
             and self._last_transaction is not None
         ):
-            for hook in self.hooks:
+            for _name, hook in self.hooks_info:
                 hook.transaction_end(state, self._last_block, self._last_transaction)
 
-        if self._last_block != state.current_event_time.block_number:
+        if self._last_block != current_time.block_number:
             if self._last_block is not None:
-                for hook in self.hooks:
+                for _name, hook in self.hooks_info:
                     hook.block_end(state, self._last_block)
-            self._last_block = state.current_event_time.block_number
-            for hook in self.hooks:
+            self._last_block = current_time.block_number
+            for _name, hook in self.hooks_info:
                 hook.block_start(state, self._last_block)
 
-        if self._last_transaction != state.current_event_time.transaction_index:
-            self._last_transaction = state.current_event_time.transaction_index
-            for hook in self.hooks:
+        if self._last_transaction != current_time.transaction_index:
+            self._last_transaction = current_time.transaction_index
+            for _name, hook in self.hooks_info:
                 hook.transaction_start(state, self._last_block, self._last_transaction)
 
-        for hook in self.hooks:
+        for _name, hook in self.hooks_info:
             hook.event_start(state, event)
 
     def execute_hooks_end(self, state: State, event: dict):
-        for hook in self.hooks:
+        for _name, hook in self.hooks_info:
             hook.event_end(state, event)
 
     def initialize_hooks(self, state: State):
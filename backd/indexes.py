@@ -0,0 +1,305 @@
+"""Indexes needed by the replays and the queries of backd
+
+``INDEXES`` declares every index and :func:`builtin_queries` the queries
+run by the replays, the event sources and the command line. Each query is
+explained by :func:`verify` to detect the ones that would scan a whole
+collection, either directly or through an index scanned without bounds.
+"""
+
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+import pymongo
+from pymongo.operations import IndexModel
+
+from . import canonical, db, relevance
+from .logger import logger
+
+ASC = pymongo.ASCENDING
+
+# example values used when explaining the built-in queries
+EXAMPLE_MIN_BLOCK = 10_000_000
+EXAMPLE_MAX_BLOCK = 10_100_000
+EXAMPLE_ADDRESS = "0x" + "00" * 20
+
+UNBOUNDED = ["[MinKey, MaxKey]"]
+
+
+@dataclass
+class Index:
+    """An index of ``collection``, named by MongoDB unless ``name`` is set"""
+
+    collection: str
+    keys: List[Tuple[str, int]]
+    name: str = None
+    unique: bool = False
+    collation: dict = None
+
+    def to_model(self, background: bool = True) -> IndexModel:
+        options = {"unique": self.unique, "background": background}
+        if self.name is not None:
+            options["name"] = self.name
+        if self.collation is not None:
+            options["collation"] = self.collation
+        return IndexModel(self.keys, **options)
+
+
+def _account_indexes() -> List[Index]:
+    roles = {role for roles in relevance.ACCOUNT_ROLES.values() for role in roles}
+    return [
+        Index(
+            "events",
+            [(f"returnValues.{role}", ASC), ("blockNumber", ASC)],
+            name=f"{role}_block_ci",
+            collation=relevance.COLLATION,
+        )
+        for role in sorted(roles)
+    ]
+
+
+INDEXES = [
+    Index("events", db.SORT_KEY, unique=True),
+    # last blocks per address of an event, and event names without collation
+    Index(
+        "events",
+        [("event", ASC), ("address", ASC), ("blockNumber", ASC)],
+        name="event_address_block",
+    ),
+    Index("events", [("address", ASC)]),
+    # used by the relevance filters, which compare addresses case-insensitively
+    Index(
+        "events",
+        [("event", ASC), ("address", ASC)],
+        name="event_address_ci",
+        collation=relevance.COLLATION,
+    ),
+    # used to fetch the events of a single account, in replay order
+    *_account_indexes(),
+    Index("dsr", [("blockNumber", ASC)], unique=True),
+    Index("ds_values", [("blockNumber", ASC)], unique=True),
+    Index("ds_values", [("address", ASC)]),
+    Index("chi_values", [("blockNumber", ASC)], unique=True),
+    Index("blocks", [("blockNumber", ASC)], unique=True),
+    Index("prices", [("blockNumber", ASC)], unique=True),
+    # last position per market of an event, see CanonicalCompoundProtocol
+    Index(
+        canonical.CANONICAL_COLLECTION,
+        [("e", ASC), ("a", ASC), ("_id", ASC)],
+        name="event_address_position",
+    ),
+]
+
+
+@dataclass
+class Query:
+    """A query to explain, either a ``find`` with ``filter`` and ``sort``
+    or an aggregation ``pipeline``
+    """
+
+    name: str
+    collection: str
+    filter: dict = None
+    sort: list = None
+    pipeline: list = None
+    collation: dict = None
+
+    def explain(self, database: pymongo.database.Database) -> dict:
+        if self.pipeline is not None:
+            options = {}
+            if self.collation is not None:
+                options["collation"] = self.collation
+            return database.command(
+                "aggregate",
+                self.collection,
+                pipeline=self.pipeline,
+                explain=True,
+                **options,
+            )
+        cursor = database[self.collection].find(
+            self.filter or {}, collation=self.collation
+        )
+        if self.sort:
+            cursor = cursor.sort(self.sort)
+        return cursor.explain()
+
+
+@dataclass
+class QueryPlan:
+    query: Query
+    stages: List[str]
+    indexes: List[str]
+    unbounded_indexes: List[str]
+
+    @property
+    def scans_collection(self) -> bool:
+        return "COLLSCAN" in self.stages or bool(self.unbounded_indexes)
+
+
+def _block_range() -> dict:
+    return {"blockNumber": {"$gte": EXAMPLE_MIN_BLOCK, "$lte": EXAMPLE_MAX_BLOCK}}
+
+
+def builtin_queries(protocol_name: str = "compound") -> List[Query]:
+    """Returns the queries run by backd, with example values"""
+    # pylint: disable=import-outside-toplevel,cyclic-import
+    from .protocol import Protocol
+
+    processor = Protocol.get(protocol_name)().create_processor()
+    replay_filter = relevance.compile_filter(processor.get_interests())
+    account_filter = relevance.compile_filter(
+        relevance.account_interests(EXAMPLE_ADDRESS)
+    )
+    queries = [
+        Query("replay-events", "events", _block_range(), db.SORT_KEY),
+        Query(
+            "relevant-events",
+            "events",
+            {**_block_range(), **replay_filter},
+            db.SORT_KEY,
+            collation=relevance.COLLATION,
+        ),
+        Query(
+            "account-events",
+            "events",
+            account_filter,
+            db.SORT_KEY,
+            collation=relevance.COLLATION,
+        ),
+        Query(
+            "last-blocks",
+            "events",
+            pipeline=[
+                {"$match": {"event": "AccrueInterest"}},
+                {
+                    "$group": {
+                        "_id": {"$toLower": "$address"},
+                        "block": {"$max": "$blockNumber"},
+                    }
+                },
+            ],
+        ),
+        Query(
+            "liquidations",
+            "events",
+            pipeline=[
+                {"$match": {"event": "LiquidateBorrow"}},
+                {"$group": {"_id": "$blockNumber", "count": {"$sum": 1}}},
+            ],
+        ),
+        Query(
+            "canonical-events",
+            canonical.CANONICAL_COLLECTION,
+            {"_id": {"$gte": EXAMPLE_MIN_BLOCK << 32}},
+            [("_id", ASC)],
+        ),
+        Query(
+            "canonical-last-positions",
+            canonical.CANONICAL_COLLECTION,
+            pipeline=[
+                {"$match": {"e": 0}},
+                {"$group": {"_id": "$a", "position": {"$max": "$_id"}}},
+            ],
+        ),
+    ]
+    for collection in ["ds_values", "chi_values", "prices", "blocks", "dsr"]:
+        queries.append(
+            Query(f"{collection}-range", collection, _block_range(), "blockNumber")
+        )
+    return queries
+
+
+def create_indexes(indexes: List[Index] = None, background: bool = True):
+    """Creates ``indexes``, all the declared ones by default. Indexes that
+    already exist are left untouched
+    """
+    if indexes is None:
+        indexes = INDEXES
+    database = db.get_db()
+    collections = sorted({index.collection for index in indexes})
+    for collection in collections:
+        models = [
+            index.to_model(background=background)
+            for index in indexes
+            if index.collection == collection
+        ]
+        names = database[collection].create_indexes(models)
+        logger.info("%s: %s", collection, ", ".join(names))
+
+
+def find_plans(explanation) -> Iterator[dict]:
+    """Yields all the winning plans of an ``explain`` result, including the
+    ones nested in aggregation stages or shards
+    """
+    if isinstance(explanation, list):
+        for value in explanation:
+            yield from find_plans(value)
+    elif isinstance(explanation, dict):
+        for key, value in explanation.items():
+            if key == "winningPlan":
+                yield value
+            else:
+                yield from find_plans(value)
+
+
+def iterate_stages(plan: dict) -> Iterator[dict]:
+    """Yields the stages of a plan tree"""
+    if "queryPlan" in plan:
+        # NOTE: plans of the slot-based execution engine
+        plan = plan["queryPlan"]
+    yield plan
+    children = list(plan.get("inputStages", []))
+    for key in ["inputStage", "outerStage", "innerStage"]:
+        if key in plan:
+            children.append(plan[key])
+    for child in children:
+        yield from iterate_stages(child)
+
+
+def is_unbounded(stage: dict) -> bool:
+    bounds = stage.get("indexBounds")
+    if not bounds:
+        return False
+    return all(value == UNBOUNDED for value in bounds.values())
+
+
+def analyze_plan(query: Query, explanation: dict) -> QueryPlan:
+    stages, indexes, unbounded = [], [], []
+    for plan in find_plans(explanation):
+        for stage in iterate_stages(plan):
+            stages.append(stage.get("stage"))
+            if "indexName" in stage:
+                indexes.append(stage["indexName"])
+                if is_unbounded(stage):
+                    unbounded.append(stage["indexName"])
+    return QueryPlan(query, stages, indexes, unbounded)
+
+
+def verify(queries: List[Query] = None) -> List[QueryPlan]:
+    """Explains ``queries``, the built-in ones by default, and returns their
+    plans. Queries on missing collections are skipped
+    """
+    if queries is None:
+        queries = builtin_queries()
+    database = db.get_db()
+    existing = set(database.list_collection_names())
+    plans = []
+    for query in queries:
+        if query.collection not in existing:
+            logger.warning("%s: collection %s not found", query.name, query.collection)
+            continue
+        plans.append(analyze_plan(query, query.explain(database)))
+    return plans
+
+
+def get_scanning_plans(plans: List[QueryPlan]) -> List[QueryPlan]:
+    return [plan for plan in plans if plan.scans_collection]
+
+
+def describe_plan(plan: QueryPlan) -> str:
+    indexes = ", ".join(dict.fromkeys(plan.indexes)) or "no index"
+    status = "COLLECTION SCAN" if plan.scans_collection else "ok"
+    return f"{plan.query.name:28} {plan.query.collection:18} {status:16} {indexes}"
+
+
+def get_index(name: str) -> Optional[Index]:
+    return next((index for index in INDEXES if index.name == name), None)
@@ -0,0 +1,208 @@
+"""Bulk loading of JSON lines dumps into the database
+
+Files are decompressed and parsed in a pool of processes, each writing its
+documents with large unordered ``insert_many`` batches. Documents already
+present are rejected by the unique index of the collection, so loading a
+file twice does not duplicate it. Each file loaded into a collection is
+recorded with its size and modification time so that later runs only
+load new files.
+Secondary indexes and the catalog are built once at the end.
+"""
+
+import datetime as dt
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os import path
+from typing import Iterable, Iterator, List, Tuple
+
+import pymongo
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from . import catalog, constants, db, settings, utils
+from .logger import logger
+
+WATERMARKS_COLLECTION = "ingest_watermarks"
+DEFAULT_BATCH_SIZE = constants.INGEST_BATCH_SIZE
+DEFAULT_WORKERS = constants.INGEST_WORKERS
+FILE_EXTENSIONS = (".jsonl", ".jsonl.gz", ".json.gz")
+
+DUPLICATE_KEY_ERROR = 11000
+
+# unique key of each collection, used to make insertions idempotent
+UNIQUE_KEYS = {"events": db.SORT_KEY}
+DEFAULT_UNIQUE_KEY = [("blockNumber", pymongo.ASCENDING)]
+
+
+def list_files(paths: Iterable[str]) -> List[str]:
+    """Expands directories into the dump files they contain, sorted by name"""
+    files = []
+    for filepath in paths:
+        if not path.isdir(filepath):
+            files.append(path.abspath(filepath))
+            continue
+        for root, _dirs, filenames in os.walk(filepath):
+            files.extend(
+                path.abspath(path.join(root, filename))
+                for filename in filenames
+                if filename.endswith(FILE_EXTENSIONS)
+            )
+    return sorted(files)
+
+
+def get_file_signature(filepath: str) -> dict:
+    stat = os.stat(filepath)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def watermark_id(collection: str, filepath: str) -> str:
+    return f"{collection}:{filepath}"
+
+
+def index_watermarks(documents: Iterable[dict], collection: str) -> dict:
+    """Indexes by file path the watermarks of the files loaded in ``collection``"""
+    # NOTE: older watermarks are identified by the file path only
+    return {
+        document.get("path", document["_id"]): document
+        for document in documents
+        if document.get("collection") == collection
+    }
+
+
+def is_loaded(watermarks: dict, filepath: str) -> bool:
+    watermark = watermarks.get(filepath)
+    if watermark is None:
+        return False
+    return all(watermark.get(k) == v for k, v in get_file_signature(filepath).items())
+
+
+def chunk(documents: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert_documents(
+    collection: pymongo.collection.Collection,
+    documents: Iterable[dict],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Inserts ``documents`` with unordered batches, skipping the ones
+    rejected by a unique index
+
+    :return: the number of documents actually inserted
+    """
+    inserted = 0
+    for batch in chunk(documents, batch_size):
+        try:
+            inserted += len(collection.insert_many(batch, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details["writeErrors"]
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            inserted += e.details["nInserted"]
+    return inserted
+
+
+def store_documents(
+    collection: str, documents: List[dict], batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """Inserts ``documents`` into ``collection`` and updates the catalog
+
+    :return: the number of documents actually inserted
+    """
+    ensure_unique_index(collection)
+    inserted = insert_documents(db.db[collection], documents, batch_size)
+    if inserted == len(documents):
+        catalog.record(collection, documents)
+    else:
+        # some documents were already present, they must not be counted twice
+        catalog.rebuild(collection)
+    return inserted
+
+
+def read_documents(filepath: str) -> Iterator[dict]:
+    with utils.open_file(filepath) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json_util.loads(line)
+
+
+def load_file(filepath: str, collection: str, batch_size: int) -> Tuple[str, int]:
+    """Loads a single file, run in a worker process"""
+    # NOTE: clients cannot be shared with forked processes
+    client = pymongo.MongoClient(settings.DATABASE_URL)
+    try:
+        database = client.get_database()
+        count = insert_documents(
+            database[collection], read_documents(filepath), batch_size
+        )
+    finally:
+        client.close()
+    return filepath, count
+
+
+def ensure_unique_index(collection: str):
+    key = UNIQUE_KEYS.get(collection, DEFAULT_UNIQUE_KEY)
+    db.db[collection].create_index(key, unique=True)
+
+
+def ingest(
+    paths: Iterable[str],
+    collection: str = "events",
+    workers: int = DEFAULT_WORKERS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    force: bool = False,
+    build_indices: bool = True,
+) -> int:
+    """Loads the JSON lines dumps in ``paths`` into ``collection``
+
+    :param paths: files or directories containing the dumps
+    :param force: load files again even if they did not change
+    :param build_indices: create the secondary indexes and rebuild the
+        catalog once all files are loaded
+    :return: the number of documents inserted
+    """
+    watermarks_collection = db.db[WATERMARKS_COLLECTION]
+    watermarks = index_watermarks(
+        watermarks_collection.find({"collection": collection}), collection
+    )
+    files = [f for f in list_files(paths) if force or not is_loaded(watermarks, f)]
+    logger.info("loading %s files into %s", len(files), collection)
+    if not files:
+        return 0
+
+    # the unique index is what makes loading the same data twice harmless
+    ensure_unique_index(collection)
+
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(load_file, filepath, collection, batch_size)
+            for filepath in files
+        ]
+        for future in as_completed(futures):
+            filepath, count = future.result()
+            total += count
+            watermark = get_file_signature(filepath)
+            watermark.update(
+                collection=collection,
+                path=filepath,
+                count=count,
+                ingested_at=dt.datetime.now(dt.timezone.utc),
+            )
+            watermarks_collection.replace_one(
+                {"_id": watermark_id(collection, filepath)}, watermark, upsert=True
+            )
+            logger.info("%s: %s documents inserted", filepath, count)
+
+    if build_indices:
+        db.create_indices()
+        catalog.rebuild(collection)
+    return total
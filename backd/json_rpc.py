@@ -0,0 +1,148 @@
+"""Minimal asyncio client for batched JSON-RPC calls to an Ethereum node
+
+Calls are grouped in batches of ``batch_size`` requests sent in a single
+HTTP request, with at most ``concurrency`` batches in flight. Batches failing
+at the transport level are retried with an exponential backoff, while the
+errors of individual calls, e.g. reverted ``eth_call``, are returned as
+:class:`JSONRPCError` in place of their result.
+"""
+
+import asyncio
+import itertools
+import json
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, List, Tuple, Union
+
+from .logger import logger
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TIMEOUT = 30
+
+Call = Tuple[str, list]
+
+
+class JSONRPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{message} ({code})")
+        self.code = code
+        self.message = message
+
+
+class TransportError(Exception):
+    pass
+
+
+class BatchClient:
+    """Sends batched JSON-RPC requests to ``url``
+
+    :param batch_size: number of calls per HTTP request
+    :param concurrency: number of HTTP requests in flight
+    :param retries: number of retries of a failed HTTP request
+    :param backoff: delay before the first retry, doubled after each retry
+    """
+
+    def __init__(
+        self,
+        url: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.url = url
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        # NOTE: requests are sent with urllib from worker threads to avoid
+        # depending on an asynchronous HTTP client
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._ids = itertools.count()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    async def call_many(self, calls: Iterable[Call]) -> List[Union[Any, JSONRPCError]]:
+        """Returns the results of ``calls``, in order"""
+        calls = list(calls)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_batch(batch: List[Call]):
+            async with semaphore:
+                return await self.call_batch(batch)
+
+        batches = [
+            calls[i : i + self.batch_size]
+            for i in range(0, len(calls), self.batch_size)
+        ]
+        results = await asyncio.gather(*[run_batch(batch) for batch in batches])
+        return [result for batch_results in results for result in batch_results]
+
+    async def call_batch(self, calls: List[Call]) -> List[Union[Any, JSONRPCError]]:
+        """Sends ``calls`` in a single HTTP request, retrying on failures"""
+        requests = [
+            {
+                "jsonrpc": "2.0",
+                "id": next(self._ids),
+                "method": method,
+                "params": params,
+            }
+            for method, params in calls
+        ]
+        loop = asyncio.get_running_loop()
+        retries, delay = 0, self.backoff
+        while True:
+            try:
+                responses = await loop.run_in_executor(
+                    self._executor, self._post, requests
+                )
+                return self._parse_responses(requests, responses)
+            except TransportError as ex:
+                if retries == self.retries:
+                    raise
+                logger.warning("batch of %s calls failed: %s", len(calls), ex)
+                await asyncio.sleep(delay)
+                retries, delay = retries + 1, delay * 2
+
+    def _post(self, requests: List[dict]) -> Any:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(requests).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except (OSError, ValueError) as ex:
+            raise TransportError(str(ex)) from ex
+
+    def _parse_responses(
+        self, requests: List[dict], responses: Any
+    ) -> List[Union[Any, JSONRPCError]]:
+        if not isinstance(responses, list):
+            # NOTE: nodes reply with a single error when rate limiting
+            raise TransportError(f"unexpected response {responses}")
+        by_id = {response.get("id"): response for response in responses}
+        results = []
+        for request in requests:
+            response = by_id.get(request["id"])
+            if response is None:
+                raise TransportError(f"no response to request {request['id']}")
+            if "error" in response:
+                error = response["error"]
+                results.append(JSONRPCError(error.get("code"), error.get("message")))
+            else:
+                results.append(response.get("result"))
+        return results
@@ -1,4 +1,8 @@
-from typing import Any
+from collections.abc import Mapping
+from typing import Any, Iterator
+
+# set on events that are already normalized, e.g. canonical events
+NORMALIZED_KEY = "normalized"
 
 
 def normalize_value(value: Any) -> dict:
@@ -11,7 +15,72 @@ def normalize_event_values(event_values: dict):
     return {k: normalize_value(v) for k, v in event_values.items()}
 
 
-def normalize_event(event: dict):
+def normalize_event_values_in_place(event_values: dict):
+    for key, value in event_values.items():
+        if isinstance(value, str) and value.startswith("0x"):
+            event_values[key] = value.lower()
+
+
+class LazyNormalizedValues(Mapping):
+    """Read-only view of raw return values, normalized when accessed"""
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: Mapping):
+        self.values = values
+
+    def __getitem__(self, key: str) -> Any:
+        return normalize_value(self.values[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class LazyNormalizedEvent(Mapping):
+    """Read-only view of a raw event, e.g. a ``RawBSONDocument``, which only
+    normalizes the fields that are accessed so that the others are never
+    decoded
+    """
+
+    __slots__ = ("event",)
+
+    def __init__(self, event: Mapping):
+        self.event = event
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.event[key]
+        if key == "address":
+            return value.lower()
+        if key == "returnValues":
+            return LazyNormalizedValues(value)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.event)
+
+    def __len__(self) -> int:
+        return len(self.event)
+
+
+def normalize_event(event: dict, in_place: bool = False):
+    """Lowercases the addresses of ``event``
+
+    Read-only documents such as raw BSON are never copied, a
+    :class:`LazyNormalizedEvent` view is returned instead
+
+    :param in_place: modify ``event`` rather than copying it
+    """
+    if NORMALIZED_KEY in event:
+        return event
+    if not isinstance(event, dict):
+        return LazyNormalizedEvent(event)
+    if in_place:
+        event["address"] = event["address"].lower()
+        normalize_event_values_in_place(event["returnValues"])
+        return event
     return {
         **event,
         "address": event["address"].lower(),
@@ -0,0 +1,210 @@
+"""Background prefetching of event streams
+
+Each stream is read by its own worker thread into a bounded queue so that
+cursor round trips and decoding overlap with event processing. Items are
+transferred in chunks to keep the synchronization cost per event low.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from . import utils
+from .logger import logger
+
+DEFAULT_DEPTH = 16
+DEFAULT_CHUNK_SIZE = 512
+
+# how often a blocked worker checks if the stream has been closed
+POLL_INTERVAL = 0.1
+# how long closing a stream waits for its worker to release the cursor
+CLOSE_TIMEOUT = 5.0
+
+
+@dataclass
+class StageStats:
+    """Counters for a single prefetching stage
+
+    ``producer_stalls`` counts how often the reader found the queue full,
+    i.e. was held back by the consumer (back-pressure), while
+    ``consumer_stalls`` counts how often the consumer found the queue empty,
+    i.e. had to wait for the reader
+    """
+
+    name: str
+    items: int = 0
+    producer_stalls: int = 0
+    producer_stall_time: float = 0.0
+    consumer_stalls: int = 0
+    consumer_stall_time: float = 0.0
+
+    @property
+    def bottleneck(self) -> str:
+        if self.consumer_stall_time > self.producer_stall_time:
+            return "reader"
+        return "consumer"
+
+    def __str__(self):
+        return (
+            f"{self.name}: {self.items} items, "
+            f"reader blocked {self.producer_stalls} times "
+            f"({self.producer_stall_time:.2f}s), "
+            f"consumer waited {self.consumer_stalls} times "
+            f"({self.consumer_stall_time:.2f}s), "
+            f"bottleneck: {self.bottleneck}"
+        )
+
+
+class _Failure:
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+_END = object()
+
+
+class PrefetchingStream:
+    """Wraps ``stream`` so that it is consumed by a background thread
+
+    :param stream: iterable to prefetch
+    :param name: name used in the stats
+    :param depth: maximum number of chunks buffered in the queue
+    :param chunk_size: number of items transferred at once
+    """
+
+    def __init__(
+        self,
+        stream: Iterable,
+        name: str = "stream",
+        depth: int = DEFAULT_DEPTH,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.stats = StageStats(name)
+        self._queue = queue.Queue(maxsize=depth)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._produce, name=f"prefetch-{name}", daemon=True
+        )
+
+    def _put(self, item) -> bool:
+        if self._closed.is_set():
+            return False
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        self.stats.producer_stalls += 1
+        start = time.perf_counter()
+        try:
+            while not self._closed.is_set():
+                try:
+                    self._queue.put(item, timeout=POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.stats.producer_stall_time += time.perf_counter() - start
+
+    def _produce(self):
+        chunk = []
+        iterator = iter(self.stream)
+        try:
+            for item in iterator:
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    if not self._put(chunk):
+                        return
+                    chunk = []
+            if chunk and not self._put(chunk):
+                return
+            self._put(_END)
+        except BaseException as e:  # pylint: disable=broad-except
+            self._put(_Failure(e))
+        finally:
+            # NOTE: closed from the worker, the only thread iterating it
+            _close_iterator(iterator)
+
+    def _get(self):
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.stats.consumer_stalls += 1
+        start = time.perf_counter()
+        try:
+            return self._queue.get()
+        finally:
+            self.stats.consumer_stall_time += time.perf_counter() - start
+
+    def __iter__(self) -> Iterator:
+        self._thread.start()
+        try:
+            while True:
+                chunk = self._get()
+                if chunk is _END:
+                    return
+                if isinstance(chunk, _Failure):
+                    raise chunk.exception
+                self.stats.items += len(chunk)
+                yield from chunk
+        finally:
+            self.close()
+
+    def close(self):
+        """Stops the worker and closes the underlying stream, e.g. a cursor"""
+        self._closed.set()
+        if not self._thread.is_alive():
+            if self._thread.ident is None:
+                _close_iterator(self.stream)
+            return
+        self._thread.join(timeout=CLOSE_TIMEOUT)
+        if self._thread.is_alive():
+            logger.warning("prefetching of %s still running", self.stats.name)
+
+
+def _close_iterator(iterator):
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+
+class Pipeline:
+    """Prefetches each of ``streams`` in its own worker and merges them
+
+    :param streams: sorted streams, indexed by name
+    :param depth: maximum number of chunks buffered for each stream
+    """
+
+    def __init__(
+        self,
+        streams: Dict[str, Iterable],
+        depth: int = DEFAULT_DEPTH,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self.streams = [
+            PrefetchingStream(stream, name=name, depth=depth, chunk_size=chunk_size)
+            for name, stream in streams.items()
+        ]
+
+    @property
+    def stats(self) -> List[StageStats]:
+        return [stream.stats for stream in self.streams]
+
+    def merge(self, key: Callable) -> Iterable:
+        return utils.merge_sorted_streams(*self.streams, key=key)
+
+    def close(self):
+        for stream in self.streams:
+            stream.close()
+
+    def log_stats(self):
+        for stats in self.stats:
+            logger.info("pipeline %s", stats)
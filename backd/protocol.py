@@ -1,13 +1,44 @@
 from abc import ABC, abstractmethod
-from typing import Iterable
+import itertools
+from typing import Dict, Iterable, List, Tuple, Union
 
+from . import utils
 from .base_factory import BaseFactory
-from .entities import State
+from .entities import State, event_position
 from .event_processor import Processor
+from .event_source import EventSource, get_source
 from .hook import Hooks
+from .relevance import EventInterest
+
+
+def skip_until(
+    events: Iterable[dict], resume_token: Tuple[int, int, int] = None
+) -> Iterable[dict]:
+    """Skips the events of the sorted stream ``events`` up to ``resume_token``"""
+    if resume_token is None:
+        return events
+    block, transaction_index, log_index = resume_token
+    position = event_position(
+        {
+            "blockNumber": block,
+            "transactionIndex": transaction_index,
+            "logIndex": log_index,
+        }
+    )
+    return itertools.dropwhile(lambda e: event_position(e) <= position, events)
 
 
 class Protocol(ABC, BaseFactory):
+    """Replays the events of a protocol
+
+    :param source: where the events are read from, either an
+        :class:`EventSource` or its registered name, defaults to
+        ``settings.EVENT_SOURCE``
+    """
+
+    def __init__(self, source: Union[str, EventSource] = None):
+        self.source = get_source(source)
+
     @abstractmethod
     def create_processor(self, hooks: Hooks = None) -> Processor:
         pass
@@ -17,14 +48,60 @@ class Protocol(ABC, BaseFactory):
         pass
 
     @abstractmethod
-    def count_events(self, min_block: int = None, max_block: int = None) -> int:
-        pass
+    def count_events(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> int:
+        """Counts the events that :meth:`iterate_events` would return,
+        ``None`` if they cannot be counted without reading all of them
+        """
 
     @abstractmethod
+    def iterate_streams(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        fields: Iterable[str] = None,
+        interests: List[EventInterest] = None,
+        resume_token: Tuple[int, int, int] = None,
+    ) -> Dict[str, Iterable[dict]]:
+        """Returns the streams of events in the given block range, indexed
+        by name. Each stream must be sorted by ``PointInTime``
+
+        :param lazy: only decode the fields actually used by the processor
+        :param batch_size: number of events fetched per round trip
+        :param fields: extra event fields required by the hooks
+        :param interests: only return the events matching one of these,
+            see :mod:`backd.relevance`
+        :param resume_token: only return the events strictly after this
+            ``(block, transaction, log)`` position, e.g. to continue a replay
+        """
+
     def iterate_events(
-        self, min_block: int = None, max_block: int = None
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        fields: Iterable[str] = None,
+        interests: List[EventInterest] = None,
+        resume_token: Tuple[int, int, int] = None,
     ) -> Iterable[dict]:
-        pass
+        """Iterates over all the events in the given block range, in order"""
+        streams = self.iterate_streams(
+            min_block=min_block,
+            max_block=max_block,
+            lazy=lazy,
+            batch_size=batch_size,
+            fields=fields,
+            interests=interests,
+            resume_token=resume_token,
+        )
+        return utils.merge_sorted_streams(*streams.values(), key=event_position)
 
     @abstractmethod
     def get_plots(self):
@@ -1 +1,28 @@
-from .compound.protocol import CompoundProtocol
+from ..hook import Hook
+from ..protocol import Protocol
+
+# NOTE: protocols and their hooks are only imported when used, importing them
+# loads the database and numerical libraries
+COMPOUND_PROTOCOLS = {
+    "compound": "CompoundProtocol",
+    "compound-parquet": "ParquetCompoundProtocol",
+    "compound-canonical": "CanonicalCompoundProtocol",
+    "compound-recorded": "RecordedCompoundProtocol",
+    "compound-dumps": "DumpCompoundProtocol",
+}
+COMPOUND_HOOKS = {
+    "borrowers": "Borrowers",
+    "suppliers": "Suppliers",
+    "supply-borrow": "SupplyBorrow",
+    "leverage-spirals": "LeverageSpirals",
+    "users-borrow-supply": "UsersBorrowSupply",
+    "users-borrow-supply-sensitivity": "UsersBorrowSupplySensitivity",
+    "account-history": "AccountHistory",
+    "liquidation-stats": "LiquidationAmounts",
+    "liquidation-with-time": "LiquidationAmountsWithTime",
+}
+
+for _name, _class_name in COMPOUND_PROTOCOLS.items():
+    Protocol.register_lazy(_name, f"backd.protocols.compound.protocol:{_class_name}")
+for _name, _class_name in COMPOUND_HOOKS.items():
+    Hook.register_lazy(_name, f"backd.protocols.compound.hooks:{_class_name}")
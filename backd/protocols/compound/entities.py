@@ -1,13 +1,14 @@
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Dict, List, Tuple, Union
+from typing import Callable, Dict, List, Tuple, Union
 
-from ...entities import Market, MarketUser, State
+from ...entities import Market, MarketUserView, State
+from ...event_source import EventSource
 from ...tokens.dai.dsr import DSR
-from . import constants
+from . import constants, exponential
 from .interest_rate_models import InterestRateModel
 
-EXP_SCALE = 10 ** 18
+EXP_SCALE = exponential.EXP_SCALE
 
 
 class InterestRateModels:
@@ -69,7 +70,8 @@ class CDaiMarket(Market):
 class CompoundState(State):
     protocol_name: str = "compound"
     dsr: DSR = None
-    close_factor: Decimal = Decimal("0")
+    # mantissa scaled by 1e18
+    close_factor: int = 0
     interest_rate_models: InterestRateModels = None
 
     def __post_init__(self):
@@ -79,53 +81,108 @@ class CompoundState(State):
         if self.interest_rate_models is None:
             self.interest_rate_models = InterestRateModels(self.dsr)
 
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop("_derived_values", None)
+        return state
+
+    def __setstate__(self, state: dict):
+        super().__setstate__(state)
+        # states pickled when factors were decimals
+        if isinstance(self.close_factor, Decimal):
+            self.close_factor = exponential.to_mantissa(self.close_factor)
+
     @classmethod
-    def create(cls):
-        return cls(dsr=DSR.create())
+    def create(cls, dsr: DSR = None, source: Union[str, EventSource] = None):
+        if dsr is None:
+            dsr = DSR.create(source=source)
+        return cls(dsr=dsr)
 
-    def get_user_positions(self, user: str) -> List[Tuple[Market, MarketUser]]:
+    def get_user_positions(self, user: str) -> List[Tuple[Market, MarketUserView]]:
         positions = []
         for market in self.markets:
-            market_user = market.users[user]
-            if (
-                market_user.balances.total_borrowed > 0
-                or market_user.balances.token_balance > 0
+            users = market.users
+            row = users.find_row(user)
+            if row is not None and (
+                users.total_borrowed[row] > 0 or users.token_balances[row] > 0
             ):
-                positions.append((market, market_user))
+                positions.append((market, users[user]))
         return positions
 
+    def _get_cached(self, key: tuple, market: Market, compute: Callable):
+        """Returns the value of ``compute`` cached until ``market`` or the
+        oracles change, see :meth:`Market.touch` and :meth:`Oracles.touch`
+        """
+        stamp = (market.version, self.oracles.version, self.oracles.current_address)
+        cache = self.__dict__.setdefault("_derived_values", {})
+        cached = cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        value = compute()
+        cache[key] = (stamp, value)
+        return value
+
+    def get_underlying_price(self, market: Union[Market, str]) -> int:
+        """Price of the underlying token of ``market`` given by the current
+        oracle, cached per market
+        """
+        if isinstance(market, str):
+            try:
+                market = self.markets.find_by_address(market)
+            except ValueError:
+                return self.oracles.current.get_underlying_price(market)
+        return self._get_cached(
+            ("price", market.address),
+            market,
+            lambda: self.oracles.current.get_underlying_price(market.address),
+        )
+
+    def _compute_tokens_to_denom(
+        self, market: Market, underlying_to_usd: int, include_collateral_factor: bool
+    ) -> int:
+        """Value of a cToken as computed by the comptroller, see
+        ``Comptroller.getHypotheticalAccountLiquidityInternal``
+        """
+        exchange_rate = market.underlying_exchange_rate
+        if include_collateral_factor:
+            return exponential.mul_exp3(
+                market.collateral_factor, exchange_rate, underlying_to_usd
+            )
+        return exponential.mul_exp(exchange_rate, underlying_to_usd)
+
     def compute_user_position(
         self, user: str, include_collateral_factor: bool = True
     ) -> (int, int):
         sum_collateral = 0
         sum_borrows = 0
+        price_ratios = self.extra.get(constants.PRICE_RATIOS_KEY, {})
 
         for market, market_user in self.get_user_positions(user):
             user_balances = market_user.balances
-            exchange_rate = market.underlying_exchange_rate
-            collateral_factor = market.collateral_factor
-            underlying_to_usd = self.oracles.current.get_underlying_price(
-                market.address
-            )
+            underlying_to_usd = self.get_underlying_price(market)
 
             # allow to simulate prices
-            if (
-                constants.PRICE_RATIOS_KEY in self.extra
-                and market.address in self.extra[constants.PRICE_RATIOS_KEY]
-            ):
-                price_ratio = self.extra[constants.PRICE_RATIOS_KEY][market.address]
-                underlying_to_usd = round(price_ratio * underlying_to_usd)
-
-            ctoken_to_underlying = Decimal(exchange_rate / EXP_SCALE)
-            if include_collateral_factor:
-                ctoken_to_underlying *= collateral_factor
-
-            ctokens_to_usd = round(ctoken_to_underlying * underlying_to_usd)
-            sum_collateral += ctokens_to_usd * user_balances.token_balance // EXP_SCALE
-            sum_borrows += (
-                underlying_to_usd
-                * market_user.borrowed_at(market.borrow_index)
-                // EXP_SCALE
+            if market.address in price_ratios:
+                underlying_to_usd = exponential.mul_scalar_truncate(
+                    price_ratios[market.address], underlying_to_usd
+                )
+                tokens_to_denom = self._compute_tokens_to_denom(
+                    market, underlying_to_usd, include_collateral_factor
+                )
+            else:
+                tokens_to_denom = self._get_cached(
+                    ("tokens_to_denom", market.address, include_collateral_factor),
+                    market,
+                    lambda: self._compute_tokens_to_denom(
+                        market, underlying_to_usd, include_collateral_factor
+                    ),
+                )
+
+            sum_collateral += exponential.mul_scalar_truncate(
+                tokens_to_denom, user_balances.token_balance
+            )
+            sum_borrows += exponential.mul_scalar_truncate(
+                underlying_to_usd, market_user.borrowed_at(market.borrow_index)
             )
 
         return (sum_collateral, sum_borrows)
@@ -133,7 +190,7 @@ class CompoundState(State):
     def compute_borrows_per_market(self) -> Dict[str, float]:
         borrows = {}
         for market in self.markets:
-            oracle_price = self.oracles.current.get_underlying_price(market.address)
+            oracle_price = self.get_underlying_price(market)
             borrows[market.address] = (
                 oracle_price * market.balances.total_borrowed / EXP_SCALE
             )
@@ -145,7 +202,7 @@ class CompoundState(State):
     def compute_underlying_per_market(self) -> Dict[str, float]:
         underlying = {}
         for market in self.markets:
-            oracle_price = self.oracles.current.get_underlying_price(market.address)
+            oracle_price = self.get_underlying_price(market)
             underlying[market.address] = oracle_price * market.get_cash() / EXP_SCALE
         return underlying
 
@@ -165,13 +222,15 @@ class CompoundState(State):
     def ctoken_to_usd(self, amount: int, market: Union[Market, str]) -> float:
         if isinstance(market, str):
             market = self.markets.find_by_address(market)
-        exchange_rate = market.underlying_exchange_rate
-        oracle_price = self.oracles.current.get_underlying_price(market.address)
-        tokens_to_usd = exchange_rate * oracle_price / EXP_SCALE
+        tokens_to_usd = self._get_cached(
+            ("tokens_to_usd", market.address),
+            market,
+            lambda: exponential.mul_exp(
+                market.underlying_exchange_rate, self.get_underlying_price(market)
+            ),
+        )
         return tokens_to_usd * amount / EXP_SCALE
 
     def token_to_usd(self, amount: int, market: Union[Market, str]) -> float:
-        if isinstance(market, Market):
-            market = market.address
-        oracle_price = self.oracles.current.get_underlying_price(market)
+        oracle_price = self.get_underlying_price(market)
         return oracle_price * amount / EXP_SCALE
@@ -0,0 +1,48 @@
+"""Fixed-point arithmetic of Compound's ``Exponential`` contract
+
+Factors, exchange rates and prices are kept as integer mantissas scaled by
+``EXP_SCALE``, as on chain, and combined with the same rounding so that the
+values computed by the replays match the ones of the contracts.
+"""
+
+from decimal import Decimal
+from typing import Union
+
+EXP_SCALE = 10 ** 18
+HALF_EXP_SCALE = EXP_SCALE // 2
+
+
+def to_mantissa(value: Union[Decimal, int, str, float]) -> int:
+    """Converts a factor, e.g. ``"0.75"``, to its mantissa"""
+    return int(Decimal(value) * EXP_SCALE)
+
+
+def to_decimal(mantissa: int) -> Decimal:
+    return Decimal(mantissa) / EXP_SCALE
+
+
+def get_exp(num: int, denom: int) -> int:
+    """Mantissa of ``num / denom``"""
+    return num * EXP_SCALE // denom
+
+
+def truncate(mantissa: int) -> int:
+    return mantissa // EXP_SCALE
+
+
+def mul_exp(a: int, b: int) -> int:
+    """Product of two mantissas, rounded half up"""
+    return (a * b + HALF_EXP_SCALE) // EXP_SCALE
+
+
+def mul_exp3(a: int, b: int, c: int) -> int:
+    return mul_exp(mul_exp(a, b), c)
+
+
+def mul_scalar_truncate(a: int, scalar: int) -> int:
+    """Integer part of ``scalar`` multiplied by the mantissa ``a``"""
+    return a * scalar // EXP_SCALE
+
+
+def mul_scalar_truncate_add(a: int, scalar: int, addend: int) -> int:
+    return a * scalar // EXP_SCALE + addend
@@ -1,20 +1,23 @@
+import numpy as np
 import pandas as pd
 from .entities import CompoundState
-from ... import db
+from ...event_source import get_source
 from . import constants
 from .hooks import UsersBorrowSupply
 
 
 def export_borrow_supply_over_time(args: dict):
-    block_dates = db.get_block_dates()
+    block_timestamps = get_source().get_block_timestamps()
     state = CompoundState.load(args["state"])
     users_borrow_supply = state.extra[UsersBorrowSupply.extra_key]
 
-    blocks = [block for block in users_borrow_supply if block in block_dates]
+    blocks = np.fromiter(users_borrow_supply, dtype=np.int64)
+    blocks = blocks[block_timestamps.contains(blocks)]
+    dates = block_timestamps.to_datetime_index(blocks)
     threshold = args["threshold"]
     liquidable = []
 
-    for block in blocks:
+    for block, date in zip(blocks.tolist(), dates):
         block_total = 0
         users = users_borrow_supply[block]
         for supply, borrow in users.values():
@@ -24,7 +27,7 @@ def export_borrow_supply_over_time(args: dict):
             liquidable.append(
                 {
                     "block": block,
-                    "timestamp": block_dates[block],
+                    "timestamp": date,
                     "value": block_total,
                 }
             )
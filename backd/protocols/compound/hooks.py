@@ -5,10 +5,10 @@ from dataclasses import dataclass, field
 from decimal import Decimal
 from typing import Dict, Set, Tuple, Union
 
-import pandas as pd
 import stringcase
 
 from ...hook import Hook
+from . import exponential
 from .constants import CETH_ADDRESS, PRICE_RATIOS_KEY
 from .entities import CompoundState
 
@@ -32,8 +32,8 @@ class Borrowers(Hook):
         self.hook_state = self.__class__.HookState()
 
     def global_start(self, state: CompoundState):
-        if self.extra_key not in state.extra:
-            state.extra[self.extra_key] = self.hook_state
+        # NOTE: a resumed state already holds the results recorded so far
+        self.hook_state = state.extra.setdefault(self.extra_key, self.hook_state)
 
     def event_end(self, state: CompoundState, event: dict):
         if event["event"] not in ["RepayBorrow", "Borrow"]:
@@ -76,8 +76,8 @@ class Suppliers(Hook):
         self.hook_state = self.__class__.HookState()
 
     def global_start(self, state: CompoundState):
-        if self.extra_key not in state.extra:
-            state.extra[self.extra_key] = self.hook_state
+        # NOTE: a resumed state already holds the results recorded so far
+        self.hook_state = state.extra.setdefault(self.extra_key, self.hook_state)
 
     def event_end(self, state: CompoundState, event: dict):
         args = event["returnValues"]
@@ -112,6 +112,8 @@ class SupplyBorrow(Hook):
         self.supply_borrows = []
 
     def global_end(self, state: CompoundState):
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
         state.extra[self.extra_key] = pd.DataFrame(self.supply_borrows)
 
     def block_end(self, state: CompoundState, block_number: int):
@@ -171,16 +173,19 @@ class LeverageSpirals(Hook):
         self.users_stats: Dict[str, LeverageSpirals.UserStats] = defaultdict(
             LeverageSpirals.UserStats
         )
+        self.handlers = {
+            name: getattr(self, f"_handle_{stringcase.snakecase(name)}")
+            for name in self.HANDLED_EVENTS
+        }
 
     def global_start(self, state: CompoundState):
-        if self.extra_key not in state.extra:
-            state.extra[self.extra_key] = self.users_stats
+        # NOTE: a resumed state already holds the results recorded so far
+        self.users_stats = state.extra.setdefault(self.extra_key, self.users_stats)
 
     def event_start(self, state: CompoundState, event: dict):
-        if event["event"] not in self.HANDLED_EVENTS:
-            return
-        normalized_event = stringcase.snakecase(event["event"])
-        getattr(self, f"_handle_{normalized_event}")(state, event)
+        handler = self.handlers.get(event["event"])
+        if handler is not None:
+            handler(state, event)
 
     def _handle_mint(self, state: CompoundState, event: dict):
         user_stats = self._get_user_stats("minter", event)
@@ -251,8 +256,8 @@ class UsersBorrowSupply(Hook):
         self.hook_state: Dict[int, Dict[str, Tuple[int, int]]] = OrderedDict()
 
     def global_start(self, state: CompoundState):
-        if self.extra_key not in state.extra:
-            state.extra[self.extra_key] = self.hook_state
+        # NOTE: a resumed state already holds the results recorded so far
+        self.hook_state = state.extra.setdefault(self.extra_key, self.hook_state)
 
     def block_end(self, state: CompoundState, block_number: int):
         if block_number % 100 != 0:
@@ -271,7 +276,9 @@ class UsersBorrowSupplySensitivity(UsersBorrowSupply):
         super().__init__()
         if ratios is None:
             ratios = {}
-        ratios = {market: Decimal(ratio) for market, ratio in ratios.items()}
+        ratios = {
+            market: exponential.to_mantissa(ratio) for market, ratio in ratios.items()
+        }
         self.price_ratios = ratios
 
     def global_start(self, state: CompoundState):
@@ -279,14 +286,74 @@ class UsersBorrowSupplySensitivity(UsersBorrowSupply):
         state.extra[self.ratio_key] = self.price_ratios
 
 
+@Hook.register("account-history")
+class AccountHistory(Hook):
+    """Records the collateral and borrows of ``account`` in USD after each
+    block where it takes part in an event, and at least every ``interval``
+    blocks once it has a position
+    """
+
+    extra_key = "account-history"
+
+    def __init__(self, account: str, interval: int = None):
+        self.account = account.lower()
+        self.interval = interval
+        self.history = []
+        self.touched = False
+        self.last_block = None
+
+    def global_start(self, state: CompoundState):
+        # NOTE: a resumed state already holds the results recorded so far
+        self.history = state.extra.setdefault(self.extra_key, self.history)
+        if self.history:
+            self.last_block = self.history[-1]["block"]
+
+    def event_end(self, state: CompoundState, event: dict):
+        if self.account in event["returnValues"].values():
+            self.touched = True
+
+    def block_end(self, state: CompoundState, block_number: int):
+        if not self.touched and not self._is_sampled(block_number):
+            return
+        if state.oracles.current_address is None:
+            # NOTE: positions can only be valued once a price oracle is set
+            return
+        self.touched = False
+        self.last_block = block_number
+        collateral, borrows = state.compute_user_position(self.account)
+        supply, _borrows = state.compute_user_position(
+            self.account, include_collateral_factor=False
+        )
+        self.history.append(
+            {
+                "block": block_number,
+                "timestamp": state.timestamp,
+                "supply": supply,
+                "collateral": collateral,
+                "borrows": borrows,
+                "ratio": collateral / borrows if borrows else None,
+            }
+        )
+
+    def _is_sampled(self, block_number: int) -> bool:
+        return (
+            self.interval is not None
+            and self.last_block is not None
+            and block_number - self.last_block >= self.interval
+        )
+
+
 @Hook.register("liquidation-stats")
 class LiquidationAmounts(Hook):
     extra_key = "liquidation-stats"
+    required_fields = ["transactionHash"]
 
     def __init__(self):
         self.liquidations = []
 
     def global_end(self, state: CompoundState):
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
         state.extra[self.extra_key] = pd.DataFrame(self.liquidations)
 
     def get_liquidation(self, state: CompoundState, event: dict):
@@ -1,10 +1,10 @@
 from abc import ABC, abstractmethod
-from decimal import Decimal
 
 import stringcase
 
 from ...base_factory import BaseFactory
 from ...tokens.dai.dsr import DSR
+from ...tokens.dai.rates import RAY
 
 EXP_SCALE = 10 ** 18
 
@@ -235,8 +235,7 @@ class DAIInterestRateModel(JumpRateModel):
 
     def dsr_per_block(self, block_number: int):
         dsr = self.dsr.get(block_number)
-        scaled = (dsr - Decimal(10) ** 27) // Decimal(10) ** 9
-        return int(scaled * 15)  # 15 seconds per block
+        return (dsr - RAY) // 10 ** 9 * 15  # 15 seconds per block
 
 
 @InterestRateModel.register("0x000000007675b5e1da008f037a0800b309e0c493")
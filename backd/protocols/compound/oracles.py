@@ -1,5 +1,8 @@
+from collections import defaultdict
 from dataclasses import dataclass
 from enum import Enum
+from functools import partial
+from typing import Callable, Dict, List
 
 from ...entities import Oracle
 from ...logger import logger
@@ -7,11 +10,18 @@ from . import constants
 
 MARKETS_BY_CTOKEN = {m["address"]: m for m in constants.MARKETS}
 
+CTOKENS_BY_SYMBOL: Dict[str, List[str]] = defaultdict(list)
+for _market in constants.MARKETS:
+    CTOKENS_BY_SYMBOL[_market["underlying_symbol"]].append(_market["address"])
+
 USDC_ORACLE_KEY = "0x0000000000000000000000000000000000000001"
 DAI_ORACLE_KEY = "0x0000000000000000000000000000000000000002"
 
 ETH_BASE_UNIT = 10 ** 18
 
+# returns the price of an underlying token, before conversion to USD
+PriceResolver = Callable[[], int]
+
 
 def is_token(ctoken: str, symbol: str) -> bool:
     ctoken = ctoken.lower()
@@ -27,6 +37,13 @@ def find_market(symbol: str) -> dict:
     raise ValueError(f"no such token: {symbol}")
 
 
+def set_resolver(
+    resolvers: Dict[str, PriceResolver], symbol: str, resolver: PriceResolver
+):
+    for ctoken in CTOKENS_BY_SYMBOL[symbol]:
+        resolvers[ctoken] = resolver
+
+
 _oracle_prices = {}
 
 ETHUSDT_KEY = "ethusdt"
@@ -34,20 +51,36 @@ ETHUSDT_KEY = "ethusdt"
 
 @Oracle.register("0x02557a5e05defeffd4cae6d83ea3d173b272c904")
 class PriceOracleV1(Oracle):
+    """Each oracle version resolves the price of a cToken differently.
+    Instead of going through the checks of every version on each lookup,
+    :meth:`build_resolvers` compiles them once into a table from cToken
+    address to resolver, subclasses overriding the entries of their parent
+    """
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, prices=_oracle_prices, **kwargs)
+        self.resolvers = self.build_resolvers()
+
+    def build_resolvers(self) -> Dict[str, PriceResolver]:
+        return {
+            ctoken: partial(
+                self._get_listed_price, ctoken, market["underlying_address"].lower()
+            )
+            for ctoken, market in MARKETS_BY_CTOKEN.items()
+        }
 
     def _finalize_underlying_price(self, price: int, usd_price: bool):
         if usd_price:
-            return int(price * self.get_price(ETHUSDT_KEY))
+            return int(price * self.prices.get(ETHUSDT_KEY, 0))
         return price
 
     def get_underlying_price(self, ctoken: str, usd_price: bool = True) -> int:
-        if not self.is_listed(ctoken):
-            return 0
-        market = MARKETS_BY_CTOKEN.get(ctoken.lower(), {})
-        price = self.get_price(market.get("underlying_address", ""))
-        return self._finalize_underlying_price(price, usd_price=usd_price)
+        resolver = self.resolvers.get(ctoken)
+        if resolver is None:
+            resolver = self.resolvers.get(ctoken.lower())
+            if resolver is None:
+                return 0
+        return self._finalize_underlying_price(resolver(), usd_price=usd_price)
 
     def is_listed(self, ctoken: str) -> bool:
         ctoken = ctoken.lower()
@@ -57,43 +90,54 @@ class PriceOracleV1(Oracle):
         except ValueError:
             return False
 
+    def _get_listed_price(self, ctoken: str, underlying: str) -> int:
+        if not self.is_listed(ctoken):
+            return 0
+        return self.prices.get(underlying, 0)
+
+    def _get_fixed_price(self, price: int) -> int:
+        return price
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["resolvers"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.resolvers = self.build_resolvers()
+
 
 @Oracle.register("0x28f829f473638ba82710c8404a778f9a66029aad")
 class PriceOracleV11(PriceOracleV1):
-    def get_underlying_price(self, ctoken: str, usd_price: bool = True) -> int:
-        if is_token(ctoken, "ETH"):
-            return self._finalize_underlying_price(ETH_BASE_UNIT, usd_price=usd_price)
-        return super().get_underlying_price(ctoken, usd_price=usd_price)
+    def build_resolvers(self) -> Dict[str, PriceResolver]:
+        resolvers = super().build_resolvers()
+        set_resolver(resolvers, "ETH", partial(self._get_fixed_price, ETH_BASE_UNIT))
+        return resolvers
 
 
 @Oracle.register("0xe7664229833ae4abf4e269b8f23a86b657e2338d")
 class PriceOracleV12(PriceOracleV1):
-    def get_underlying_price(self, ctoken: str, usd_price: bool = True) -> int:
-        if is_token(ctoken, "ETH"):
-            return self._finalize_underlying_price(ETH_BASE_UNIT, usd_price=usd_price)
-        if is_token(ctoken, "USDC"):
-            price = super().get_price(USDC_ORACLE_KEY)
-            return self._finalize_underlying_price(price, usd_price=usd_price)
-        return super().get_underlying_price(ctoken, usd_price=usd_price)
+    def build_resolvers(self) -> Dict[str, PriceResolver]:
+        resolvers = super().build_resolvers()
+        set_resolver(resolvers, "ETH", partial(self._get_fixed_price, ETH_BASE_UNIT))
+        set_resolver(resolvers, "USDC", partial(self.get_price, USDC_ORACLE_KEY))
+        return resolvers
 
 
 @Oracle.register("0x2c9e6bdaa0ef0284eecef0e0cc102dcdeae4887e")
 class PriceOracleV13(PriceOracleV1):
     maker_usd_oracle_key = "0x89d24a6b4ccb1b6faa2625fe562bdd9a23260359"
 
-    def get_underlying_price(self, ctoken: str, usd_price: bool = True) -> int:
-        if is_token(ctoken, "ETH"):
-            return self._finalize_underlying_price(ETH_BASE_UNIT, usd_price=usd_price)
+    def build_resolvers(self) -> Dict[str, PriceResolver]:
+        resolvers = super().build_resolvers()
+        set_resolver(resolvers, "ETH", partial(self._get_fixed_price, ETH_BASE_UNIT))
+        set_resolver(resolvers, "USDC", self._get_maker_usdc_price)
+        set_resolver(resolvers, "SAI", self._compute_dai_price)
+        return resolvers
 
-        if is_token(ctoken, "USDC"):
-            price = super().get_price(self.maker_usd_oracle_key) * 10 ** 12
-            return self._finalize_underlying_price(price, usd_price=usd_price)
-
-        if is_token(ctoken, "SAI"):
-            price = self._compute_dai_price()
-            return self._finalize_underlying_price(price, usd_price=usd_price)
-
-        return super().get_underlying_price(ctoken, usd_price=usd_price)
+    def _get_maker_usdc_price(self) -> int:
+        return self.get_price(self.maker_usd_oracle_key) * 10 ** 12
 
     def _compute_dai_price(self) -> int:
         maker_usd_price = super().get_price(self.maker_usd_oracle_key)
@@ -112,11 +156,11 @@ class PriceOracleV13(PriceOracleV1):
 
 @Oracle.register("0x1d8aedc9e924730dd3f9641cdb4d1b92b848b4bd")
 class PriceOracleV14(PriceOracleV13):
-    def get_underlying_price(self, ctoken: str, usd_price: bool = True) -> int:
-        if is_token(ctoken, "DAI") or is_token(ctoken, "SAI"):
-            price = self._compute_dai_price()
-            return self._finalize_underlying_price(price, usd_price=usd_price)
-        return super().get_underlying_price(ctoken)
+    def build_resolvers(self) -> Dict[str, PriceResolver]:
+        resolvers = super().build_resolvers()
+        set_resolver(resolvers, "DAI", self._compute_dai_price)
+        set_resolver(resolvers, "SAI", self._compute_dai_price)
+        return resolvers
 
 
 _sai_prices = {}
@@ -124,26 +168,18 @@ _sai_prices = {}
 
 @Oracle.register("0xda17fbeda95222f331cb1d252401f4b44f49f7a0")
 class PriceOracleV15(PriceOracleV1):
-    def get_underlying_price(self, ctoken: str, usd_price: bool = True) -> int:
-        if is_token(ctoken, "ETH"):
-            return self._finalize_underlying_price(ETH_BASE_UNIT, usd_price=usd_price)
-
-        if is_token(ctoken, "USDC"):
-            price = self.get_price(USDC_ORACLE_KEY)
-            return self._finalize_underlying_price(price, usd_price=usd_price)
-
-        if is_token(ctoken, "DAI"):
-            price = self.get_price(DAI_ORACLE_KEY)
-            return self._finalize_underlying_price(price, usd_price=usd_price)
-
-        if is_token(ctoken, "SAI"):
-            if self.sai_price > 0:
-                price = self.sai_price
-            else:
-                price = self.get_price(DAI_ORACLE_KEY)
-            return self._finalize_underlying_price(price, usd_price=usd_price)
-
-        return super().get_underlying_price(ctoken, usd_price=usd_price)
+    def build_resolvers(self) -> Dict[str, PriceResolver]:
+        resolvers = super().build_resolvers()
+        set_resolver(resolvers, "ETH", partial(self._get_fixed_price, ETH_BASE_UNIT))
+        set_resolver(resolvers, "USDC", partial(self.get_price, USDC_ORACLE_KEY))
+        set_resolver(resolvers, "DAI", partial(self.get_price, DAI_ORACLE_KEY))
+        set_resolver(resolvers, "SAI", self._get_sai_price)
+        return resolvers
+
+    def _get_sai_price(self) -> int:
+        if self.sai_price > 0:
+            return self.sai_price
+        return self.get_price(DAI_ORACLE_KEY)
 
     @property
     def sai_price(self):
@@ -156,11 +192,10 @@ class PriceOracleV15(PriceOracleV1):
 
 @Oracle.register("0xddc46a3b076aec7ab3fc37420a8edd2959764ec4")
 class PriceOracleV16(PriceOracleV15):
-    def get_underlying_price(self, ctoken: str, usd_price: bool = True) -> int:
-        if is_token(ctoken, "USDT"):
-            price = self.get_price(USDC_ORACLE_KEY)
-            return self._finalize_underlying_price(price, usd_price=usd_price)
-        return super().get_underlying_price(ctoken, usd_price=usd_price)
+    def build_resolvers(self) -> Dict[str, PriceResolver]:
+        resolvers = super().build_resolvers()
+        set_resolver(resolvers, "USDT", partial(self.get_price, USDC_ORACLE_KEY))
+        return resolvers
 
 
 class PriceSource(Enum):
@@ -306,9 +341,11 @@ class UniswapAnchorView(Oracle):
     def get_underlying_price(self, ctoken: str, usd_price: bool = True) -> int:
         # Comptroller needs prices in the format: ${raw price} * 1e(36 - baseUnit)
         # Since the prices in this view have 6 decimals, we must scale them by 1e(36 - 6 - baseUnit)
-        config = self._config_by_ctoken.get(ctoken.lower())
-        if not config:
-            return 0
+        config = self._config_by_ctoken.get(ctoken)
+        if config is None:
+            config = self._config_by_ctoken.get(ctoken.lower())
+            if config is None:
+                return 0
         price = 10 ** 30 * self._get_price(config) // config.base_unit
         if not usd_price:
             price /= self.get_price(constants.ETH_ADDRESS)
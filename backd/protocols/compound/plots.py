@@ -7,8 +7,11 @@ import pandas as pd
 from cycler import cycler
 from matplotlib.ticker import FuncFormatter
 
-from ... import constants, db
+from ... import constants
+from ...event_source import get_source
 from ...plot_utils import COLORS, DEFAULT_PALETTE
+from ...tokens.dai import rates
+from ...tokens.dai import utils as dai_utils
 from .entities import CompoundState
 from .hooks import (
     Borrowers,
@@ -27,19 +30,16 @@ mpl.rcParams["font.size"] = 14
 
 def plot_suppliers_borrowers_over_time(args: dict):
     state = CompoundState.load(args["state"])
-    block_dates = db.get_block_dates()
+    block_timestamps = get_source().get_block_timestamps()
 
     def get_users(history):
-        return [
-            (block, count)
-            for block, count in history.items()
-            if count > 0 and block in block_dates
-        ]
+        users = [(block, count) for block, count in history.items() if count > 0]
+        users = np.array(users, dtype=np.int64).reshape(-1, 2)
+        return users[block_timestamps.contains(users[:, 0])]
 
     def get_xy(users, interval):
-        x = [block_dates[v[0]] for v in users[::interval]]
-        y = [v[1] for v in users[::interval]]
-        return x, y
+        users = users[::interval]
+        return block_timestamps.to_datetime_index(users[:, 0]), users[:, 1]
 
     suppliers = get_users(state.extra[Suppliers.extra_key].historical_count)
     borrowers = get_users(state.extra[Borrowers.extra_key].historical_count)
@@ -119,11 +119,13 @@ def plot_liquidable_over_time(args: dict):
 
 def plot_supply_borrow_ratios_over_time(args: dict):
     state = CompoundState.load(args["state"])
-    block_dates = db.get_block_dates()
+    block_timestamps = get_source().get_block_timestamps()
     users_borrow_supply = state.extra[UsersBorrowSupply.extra_key]
 
-    blocks = [block for block in users_borrow_supply if block in block_dates]
-    x = [block_dates[block] for block in blocks]
+    blocks = np.fromiter(users_borrow_supply, dtype=np.int64)
+    blocks = blocks[block_timestamps.contains(blocks)]
+    x = block_timestamps.to_datetime_index(blocks)
+    blocks = blocks.tolist()
 
     thresholds = args["thresholds"]
     labels = ["< {0:.2f}%".format(t * 100) for t in thresholds]
@@ -166,6 +168,23 @@ def plot_supply_borrow_ratios_over_time(args: dict):
     output_plot(args.get("output"))
 
 
+def plot_dsr_apy(args: dict):
+    block_timestamps = get_source().get_block_timestamps()
+    dsr_index = rates.get_dsr_index()
+
+    blocks = np.asarray(block_timestamps.blocks[:: args["interval"]])
+    blocks = blocks[blocks >= dsr_index.blocks[0]]
+    # NOTE: a single lookup and APY computation for the whole series
+    apys = dai_utils.compute_apys(dsr_index.get_many(blocks))
+
+    plt.xticks(rotation=45)
+    plt.xlabel("Date")
+    plt.ylabel("DSR APY (%)")
+    plt.plot(block_timestamps.to_datetime_index(blocks), (apys - 1) * 100, "-")
+    plt.tight_layout()
+    output_plot(args.get("output"))
+
+
 def plot_liquidations_over_time(args: dict):
     state = CompoundState.load(args["state"])
     liquidation_info = state.extra[LiquidationAmounts.extra_key]
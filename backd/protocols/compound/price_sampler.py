@@ -0,0 +1,124 @@
+"""Samples the prices returned by the Compound oracles on chain, to validate
+the emulation of the oracles in :mod:`backd.protocols.compound.oracles`
+
+Each sampled block is written as one JSON line with the prices returned by
+``getUnderlyingPrice`` for each oracle and cToken. Blocks already present in
+the output are skipped, so an interrupted sampling can be resumed by running
+it again with the same arguments.
+"""
+
+import asyncio
+import json
+import random
+from os import path
+from typing import IO, Iterable, List, Optional, Set
+
+from ...json_rpc import BatchClient, JSONRPCError
+from ...logger import logger
+
+# first 4 bytes of keccak256("getUnderlyingPrice(address)")
+GET_UNDERLYING_PRICE_SELECTOR = "0xfc57d4df"
+
+# number of blocks whose prices are fetched before being written
+DEFAULT_WINDOW = 100
+
+
+def encode_get_underlying_price(ctoken: str) -> str:
+    return GET_UNDERLYING_PRICE_SELECTOR + ctoken.lower()[2:].rjust(64, "0")
+
+
+def decode_uint(result) -> Optional[int]:
+    """Decodes the result of a call, ``None`` if the call failed or the
+    contract returned nothing, e.g. because it was not deployed yet
+    """
+    if isinstance(result, JSONRPCError) or not result or result == "0x":
+        return None
+    return int(result, 16)
+
+
+def sample_blocks(
+    first_block: int, last_block: int, count: int, seed: int = None
+) -> List[int]:
+    """Returns ``count`` sorted blocks, the same ones for a given ``seed``"""
+    rng = random.Random(seed)
+    return sorted(rng.sample(range(first_block, last_block + 1), count))
+
+
+def read_sampled_blocks(filepath: str) -> Set[int]:
+    if not path.exists(filepath):
+        return set()
+    with open(filepath) as f:
+        return {json.loads(line)["block"] for line in f if line.strip()}
+
+
+def make_calls(block: int, oracles: List[str], ctokens: List[str]) -> List[tuple]:
+    return [
+        (
+            "eth_call",
+            [{"to": oracle, "data": encode_get_underlying_price(ctoken)}, hex(block)],
+        )
+        for oracle in oracles
+        for ctoken in ctokens
+    ]
+
+
+async def fetch_prices(
+    client: BatchClient, blocks: List[int], oracles: List[str], ctokens: List[str]
+) -> List[dict]:
+    """Fetches the prices of all ``oracles`` and ``ctokens`` at each block"""
+    calls = [c for block in blocks for c in make_calls(block, oracles, ctokens)]
+    results = iter(await client.call_many(calls))
+    rows = []
+    for block in blocks:
+        prices = []
+        for oracle in oracles:
+            for ctoken in ctokens:
+                price = decode_uint(next(results))
+                if price:
+                    prices.append({"address": oracle, "asset": ctoken, "price": price})
+        rows.append({"block": block, "prices": prices})
+    return rows
+
+
+async def sample_prices(
+    client: BatchClient,
+    blocks: Iterable[int],
+    oracles: List[str],
+    ctokens: List[str],
+    output: IO,
+    window: int = DEFAULT_WINDOW,
+) -> int:
+    """Writes the prices of ``blocks`` to ``output`` in block order, one
+    window of blocks at a time, and returns the number of blocks written
+    """
+    blocks = sorted(blocks)
+    written = 0
+    for start in range(0, len(blocks), window):
+        rows = await fetch_prices(
+            client, blocks[start : start + window], oracles, ctokens
+        )
+        for row in rows:
+            print(json.dumps(row), file=output)
+        output.flush()
+        written += len(rows)
+        logger.info("progress: %s/%s", written, len(blocks))
+    return written
+
+
+def run_sampling(
+    client: BatchClient,
+    blocks: Iterable[int],
+    oracles: List[str],
+    ctokens: List[str],
+    output: str,
+    window: int = DEFAULT_WINDOW,
+) -> int:
+    """Samples the prices of the ``blocks`` missing from ``output``"""
+    done = read_sampled_blocks(output)
+    remaining = [block for block in blocks if block not in done]
+    if done:
+        logger.info("resuming, %s blocks already sampled", len(done))
+    with open(output, "a") as f:
+        return asyncio.run(
+            sample_prices(client, remaining, oracles, ctokens, f, window=window)
+        )
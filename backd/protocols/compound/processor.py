@@ -3,19 +3,51 @@
 
 # pylint: disable=no-self-use
 
-from decimal import Decimal
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set
 
 import stringcase
 
+from ... import relevance
 from ...entities import Market
 from ...event_processor import Processor
 from ...hook import Hooks
 from ...logger import logger
-from . import constants
+from ...relevance import EventInterest
+from . import constants, exponential
 from .entities import CDaiMarket
 from .entities import CompoundState as State
 
-FACTORS_DIVISOR = Decimal(10) ** constants.FACTORS_DECIMALS
+# events emitted by the market contracts themselves
+MARKET_EVENTS = {
+    "AccrueInterest",
+    "Borrow",
+    "LiquidateBorrow",
+    "Mint",
+    "NewComptroller",
+    "NewImplementation",
+    "NewMarketInterestRateModel",
+    "NewReserveFactor",
+    "Redeem",
+    "RepayBorrow",
+    "ReservesAdded",
+    "ReservesReduced",
+}
+
+# comptroller events referring to a market through their cToken argument
+MARKET_ARGUMENT_EVENTS = {
+    "MarketEntered",
+    "MarketExited",
+    "MarketListed",
+    "NewCollateralFactor",
+}
+
+# events only changing the state of the accounts taking part in them
+ACCOUNT_EVENTS = {"LiquidateBorrow", "MarketEntered", "MarketExited", "Transfer"}
+
+# names of the sender and receiver in the Transfer events of underlying tokens
+TRANSFER_FROM_KEYS = ["from", "_from", "src"]
+TRANSFER_TO_KEYS = ["to", "_to", "dst"]
 
 
 def get_any_key(obj, keys):
@@ -35,14 +67,128 @@ class CompoundProcessor(Processor):
             market["underlying_address"]: market for market in markets
         }
         super().__init__(hooks=hooks)
+        # event name -> bound handler, ``None`` for events without handler
+        self.handlers: Dict[str, Optional[Callable]] = self.build_dispatch_table()
+        # event name -> number of events processed by its handler
+        self.handler_calls: Counter = Counter()
+
+    @classmethod
+    def handled_events(cls) -> Set[str]:
+        return {
+            stringcase.pascalcase(name[len("process_") :])
+            for name in dir(cls)
+            if name.startswith("process_")
+            and name not in ("process_event", "process_events")
+        }
+
+    def build_dispatch_table(self) -> Dict[str, Optional[Callable]]:
+        return {name: self._find_handler(name) for name in self.handled_events()}
+
+    def _find_handler(self, event_name: str) -> Optional[Callable]:
+        return getattr(self, f"process_{stringcase.snakecase(event_name)}", None)
+
+    def get_interests(self, markets: List[str] = None) -> List[EventInterest]:
+        """Declares the events changing the state of ``markets``, or of all
+        the markets if not given. Transfers of underlying tokens are only
+        needed when a market is the sender or the receiver
+        """
+        handled = self.handled_events()
+        if markets is None:
+            underlyings = [
+                meta["underlying_address"] for meta in self.markets_metadata.values()
+            ]
+            market_transfers = EventInterest(
+                events=["Transfer"], excluded_addresses=underlyings
+            )
+        else:
+            market_transfers = EventInterest(events=["Transfer"], addresses=markets)
+        return [
+            EventInterest(events=self._get_global_events()),
+            EventInterest(events=sorted(MARKET_EVENTS & handled), addresses=markets),
+            EventInterest(
+                events=sorted(MARKET_ARGUMENT_EVENTS & handled),
+                arguments=None if markets is None else {"cToken": markets},
+            ),
+            market_transfers,
+            self._get_underlying_transfers(markets),
+        ]
+
+    def get_account_interests(
+        self, account: str, account_events: Iterable[dict]
+    ) -> List[EventInterest]:
+        """Declares the events needed to follow ``account``: the events in
+        which it takes part and the market-level events of the markets found
+        in ``account_events``. Events of other accounts that only change the
+        state of these accounts, such as cToken transfers, are left out
+        """
+        handled = self.handled_events()
+        markets = self.get_account_markets(account_events)
+        account_interests = relevance.account_interests(
+            account, events=(ACCOUNT_EVENTS & handled) - {"Transfer"}
+        )
+        ctoken_transfers = EventInterest(
+            events=["Transfer"],
+            addresses=markets,
+            arguments={role: [account] for role in relevance.ACCOUNT_ROLES["Transfer"]},
+        )
+        return account_interests + [
+            EventInterest(events=self._get_global_events()),
+            EventInterest(
+                events=sorted((MARKET_EVENTS - ACCOUNT_EVENTS) & handled),
+                addresses=markets,
+            ),
+            EventInterest(
+                events=sorted((MARKET_ARGUMENT_EVENTS - ACCOUNT_EVENTS) & handled),
+                arguments={"cToken": markets},
+            ),
+            ctoken_transfers,
+            self._get_underlying_transfers(markets),
+        ]
+
+    def get_account_markets(self, events: Iterable[dict]) -> List[str]:
+        """Returns the markets referred to by ``events``"""
+        known_markets = {meta["address"] for meta in self.markets_metadata.values()}
+        markets = set()
+        for event in events:
+            args = event["returnValues"]
+            for address in (event["address"], args.get("cToken")):
+                if isinstance(address, str) and address.lower() in known_markets:
+                    markets.add(address.lower())
+        return sorted(markets)
+
+    def _get_global_events(self) -> List[str]:
+        global_events = self.handled_events() - MARKET_EVENTS - MARKET_ARGUMENT_EVENTS
+        global_events.discard("Transfer")
+        return sorted(global_events)
+
+    def _get_underlying_transfers(self, markets: List[str] = None) -> EventInterest:
+        all_markets = [meta["address"] for meta in self.markets_metadata.values()]
+        underlyings = [
+            meta["underlying_address"]
+            for meta in self.markets_metadata.values()
+            if markets is None or meta["address"] in markets
+        ]
+        transfer_keys = TRANSFER_FROM_KEYS + TRANSFER_TO_KEYS
+        return EventInterest(
+            events=["Transfer"],
+            addresses=underlyings,
+            arguments={key: markets or all_markets for key in transfer_keys},
+        )
 
     def _process_event(self, state, event):
-        event_name = stringcase.snakecase(event["event"])
-        func = getattr(self, f"process_{event_name}", None)
-        if not func:
-            logger.debug("unknown event %s", event_name)
+        event_name = event["event"]
+        try:
+            func = self.handlers[event_name]
+        except KeyError:
+            # NOTE: names are only converted once, the table is built from
+            # handled_events which may not round-trip every event name
+            func = self.handlers[event_name] = self._find_handler(event_name)
+            if func is None:
+                logger.debug("unknown event %s", event_name)
+        if func is None:
             return
 
+        self.handler_calls[event_name] += 1
         try:
             func(state, event["address"], event["returnValues"])
         except Exception as e:
@@ -66,8 +212,10 @@ class CompoundProcessor(Processor):
 
     def process_new_reserve_factor(self, state: State, event_address: str, args: dict):
         market = state.markets.find_by_address(event_address)
-        factor = int(args["newReserveFactorMantissa"]) / FACTORS_DIVISOR
-        assert 0 <= factor <= 1, f"close factor must be between 0 and 1, not {factor}"
+        factor = int(args["newReserveFactorMantissa"])
+        assert (
+            0 <= factor <= exponential.EXP_SCALE
+        ), f"reserve factor must be between 0 and 1e18, not {factor}"
         market.reserve_factor = factor
 
     def process_new_implementation(self, state: State, event_address: str, args: dict):
@@ -79,31 +227,34 @@ class CompoundProcessor(Processor):
         if new_implementation != constants.CDAI_DSR_IMPLEMENTATION:
             return
         market.dsr_active = True
+        market.touch()
 
     def process_new_close_factor(self, state: State, _event_address: str, args: dict):
-        factor = int(args["newCloseFactorMantissa"]) / FACTORS_DIVISOR
-        assert 0 <= factor <= 1, f"close factor must be between 0 and 1, not {factor}"
+        factor = int(args["newCloseFactorMantissa"])
+        assert (
+            0 <= factor <= exponential.EXP_SCALE
+        ), f"close factor must be between 0 and 1e18, not {factor}"
         state.close_factor = factor
 
     def process_new_collateral_factor(
         self, state: State, _event_address: str, args: dict
     ):
         market = state.markets.find_by_address(args["cToken"])
-        market.collateral_factor = (
-            int(args["newCollateralFactorMantissa"]) / FACTORS_DIVISOR
-        )
+        market.collateral_factor = int(args["newCollateralFactorMantissa"])
+        market.touch()
 
     def process_market_listed(self, state: State, _event_address: str, args: dict):
         market = state.markets.find_by_address(args["cToken"])
         market.listed = True
+        market.touch()
 
     def process_market_entered(self, state: State, _event_address: str, args: dict):
-        market = state.markets.find_by_address(args["cToken"])
-        market.users[args["account"]].entered = True
+        users = state.markets.find_by_address(args["cToken"]).users
+        users.entered[users.get_row(args["account"])] = True
 
     def process_market_exited(self, state: State, _event_address: str, args: dict):
-        market = state.markets.find_by_address(args["cToken"])
-        market.users[args["account"]].entered = False
+        users = state.markets.find_by_address(args["cToken"]).users
+        users.entered[users.get_row(args["account"])] = False
 
     def process_mint(self, state: State, event_address: str, args: dict):
         market = state.markets.find_by_address(event_address)
@@ -114,6 +265,7 @@ class CompoundProcessor(Processor):
             market.balances.total_underlying += mint_amount
 
         market.balances.token_balance += int(args["mintTokens"])
+        market.touch()
 
     def process_redeem(self, state: State, event_address: str, args: dict):
         market = state.markets.find_by_address(event_address)
@@ -136,6 +288,7 @@ class CompoundProcessor(Processor):
             market.transfer_out(redeem_amount)
 
         market.balances.token_balance -= redeem_tokens
+        market.touch()
 
     def process_transfer(self, state: State, event_address: str, args: dict):
         try:
@@ -143,22 +296,24 @@ class CompoundProcessor(Processor):
         except ValueError:
             return self._process_token_transfer(state, event_address, args)
         amount = int(args["amount"])
+        users = market.users
+        token_balances = users.token_balances
 
         from_ = args["from"]
-        from_balances = market.users[from_].balances
-        if from_ != event_address:
+        if from_ != event_address and self._is_tracked(from_):
+            row = users.get_row(from_)
             assert (
-                from_balances.token_balance >= amount
-            ), f"token balance can never be negative, {from_balances.token_balance} < {amount}"
-            from_balances.token_balance -= amount
+                token_balances[row] >= amount
+            ), f"token balance can never be negative, {token_balances[row]} < {amount}"
+            token_balances[row] -= amount
 
         to = args["to"]
-        if to != event_address:
-            market.users[to].balances.token_balance += amount
+        if to != event_address and self._is_tracked(to):
+            token_balances[users.get_row(to)] += amount
 
     def _process_token_transfer(self, state: State, event_address: str, args: dict):
-        address_from = get_any_key(args, ["from", "_from", "src"])
-        address_to = get_any_key(args, ["to", "_to", "dst"])
+        address_from = get_any_key(args, TRANSFER_FROM_KEYS)
+        address_to = get_any_key(args, TRANSFER_TO_KEYS)
         amount = int(get_any_key(args, ["amount", "value", "wad", "_value"]))
 
         market_meta = self.markets_metadata.get(event_address)
@@ -177,10 +332,12 @@ class CompoundProcessor(Processor):
 
         if cmarket_address == address_to:
             cmarket.balances.total_underlying += amount
+        cmarket.touch()
 
     def process_chi_updated(self, state: State, _event_address: str, args: dict):
         market = self._find_or_add_market(state, constants.CDAI_ADDRESS)
         market.chi = int(args["chi"])
+        market.touch()
 
     def process_borrow(self, state: State, event_address: str, args: dict):
         market = state.markets.find_by_address(event_address)
@@ -198,29 +355,30 @@ class CompoundProcessor(Processor):
         if self._should_handle_dsr(market):
             market.transfer_out(amount)
 
-        borrower = args["borrower"]
-        self.update_user_borrow(market, borrower)
-        market.users[borrower].balances.total_borrowed += int(args["borrowAmount"])
+        row = self.update_user_borrow(market, args["borrower"])
+        market.users.total_borrowed[row] += int(args["borrowAmount"])
+        market.touch()
 
     def process_repay_borrow(self, state: State, event_address: str, args: dict):
         borrower = args["borrower"]
         amount = int(args["repayAmount"])
         market = state.markets.find_by_address(event_address)
-        self.update_user_borrow(market, borrower)
-        user_balances = market.users[borrower].balances
+        row = self.update_user_borrow(market, borrower)
+        user_borrows = market.users.total_borrowed
         assert (
             market.balances.total_borrowed >= amount
         ), f"borrow can never be negative, {market.balances.total_borrowed} < {amount}"
         assert (
-            user_balances.total_borrowed >= amount
-        ), f"borrow can never be negative, {user_balances.total_borrowed} < {amount}"
+            user_borrows[row] >= amount
+        ), f"borrow can never be negative, {user_borrows[row]} < {amount}"
 
         market.balances.total_borrowed = int(args["totalBorrows"])
         # NOTE: ERC20 tokens are handled through the transfer event
         if event_address == constants.CETH_ADDRESS:
             market.balances.total_underlying += amount
 
-        user_balances.total_borrowed -= amount
+        user_borrows[row] -= amount
+        market.touch()
 
     def process_liquidate_borrow(self, state: State, event_address: str, args: dict):
         # NOTE: repay and transfer will be emitted with each liquidation
@@ -229,6 +387,7 @@ class CompoundProcessor(Processor):
     def process_reserves_added(self, state: State, event_address: str, args: dict):
         market = state.markets.find_by_address(event_address)
         market.reserves += int(args["addAmount"])
+        market.touch()
 
     def process_reserves_reduced(self, state: State, event_address: str, args: dict):
         market = state.markets.find_by_address(event_address)
@@ -236,32 +395,38 @@ class CompoundProcessor(Processor):
             args["reduceAmount"]
         ), f"reserves can never be negative, {market.reserves} < {args['reduceAmount']}"
         market.reserves -= int(args["reduceAmount"])
+        market.touch()
 
     def process_new_price_oracle(self, state: State, _event_address: str, args: dict):
         address = args["newPriceOracle"]
         state.oracles.create_oracle(address)
         state.oracles.current_address = address
+        state.oracles.touch()
 
     def process_price_posted(self, state: State, event_address: str, args: dict):
         oracle = state.oracles.get_oracle(event_address)
         value = int(args["newPriceMantissa"])
         oracle.update_price(args["asset"], value)
+        state.oracles.touch()
 
     def process_external_price_updated(
         self, state: State, event_address: str, args: dict
     ):
         oracle = state.oracles.get_oracle(event_address)
         oracle.update_price(args["symbol"], args["price"])
+        state.oracles.touch()
 
     def process_price_updated(self, state: State, event_address: str, args: dict):
         oracle = state.oracles.get_oracle(event_address)
         value = int(args["price"])
         oracle.update_price(args["symbol"], value)
+        state.oracles.touch()
 
     def process_sai_price_set(self, state: State, event_address: str, args: dict):
         oracle = state.oracles.get_oracle(event_address)
         value = int(args["newPriceMantissa"])
         oracle.sai_price = value
+        state.oracles.touch()
 
     def process_inverted_price_posted(
         self, state: State, _event_address: str, args: dict
@@ -271,6 +436,7 @@ class CompoundProcessor(Processor):
         value = int(args["newPriceMantissa"])
         for ctoken in args["tokens"]:
             oracle.update_price(ctoken, value, inverted=True)
+        state.oracles.touch()
 
     def process_new_interest_params(self, state: State, event_address: str, args: dict):
         try:
@@ -283,16 +449,26 @@ class CompoundProcessor(Processor):
         market = state.markets.find_by_address(event_address)
         market.balances.total_borrowed = int(args["totalBorrows"])
         market.borrow_index = int(args["borrowIndex"])
-        market.reserves += int(int(args["interestAccumulated"]) * market.reserve_factor)
+        market.reserves = exponential.mul_scalar_truncate_add(
+            market.reserve_factor, int(args["interestAccumulated"]), market.reserves
+        )
+        market.touch()
 
     def process_timestamp_updated(self, state: State, _event_address: str, args: dict):
-        state.timestamp = args["timestamp"]
-
-    def update_user_borrow(self, market: Market, user_address: str):
-        user = market.users[user_address]
-        new_total_borrowed = user.borrowed_at(market.borrow_index)
-        user.balances.total_borrowed = new_total_borrowed
-        user.borrow_index = market.borrow_index
+        state.block_timestamp = int(args["timestamp"])
+
+    def update_user_borrow(self, market: Market, user_address: str) -> int:
+        """Accrues the interests of the borrows of ``user_address`` and
+        returns its row in ``market.users``
+        """
+        users = market.users
+        row = users.get_row(user_address)
+        users.total_borrowed[row] = users.borrowed_at(row, market.borrow_index)
+        users.borrow_indexes[row] = market.borrow_index
+        return row
+
+    def _is_tracked(self, account: str) -> bool:
+        return self.tracked_accounts is None or account in self.tracked_accounts
 
     def _should_handle_dsr(self, market: Market) -> bool:
         return isinstance(market, CDaiMarket) and market.dsr_active
@@ -1,16 +1,23 @@
-import datetime as dt
 from functools import lru_cache
-from typing import Callable, Iterable
+from os import path
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import pymongo
 
-from ... import db, utils
-from ...entities import PointInTime
+from ... import canonical, db, relevance, replay_log, settings
 from ...event_processor import Processor
+from ...event_source import EventSource
 from ...hook import Hooks
-from ...protocol import Protocol
+from ...protocol import Protocol, skip_until
+from ...relevance import EventInterest
+from ...resumable import ResumableCursor, ResumeToken
+from ...series import BlockSeries, SideStreams
+from ...sources.dumps import DumpEventSource
+from ...sources.parquet import ParquetEventSource
+from ...tokens.dai import rates
+from ...tokens.dai.dsr import DSR
+from ...tokens.dai.rates import RateIndex
 from . import oracles  # pylint: disable=unused-import
-from . import plots, exporter
 from .constants import DS_VALUES_MAPPING, DSR_ADDRESS, NULL_ADDRESS
 from .entities import CompoundState
 from .processor import CompoundProcessor
@@ -18,195 +25,500 @@ from .processor import CompoundProcessor
 
 @Protocol.register("compound")
 class CompoundProtocol(Protocol):
+    replay_collections = ["events", "ds_values", "chi_values", "prices", "blocks"]
+    projections = {
+        "ds_values": db.make_projection(["blockNumber", "address", "price"]),
+        "chi_values": db.make_projection(["blockNumber", "chi"]),
+        "prices": db.make_projection(["blockNumber", "price", "symbol"]),
+        "blocks": db.make_projection(["blockNumber", "timestamp"]),
+    }
+
     def create_processor(self, hooks: Hooks = None) -> Processor:
         return CompoundProcessor(hooks=hooks)
 
     def create_empty_state(self) -> CompoundState:
-        return CompoundState.create()
-
-    def count_events(self, min_block: int = None, max_block: int = None) -> int:
-        condition = self.make_block_range_condition(min_block, max_block)
-        collections = [
-            db.db.events,
-            db.db.ds_values,
-            db.db.chi_values,
-            db.db.prices,
-            db.db.blocks,
-        ]
-        sai_events_count = len(list(self.sai_price_events(min_block, max_block)))
-        db_events_count = sum(col.count_documents(condition) for col in collections)
+        return CompoundState.create(dsr=DSR(index=self.get_dsr_index()))
+
+    def count_events(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> Optional[int]:
+        if not self.source.can_count:
+            return None
+        if max_block is None:
+            max_block = self.get_max_block()
+        sai_events_count = len(self.load_sai_prices(min_block, max_block))
+        db_events_count = sum(
+            self.count_rows(
+                collection,
+                min_block,
+                max_block,
+                interests=interests if collection == "events" else None,
+            )
+            for collection in self.replay_collections
+        )
         return sai_events_count + db_events_count
 
+    def iterate_streams(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        fields: Iterable[str] = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Dict[str, Iterable[dict]]:
+        side_streams, events = self.open_streams(
+            min_block, max_block, lazy, batch_size, fields, interests, resume_token
+        )
+        return {
+            "events": events,
+            "side_events": skip_until(side_streams, resume_token),
+        }
+
     def iterate_events(
-        self, min_block: int = None, max_block: int = None
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        fields: Iterable[str] = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
     ) -> Iterable[dict]:
-        condition = self.make_block_range_condition(min_block, max_block)
-        return utils.merge_sorted_streams(
-            db.db.events.find(condition).sort(db.SORT_KEY),
-            self.fetch_ds_values(condition),
-            self.fetch_chi_values(condition),
-            self.fetch_external_prices(condition),
-            self.fetch_block_timestamps(condition),
-            self.sai_price_events(min_block=min_block, max_block=max_block),
-            key=PointInTime.from_event,
-        )
-
-    def sai_price_events(self, min_block: int = None, max_block: int = None):
-        events = [
+        side_streams, events = self.open_streams(
+            min_block, max_block, lazy, batch_size, fields, interests, resume_token
+        )
+        return skip_until(side_streams.splice(events), resume_token)
+
+    def open_streams(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        fields: Iterable[str] = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Tuple[SideStreams, Iterable[dict]]:
+        if max_block is None:
+            max_block = self.get_max_block()
+        if resume_token is not None:
+            min_block = max(min_block or 0, resume_token[0])
+        side_streams = self.load_side_streams(min_block, max_block, batch_size)
+        events = self.fetch_events(
+            min_block, max_block, lazy, batch_size, fields, interests, resume_token
+        )
+        return side_streams, events
+
+    def fetch_events(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        fields: Iterable[str] = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Iterable[dict]:
+        projection = None
+        if lazy:
+            projection = db.make_projection(db.EVENT_FIELDS + list(fields or []))
+        return self.fetch_rows(
+            "events",
+            min_block,
+            max_block,
+            projection=projection,
+            lazy=lazy,
+            batch_size=batch_size,
+            interests=interests,
+            resume_token=resume_token,
+        )
+
+    def load_side_streams(
+        self, min_block: int = None, max_block: int = None, batch_size: int = None
+    ) -> SideStreams:
+        """Preloads all the series replayed alongside the events"""
+        return SideStreams(
+            [
+                self.load_ds_values(min_block, max_block, batch_size),
+                self.load_chi_values(min_block, max_block, batch_size),
+                self.load_external_prices(min_block, max_block, batch_size),
+                self.load_block_timestamps(min_block, max_block, batch_size),
+                self.load_sai_prices(min_block, max_block),
+            ]
+        )
+
+    def load_sai_prices(
+        self, min_block: int = None, max_block: int = None
+    ) -> BlockSeries:
+        rows = [
             {
                 "address": "0xddc46a3b076aec7ab3fc37420a8edd2959764ec4",
-                "block": 10_067_346,
+                "blockNumber": 10_067_346,
                 "sai_price": 5285551943761727,
             }
         ]
+        rows = [
+            row
+            for row in rows
+            if (min_block is None or row["blockNumber"] >= min_block)
+            and (max_block is None or row["blockNumber"] <= max_block)
+        ]
 
-        for event in events:
-            if (
-                (min_block is not None and event["block"] < min_block)
-                or max_block is not None
-                and event["block"] > max_block
-            ):
-                continue
-            yield {
+        def make_event(block: int, value: tuple) -> dict:
+            address, price = value
+            return {
                 "event": "SaiPriceSet",
-                "address": event["address"],
-                "returnValues": {"newPriceMantissa": str(event["sai_price"])},
-                "blockNumber": event["block"],
+                "address": address,
+                "returnValues": {"newPriceMantissa": price},
+                "blockNumber": block,
                 "transactionIndex": -1,
                 "logIndex": -2,
             }
 
-    def fetch_ds_values(self, condition: dict) -> Iterable[dict]:
-        def make_cursor(condition: dict) -> pymongo.CursorType:
-            return db.db.ds_values.find(condition, no_cursor_timeout=True).sort(
-                "blockNumber"
-            )
+        return BlockSeries.from_rows(
+            "sai_prices",
+            rows,
+            lambda row: (row["address"], row["sai_price"]),
+            make_event,
+            transaction_index=-1,
+            log_index=-2,
+        )
 
-        def make_event(row: dict) -> dict:
+    def load_ds_values(
+        self, min_block: int = None, max_block: int = None, batch_size: int = None
+    ) -> BlockSeries:
+        def make_event(block: int, value: tuple) -> dict:
+            address, price = value
             return {
                 "event": "InvertedPricePosted",
-                "address": row["address"],
+                "address": address,
                 "returnValues": {
-                    "newPriceMantissa": str(row["price"]),
-                    "tokens": DS_VALUES_MAPPING.get(row["address"].lower(), []),
+                    "newPriceMantissa": price,
+                    "tokens": DS_VALUES_MAPPING.get(address.lower(), []),
                 },
-                "blockNumber": row["blockNumber"],
+                "blockNumber": block,
                 "transactionIndex": -1,
                 "logIndex": -1,
             }
 
-        yield from self.safe_yield_cursor(condition, make_cursor, make_event)
-
-    def fetch_chi_values(self, condition: dict) -> Iterable[dict]:
-        def make_cursor(condition: dict) -> pymongo.CursorType:
-            return db.db.chi_values.find(condition, no_cursor_timeout=True).sort(
-                "blockNumber"
-            )
+        rows = self.fetch_rows("ds_values", min_block, max_block, batch_size=batch_size)
+        return BlockSeries.from_rows(
+            "ds_values",
+            rows,
+            lambda row: (row["address"], int(row["price"].to_decimal())),
+            make_event,
+            transaction_index=-1,
+            log_index=-1,
+        )
 
-        def make_event(row: dict) -> dict:
+    def load_chi_values(
+        self, min_block: int = None, max_block: int = None, batch_size: int = None
+    ) -> BlockSeries:
+        def make_event(block: int, chi: int) -> dict:
             return {
                 "event": "ChiUpdated",
                 "address": DSR_ADDRESS,
-                "returnValues": {
-                    "chi": str(row["chi"]),
-                },
-                "blockNumber": row["blockNumber"],
+                "returnValues": {"chi": chi},
+                "blockNumber": block,
                 "transactionIndex": -5,
                 "logIndex": -5,
             }
 
-        yield from self.safe_yield_cursor(condition, make_cursor, make_event)
-
-    def fetch_external_prices(self, condition: dict) -> Iterable[dict]:
-        def make_cursor(condition: dict) -> pymongo.CursorType:
-            return (
-                db.prices().find(condition, no_cursor_timeout=True).sort("blockNumber")
-            )
+        rows = self.fetch_rows(
+            "chi_values", min_block, max_block, batch_size=batch_size
+        )
+        return BlockSeries.from_rows(
+            "chi_values",
+            rows,
+            lambda row: int(row["chi"].to_decimal()),
+            make_event,
+            transaction_index=-5,
+            log_index=-5,
+        )
 
-        def make_event(row: dict) -> dict:
+    def load_external_prices(
+        self, min_block: int = None, max_block: int = None, batch_size: int = None
+    ) -> BlockSeries:
+        def make_event(block: int, value: tuple) -> dict:
+            symbol, price = value
             return {
                 "event": "ExternalPriceUpdated",
                 "address": oracles.PriceOracleV1.registered_name,
-                "returnValues": {
-                    "price": row["price"].to_decimal(),
-                    "symbol": row["symbol"],
-                },
-                "blockNumber": row["blockNumber"],
+                "returnValues": {"price": price, "symbol": symbol},
+                "blockNumber": block,
                 "transactionIndex": -10,
                 "logIndex": -10,
             }
 
-        yield from self.safe_yield_cursor(condition, make_cursor, make_event)
-
-    def fetch_block_timestamps(self, condition: dict) -> Iterable[dict]:
-        def make_cursor(condition: dict) -> pymongo.CursorType:
-            projection = {"blockNumber": 1, "timestamp": 1}
-            return db.db.blocks.find(
-                condition, projection=projection, no_cursor_timeout=True
-            ).sort("blockNumber")
+        rows = self.fetch_rows("prices", min_block, max_block, batch_size=batch_size)
+        return BlockSeries.from_rows(
+            "prices",
+            rows,
+            lambda row: (row["symbol"], row["price"].to_decimal()),
+            make_event,
+            transaction_index=-10,
+            log_index=-10,
+        )
 
-        def make_event(row: dict) -> dict:
+    def load_block_timestamps(
+        self, min_block: int = None, max_block: int = None, batch_size: int = None
+    ) -> BlockSeries:
+        def make_event(block: int, timestamp: int) -> dict:
+            # NOTE: the timestamp is only converted to a datetime if accessed
+            # through State.timestamp
             return {
                 "event": "TimestampUpdated",
                 "address": NULL_ADDRESS,
-                "returnValues": {
-                    "timestamp": dt.datetime.fromtimestamp(
-                        int(row["timestamp"]), dt.timezone.utc
-                    ),
-                },
-                "blockNumber": row["blockNumber"],
+                "returnValues": {"timestamp": timestamp},
+                "blockNumber": block,
                 "transactionIndex": -1000,
                 "logIndex": -1000,
             }
 
-        yield from self.safe_yield_cursor(condition, make_cursor, make_event)
+        rows = self.fetch_rows("blocks", min_block, max_block, batch_size=batch_size)
+        return BlockSeries.from_rows(
+            "blocks",
+            rows,
+            lambda row: int(row["timestamp"]),
+            make_event,
+            transaction_index=-1000,
+            log_index=-1000,
+            integer_values=True,
+        )
+
+    def count_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> Optional[int]:
+        return self.source.count_rows(collection, min_block, max_block, interests)
 
-    def safe_yield_cursor(
+    def fetch_rows(
         self,
-        condition: dict,
-        make_cursor: Callable[[dict], pymongo.CursorType],
-        make_event: Callable[[dict], dict],
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        projection: dict = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
     ) -> Iterable[dict]:
-        cursor = make_cursor(condition)
-        while True:
-            try:
-                row = cursor.next()
-                event = make_event(row)
-                yield event
-            except StopIteration:
-                break
-            except pymongo.errors.CursorNotFound:
-                condition.setdefault("blockNumber", {})
-                if "$gte" in condition["blockNumber"]:
-                    del condition["blockNumber"]["$gt"]
-                condition["blockNumber"]["$gt"] = event["blockNumber"]
-                cursor = make_cursor(condition)
-        cursor.close()
-
-    def make_block_range_condition(
-        self, min_block: int = None, max_block: int = None
-    ) -> dict:
-        block_number = {}
-        if min_block:
-            block_number.update({"$gte": min_block})
-        if max_block is None:
-            max_block = self.get_max_block()
-        block_number.update({"$lte": max_block})
-        return {"blockNumber": block_number}
+        """Returns the rows of ``collection`` from the event source,
+        see :meth:`backd.event_source.EventSource.fetch_rows`
+
+        :param projection: fields to fetch, defaults to ``self.projections``
+        """
+        if projection is None:
+            projection = self.projections.get(collection)
+        return self.source.fetch_rows(
+            collection,
+            min_block,
+            max_block,
+            projection=projection,
+            lazy=lazy,
+            batch_size=batch_size,
+            interests=interests,
+            resume_token=resume_token,
+        )
+
+    def fetch_dsr_rates(self) -> List[dict]:
+        return self.source.fetch_dsr_rates()
+
+    def get_dsr_index(self) -> RateIndex:
+        return rates.get_dsr_index(self.source)
 
     @lru_cache(maxsize=None)
     def get_max_block(self):
-        cursor = db.db.events.aggregate(
-            [
-                {"$match": {"event": "AccrueInterest"}},
-                {"$group": {"_id": "$address", "max_block": {"$max": "$blockNumber"}}},
-                {"$group": {"_id": None, "block": {"$min": "$max_block"}}},
-            ]
-        )
-        return next(cursor)["block"]
+        return min(self.source.get_last_blocks("AccrueInterest").values())
 
     def get_plots(self):
+        # NOTE: plots and exporter pull in pandas and matplotlib,
+        # so they are only imported by the commands using them
+        from . import plots  # pylint: disable=import-outside-toplevel
+
         return plots
 
     def get_exporter(self):
+        from . import exporter  # pylint: disable=import-outside-toplevel
+
         return exporter
+
+
+@Protocol.register("compound-parquet")
+class ParquetCompoundProtocol(CompoundProtocol):
+    """Replays Compound from the Parquet files written by ``backd convert-events``
+    instead of MongoDB. Files are read from ``settings.PARQUET_PATH``
+    """
+
+    def __init__(self, data_path: str = None, source: EventSource = None):
+        super().__init__(source=source or ParquetEventSource(data_path))
+
+
+@Protocol.register("compound-canonical")
+class CanonicalCompoundProtocol(CompoundProtocol):
+    """Replays Compound from the events written by ``backd canonicalize-events``,
+    which are already normalized and do not need to be parsed again
+    """
+
+    def count_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> int:
+        if collection != "events":
+            return super().count_rows(collection, min_block, max_block)
+        condition = self.make_canonical_condition(min_block, max_block, interests)
+        return db.db[canonical.CANONICAL_COLLECTION].count_documents(condition)
+
+    def make_canonical_condition(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> dict:
+        condition = canonical.block_range_condition(min_block, max_block)
+        event_codes = canonical.EventTypes.load().codes
+        event_filter = relevance.compile_filter(
+            interests, fields=canonical.EVENT_FIELDS, event_codes=event_codes
+        )
+        condition.update(event_filter)
+        return condition
+
+    def fetch_events(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        fields: Iterable[str] = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Iterable[dict]:
+        # NOTE: canonical events only contain the fields used during replays
+        # so lazy decoding and projections are not needed
+        condition = self.make_canonical_condition(min_block, max_block, interests)
+
+        def make_cursor(condition: dict) -> pymongo.CursorType:
+            cursor = (
+                db.db[canonical.CANONICAL_COLLECTION]
+                .find(condition, no_cursor_timeout=True)
+                .sort("_id")
+            )
+            if batch_size:
+                cursor = cursor.batch_size(batch_size)
+            return cursor
+
+        if resume_token is not None:
+            resume_token = (canonical.pack_position(*resume_token),)
+        cursor = ResumableCursor(
+            make_cursor, condition, ["_id"], resume_token=resume_token
+        )
+        return canonical.decode_events(cursor, canonical.EventTypes.load())
+
+    @lru_cache(maxsize=None)
+    def get_max_block(self):
+        event_types = canonical.EventTypes.load()
+        cursor = db.db[canonical.CANONICAL_COLLECTION].aggregate(
+            [
+                {"$match": {"e": event_types.get_code("AccrueInterest")}},
+                {"$group": {"_id": "$a", "max_position": {"$max": "$_id"}}},
+                {"$group": {"_id": None, "position": {"$min": "$max_position"}}},
+            ]
+        )
+        block, _transaction_index, _log_index = canonical.unpack_position(
+            next(cursor)["position"]
+        )
+        return block
+
+
+@Protocol.register("compound-recorded")
+class RecordedCompoundProtocol(CompoundProtocol):
+    """Replays Compound from the log written by ``backd record-stream``,
+    which is already merged and normalized. Files are read from
+    ``settings.REPLAY_LOG_PATH``
+    """
+
+    def __init__(self, data_path: str = None, source: EventSource = None):
+        super().__init__(source=source)
+        if data_path is None:
+            data_path = settings.REPLAY_LOG_PATH
+        self.data_path = data_path
+
+    @property
+    def log(self) -> replay_log.ReplayLog:
+        # NOTE: not cached so that a log can be recorded after creation
+        return replay_log.ReplayLog(self.data_path)
+
+    def count_events(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> int:
+        if relevance.is_unrestricted(interests):
+            return self.log.count_events(min_block, max_block)
+        events = self.log.iterate_events(min_block, max_block)
+        return sum(1 for event in events if relevance.matches(interests, event))
+
+    def iterate_streams(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        fields: Iterable[str] = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Dict[str, Iterable[dict]]:
+        return {
+            "events": self.iterate_events(
+                min_block, max_block, interests=interests, resume_token=resume_token
+            )
+        }
+
+    def iterate_events(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        fields: Iterable[str] = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Iterable[dict]:
+        if resume_token is not None:
+            min_block = max(min_block or 0, resume_token[0])
+        events = skip_until(self.log.iterate_events(min_block, max_block), resume_token)
+        if relevance.is_unrestricted(interests):
+            return events
+        return (event for event in events if relevance.matches(interests, event))
+
+    def fetch_dsr_rates(self) -> List[dict]:
+        return self.log.metadata["dsr_rates"]
+
+    @lru_cache(maxsize=None)
+    def get_dsr_index(self) -> RateIndex:
+        return RateIndex.from_rows(self.fetch_dsr_rates())
+
+    def get_max_block(self):
+        return self.log.metadata["max_block"]
+
+
+@Protocol.register("compound-dumps")
+class DumpCompoundProtocol(CompoundProtocol):
+    """Replays Compound directly from the raw data dumps, without a database.
+    Files are read from ``settings.DUMPS_PATH``
+    """
+
+    def __init__(self, data_path: str = None, source: EventSource = None):
+        super().__init__(source=source or DumpEventSource(data_path))
@@ -0,0 +1,163 @@
+"""Declarations of the events consumed during a replay
+
+The processor and the hooks declare which events they need as a list of
+:class:`EventInterest`. The declarations are compiled into a database
+filter so that events nobody consumes are never fetched.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+# case-insensitive comparisons, stored addresses are checksummed
+COLLATION = {"locale": "en", "strength": 2}
+
+EVENT_FIELDS = {
+    "event": "event",
+    "address": "address",
+    "returnValues": "returnValues",
+}
+
+# arguments of the events naming the accounts taking part in them
+ACCOUNT_ROLES = {
+    "Borrow": ["borrower"],
+    "LiquidateBorrow": ["borrower", "liquidator"],
+    "MarketEntered": ["account"],
+    "MarketExited": ["account"],
+    "Mint": ["minter"],
+    "Redeem": ["redeemer"],
+    "RepayBorrow": ["borrower", "payer"],
+    "Transfer": ["from", "to"],
+}
+
+
+@dataclass
+class EventInterest:
+    """Events needed by a consumer, ``None`` meaning no restriction
+
+    :param events: names of the events
+    :param addresses: addresses of the contracts emitting the events
+    :param excluded_addresses: addresses whose events are not needed
+    :param arguments: matches if any of the return values named by the keys
+        is one of the associated values
+    """
+
+    events: Optional[List[str]] = None
+    addresses: Optional[List[str]] = None
+    excluded_addresses: Optional[List[str]] = None
+    arguments: Optional[Dict[str, List[str]]] = None
+
+    def __post_init__(self):
+        self.addresses = _lower_all(self.addresses)
+        self.excluded_addresses = _lower_all(self.excluded_addresses)
+        if self.arguments is not None:
+            self.arguments = {k: _lower_all(v) for k, v in self.arguments.items()}
+
+    @property
+    def is_unrestricted(self) -> bool:
+        return (
+            self.events is None
+            and self.addresses is None
+            and self.excluded_addresses is None
+            and self.arguments is None
+        )
+
+    def matches(self, event: dict) -> bool:
+        if self.events is not None and event["event"] not in self.events:
+            return False
+        address = event["address"].lower()
+        if self.addresses is not None and address not in self.addresses:
+            return False
+        if self.excluded_addresses is not None and address in self.excluded_addresses:
+            return False
+        if self.arguments is None:
+            return True
+        values = event["returnValues"]
+        return any(
+            isinstance(values.get(key), str) and values[key].lower() in expected
+            for key, expected in self.arguments.items()
+        )
+
+    def compile(self, fields: Dict[str, str] = None, event_codes: dict = None) -> dict:
+        """Compiles the interest into a MongoDB filter
+
+        :param fields: names of the event fields in the collection
+        :param event_codes: values stored instead of the event names
+        """
+        if fields is None:
+            fields = EVENT_FIELDS
+        condition = {}
+        if self.events is not None:
+            events = self.events
+            if event_codes is not None:
+                events = [event_codes[e] for e in events if e in event_codes]
+            condition[fields["event"]] = {"$in": list(events)}
+        address_condition = {}
+        if self.addresses is not None:
+            address_condition["$in"] = self.addresses
+        if self.excluded_addresses is not None:
+            address_condition["$nin"] = self.excluded_addresses
+        if address_condition:
+            condition[fields["address"]] = address_condition
+        if self.arguments is not None:
+            condition["$or"] = [
+                {f"{fields['returnValues']}.{key}": {"$in": values}}
+                for key, values in self.arguments.items()
+            ]
+        return condition
+
+
+def _lower_all(values: Optional[Iterable[str]]) -> Optional[List[str]]:
+    if values is None:
+        return None
+    return sorted({value.lower() for value in values})
+
+
+def is_unrestricted(interests: Optional[List[EventInterest]]) -> bool:
+    """An empty or missing list of interests means that all events are needed"""
+    return not interests or any(i.is_unrestricted for i in interests)
+
+
+def event_names(interests: Optional[List[EventInterest]]) -> Optional[Set[str]]:
+    """Returns the names of all the events needed, ``None`` meaning any event"""
+    if is_unrestricted(interests) or any(i.events is None for i in interests):
+        return None
+    return {name for interest in interests for name in interest.events}
+
+
+def matches(interests: Optional[List[EventInterest]], event: dict) -> bool:
+    if is_unrestricted(interests):
+        return True
+    return any(interest.matches(event) for interest in interests)
+
+
+def account_interests(
+    account: str, events: Iterable[str] = None
+) -> List[EventInterest]:
+    """Declares the events in which ``account`` takes part, see ``ACCOUNT_ROLES``
+
+    :param events: only declare these events, all the events with roles by default
+    """
+    if events is None:
+        events = ACCOUNT_ROLES
+    return [
+        EventInterest(
+            events=[event], arguments={role: [account] for role in ACCOUNT_ROLES[event]}
+        )
+        for event in sorted(events)
+    ]
+
+
+def compile_filter(
+    interests: Optional[List[EventInterest]],
+    fields: Dict[str, str] = None,
+    event_codes: dict = None,
+) -> dict:
+    """Compiles ``interests`` into a MongoDB filter matching the events
+    needed by at least one of them, see :meth:`EventInterest.compile`
+    """
+    if is_unrestricted(interests):
+        return {}
+    conditions = [i.compile(fields, event_codes) for i in interests]
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$or": conditions}
@@ -0,0 +1,207 @@
+"""Pre-merged binary log of a replay stream
+
+``backd record-stream`` writes the merged and normalized stream of a
+protocol once, so that later replays neither query the database nor merge
+the side streams again. A log is a directory containing:
+
+* ``events.log``: a sequence of frames, each made of a little-endian
+  ``uint32`` length followed by a pickled list of events. Frames only end at
+  block boundaries, so a block is never split across two frames
+* ``index.npy``: one ``(first_block, last_block, offset, count)`` row of
+  ``int64`` per frame, used to seek directly to the frame of a block
+* ``metadata.pkl``: block range of the log and the data needed to create an
+  empty state, such as the DSR rates
+"""
+
+import mmap
+import os
+import pickle
+import struct
+from contextlib import contextmanager
+from os import path
+from typing import Iterable, Iterator, List
+
+import numpy as np
+
+from . import constants
+from .logger import logger
+from .normalizer import NORMALIZED_KEY, normalize_event
+from .protocol import Protocol
+
+LOG_FILENAME = "events.log"
+INDEX_FILENAME = "index.npy"
+METADATA_FILENAME = "metadata.pkl"
+
+# minimum number of events per frame
+DEFAULT_FRAME_SIZE = constants.REPLAY_LOG_FRAME_SIZE
+
+FRAME_HEADER = struct.Struct("<I")
+
+# fields never read during replays
+DROPPED_FIELDS = {"_id", "raw"}
+
+FIRST_BLOCK, LAST_BLOCK, OFFSET, COUNT = range(4)
+
+
+def prepare_event(event: dict) -> dict:
+    event = normalize_event(
+        {k: v for k, v in event.items() if k not in DROPPED_FIELDS}, in_place=True
+    )
+    event[NORMALIZED_KEY] = True
+    return event
+
+
+def write_log(
+    events: Iterable[dict],
+    directory: str,
+    metadata: dict = None,
+    frame_size: int = DEFAULT_FRAME_SIZE,
+) -> int:
+    """Writes the sorted stream ``events`` to a replay log in ``directory``
+
+    :param metadata: extra information stored with the log
+    :param frame_size: minimum number of events per frame
+    :return: the number of events written
+    """
+    os.makedirs(directory, exist_ok=True)
+    index = []
+    frame: List[dict] = []
+    count = 0
+
+    with open(path.join(directory, LOG_FILENAME), "wb") as f:
+
+        def flush():
+            data = pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+            first_block = frame[0]["blockNumber"]
+            last_block = frame[-1]["blockNumber"]
+            index.append((first_block, last_block, f.tell(), len(frame)))
+            f.write(FRAME_HEADER.pack(len(data)))
+            f.write(data)
+
+        for event in events:
+            is_new_block = frame and event["blockNumber"] != frame[-1]["blockNumber"]
+            if len(frame) >= frame_size and is_new_block:
+                flush()
+                logger.debug("%s events written", count)
+                frame = []
+            frame.append(prepare_event(event))
+            count += 1
+        if frame:
+            flush()
+
+    index = np.array(index, dtype=np.int64).reshape(-1, 4)
+    np.save(path.join(directory, INDEX_FILENAME), index)
+
+    metadata = dict(metadata or {})
+    metadata["count"] = count
+    if len(index) > 0:
+        metadata["min_block"] = int(index[0, FIRST_BLOCK])
+        metadata["max_block"] = int(index[-1, LAST_BLOCK])
+    with open(path.join(directory, METADATA_FILENAME), "wb") as f:
+        pickle.dump(metadata, f)
+    return count
+
+
+def record_stream(
+    protocol_name: str,
+    directory: str,
+    min_block: int = None,
+    max_block: int = None,
+    frame_size: int = DEFAULT_FRAME_SIZE,
+    source: str = None,
+) -> int:
+    """Records all the events replayed by ``protocol_name`` in a log
+
+    :param source: where to read the events from, see
+        :func:`backd.event_source.get_source`
+    :return: the number of events written
+    """
+    protocol: Protocol = Protocol.get(protocol_name)(source=source)
+    if max_block is None:
+        max_block = protocol.get_max_block()
+    metadata = {"protocol": protocol_name, "dsr_rates": protocol.fetch_dsr_rates()}
+    events = protocol.iterate_events(min_block=min_block, max_block=max_block)
+    return write_log(events, directory, metadata=metadata, frame_size=frame_size)
+
+
+class ReplayLog:
+    """Reads a log written by :func:`write_log` through a memory map"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index = np.load(path.join(directory, INDEX_FILENAME), mmap_mode="r")
+        with open(path.join(directory, METADATA_FILENAME), "rb") as f:
+            self.metadata = pickle.load(f)
+
+    def find_frame(self, min_block: int = None) -> int:
+        """Returns the index of the first frame containing blocks after
+        ``min_block``
+        """
+        if min_block is None:
+            return 0
+        return int(np.searchsorted(self.index[:, LAST_BLOCK], min_block))
+
+    @contextmanager
+    def open_data(self) -> Iterator[mmap.mmap]:
+        with open(path.join(self.directory, LOG_FILENAME), "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data
+
+    def read_frame(self, data: mmap.mmap, frame_index: int) -> List[dict]:
+        offset = int(self.index[frame_index, OFFSET])
+        (length,) = FRAME_HEADER.unpack_from(data, offset)
+        start = offset + FRAME_HEADER.size
+        return pickle.loads(data[start : start + length])
+
+    def iterate_frames(
+        self, min_block: int = None, max_block: int = None
+    ) -> Iterator[List[dict]]:
+        if len(self.index) == 0:
+            return
+        with self.open_data() as data:
+            for i in range(self.find_frame(min_block), len(self.index)):
+                if max_block is not None and self.index[i, FIRST_BLOCK] > max_block:
+                    return
+                yield self.read_frame(data, i)
+
+    def iterate_events(
+        self, min_block: int = None, max_block: int = None
+    ) -> Iterator[dict]:
+        for frame in self.iterate_frames(min_block, max_block):
+            for event in frame:
+                if not _in_range(event, min_block, max_block):
+                    if max_block is not None and event["blockNumber"] > max_block:
+                        return
+                    continue
+                yield event
+
+    def count_events(self, min_block: int = None, max_block: int = None) -> int:
+        """Counts the events in the given range, only decoding the frames
+        partially inside of it
+        """
+        first_blocks = self.index[:, FIRST_BLOCK]
+        last_blocks = self.index[:, LAST_BLOCK]
+        inside = np.ones(len(self.index), dtype=bool)
+        overlapping = np.ones(len(self.index), dtype=bool)
+        if min_block is not None:
+            inside &= first_blocks >= min_block
+            overlapping &= last_blocks >= min_block
+        if max_block is not None:
+            inside &= last_blocks <= max_block
+            overlapping &= first_blocks <= max_block
+        total = int(self.index[inside, COUNT].sum())
+        partial = np.flatnonzero(overlapping & ~inside)
+        if len(partial) == 0:
+            return total
+        with self.open_data() as data:
+            for i in partial:
+                frame = self.read_frame(data, i)
+                total += sum(1 for e in frame if _in_range(e, min_block, max_block))
+        return total
+
+
+def _in_range(event: dict, min_block: int = None, max_block: int = None) -> bool:
+    block = event["blockNumber"]
+    return (min_block is None or block >= min_block) and (
+        max_block is None or block <= max_block
+    )
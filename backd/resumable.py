@@ -0,0 +1,100 @@
+"""Database cursors that survive cursor timeouts and connection blips
+
+A :class:`ResumableCursor` remembers the position of the last document it
+returned, its resume token, and transparently reopens the query right after
+that position when the server loses the cursor.
+"""
+
+import time
+from typing import TYPE_CHECKING, Callable, Iterator, List, Sequence, Tuple
+
+from .logger import logger
+
+if TYPE_CHECKING:
+    import pymongo
+
+DEFAULT_MAX_RETRIES = 5
+
+# seconds to wait before the first retry, doubled after each failed attempt
+RETRY_DELAY = 0.5
+
+ResumeToken = Tuple
+
+
+def make_after_condition(fields: Sequence[str], token: ResumeToken) -> dict:
+    """Matches the documents strictly after ``token`` in the order given
+    by ``fields``, e.g. ``(a > x) or (a == x and b > y)`` for two fields
+    """
+    alternatives = []
+    for i, field in enumerate(fields):
+        alternative = {fields[j]: token[j] for j in range(i)}
+        alternative[field] = {"$gt": token[i]}
+        alternatives.append(alternative)
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return {"$or": alternatives}
+
+
+class ResumableCursor:
+    """Iterates over ``condition`` sorted by ``fields``
+
+    :param make_cursor: opens a cursor for a query, sorted by ``fields``
+    :param condition: query to run
+    :param fields: fields uniquely identifying a document in the sort order
+    :param resume_token: only return the documents after this position
+    :param max_retries: consecutive failures tolerated before giving up
+    """
+
+    def __init__(
+        self,
+        make_cursor: Callable[[dict], "pymongo.cursor.Cursor"],
+        condition: dict,
+        fields: List[str],
+        resume_token: ResumeToken = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
+        self.make_cursor = make_cursor
+        self.condition = condition
+        self.fields = fields
+        self.resume_token = resume_token
+        self.max_retries = max_retries
+        self.reopened = 0
+
+    def _make_condition(self) -> dict:
+        if self.resume_token is None:
+            return self.condition
+        after = make_after_condition(self.fields, self.resume_token)
+        if not self.condition:
+            return after
+        return {"$and": [self.condition, after]}
+
+    def __iter__(self) -> Iterator[dict]:
+        # NOTE: pymongo is slow to import and only needed once a query runs
+        # pylint: disable=import-outside-toplevel
+        from pymongo.errors import AutoReconnect, CursorNotFound
+
+        failures = 0
+        cursor = self.make_cursor(self._make_condition())
+        try:
+            while True:
+                try:
+                    document = cursor.next()
+                except StopIteration:
+                    return
+                except (CursorNotFound, AutoReconnect) as e:
+                    failures += 1
+                    if failures > self.max_retries:
+                        raise
+                    logger.warning(
+                        "cursor lost after %s (%s), reopening", self.resume_token, e
+                    )
+                    cursor.close()
+                    time.sleep(RETRY_DELAY * 2 ** (failures - 1))
+                    cursor = self.make_cursor(self._make_condition())
+                    self.reopened += 1
+                    continue
+                failures = 0
+                self.resume_token = tuple(document[field] for field in self.fields)
+                yield document
+        finally:
+            cursor.close()
@@ -0,0 +1,137 @@
+"""Compact storage of the small per-block series (prices, chi values,
+block timestamps, etc.) replayed alongside the events
+
+Each series is preloaded into a sorted array of block numbers and its
+values are only turned into event dictionaries when they are spliced
+into the main stream of events.
+"""
+
+from array import array
+from typing import Callable, Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+
+class BlockSeries:
+    """Values indexed by block number
+
+    :param name: name of the series
+    :param blocks: sorted block numbers
+    :param values: value at each of ``blocks``
+    :param make_event: creates the event from a block number and a value
+    :param transaction_index: transaction index of the generated events
+    :param log_index: log index of the generated events
+    """
+
+    def __init__(
+        self,
+        name: str,
+        blocks: np.ndarray,
+        values: Sequence,
+        make_event: Callable[[int, object], dict],
+        transaction_index: int,
+        log_index: int,
+    ):
+        if len(blocks) != len(values):
+            raise ValueError("blocks and values must have the same length")
+        self.name = name
+        self.blocks = blocks
+        self.values = values
+        self.make_event = make_event
+        self.transaction_index = transaction_index
+        self.log_index = log_index
+
+    @classmethod
+    def from_rows(
+        cls,
+        name: str,
+        rows: Iterable[dict],
+        get_value: Callable[[dict], object],
+        make_event: Callable[[int, object], dict],
+        transaction_index: int,
+        log_index: int,
+        integer_values: bool = False,
+    ) -> "BlockSeries":
+        """Loads a series from rows sorted by block number
+
+        :param get_value: extracts the value to store from a row
+        :param integer_values: store values in an int64 array instead of a list
+        """
+        blocks = array("q")
+        values = array("q") if integer_values else []
+        for row in rows:
+            blocks.append(row["blockNumber"])
+            values.append(get_value(row))
+        if integer_values:
+            values = np.frombuffer(values, dtype=np.int64)
+        return cls(
+            name,
+            np.frombuffer(blocks, dtype=np.int64),
+            values,
+            make_event,
+            transaction_index,
+            log_index,
+        )
+
+    @property
+    def position(self):
+        return (self.transaction_index, self.log_index)
+
+    def event_at(self, index: int) -> dict:
+        value = self.values[index]
+        if isinstance(value, np.integer):
+            value = int(value)
+        return self.make_event(int(self.blocks[index]), value)
+
+    def __len__(self):
+        return len(self.blocks)
+
+
+class SideStreams:
+    """Merges several :class:`BlockSeries` into a single sorted table
+    that can be spliced into a stream of events by block number
+
+    All the events of a series are assumed to come before the regular
+    events of the same block, i.e. to have a negative transaction index
+    """
+
+    def __init__(self, series: List[BlockSeries]):
+        self.series = sorted(series, key=lambda s: s.position)
+        blocks = [s.blocks for s in self.series]
+        ranks = [np.full(len(s), i, dtype=np.int16) for i, s in enumerate(self.series)]
+        indices = [np.arange(len(s), dtype=np.int64) for s in self.series]
+        blocks = np.concatenate(blocks) if blocks else np.array([], dtype=np.int64)
+        ranks = np.concatenate(ranks) if ranks else np.array([], dtype=np.int16)
+        indices = np.concatenate(indices) if indices else np.array([], dtype=np.int64)
+        order = np.lexsort((ranks, blocks))
+        self.blocks = blocks[order]
+        self.ranks = ranks[order]
+        self.indices = indices[order]
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def events_between(self, start: int, end: int) -> Iterator[dict]:
+        """Yields the events between the positions ``start`` and ``end``"""
+        ranks = self.ranks[start:end].tolist()
+        indices = self.indices[start:end].tolist()
+        for rank, index in zip(ranks, indices):
+            yield self.series[rank].event_at(index)
+
+    def __iter__(self) -> Iterator[dict]:
+        return self.events_between(0, len(self))
+
+    def splice(self, events: Iterable[dict]) -> Iterator[dict]:
+        """Inserts the side events into ``events``, which must be sorted"""
+        position = 0
+        last_block = None
+        for event in events:
+            block = event["blockNumber"]
+            if block != last_block:
+                end = int(np.searchsorted(self.blocks, block, side="right"))
+                if end > position:
+                    yield from self.events_between(position, end)
+                    position = end
+                last_block = block
+            yield event
+        yield from self.events_between(position, len(self))
@@ -1,11 +1,11 @@
-import inspect
 import os
+import sys
 from os import path
 
 
 def _is_test():
-    stack = inspect.stack()
-    return any(x[0].f_globals["__name__"].startswith("_pytest.") for x in stack)
+    # NOTE: pytest is always imported before the modules under test
+    return "_pytest" in sys.modules
 
 
 def _get_backd_env():
@@ -29,3 +29,12 @@ DATABASE_URL = _get_database_url()
 
 PROJECT_ROOT = path.dirname(path.dirname(__file__))
 CACHE_PATH = path.join(PROJECT_ROOT, "tmp", "cache")
+PARQUET_PATH = os.environ.get("PARQUET_PATH", path.join(PROJECT_ROOT, "tmp", "parquet"))
+BLOCK_TIMESTAMPS_PATH = path.join(PROJECT_ROOT, "tmp", "block-timestamps")
+REPLAY_LOG_PATH = os.environ.get(
+    "REPLAY_LOG_PATH", path.join(PROJECT_ROOT, "tmp", "replay-log")
+)
+DUMPS_PATH = os.environ.get("DUMPS_PATH", path.join(PROJECT_ROOT, "data"))
+
+# name of the default EventSource
+EVENT_SOURCE = os.environ.get("EVENT_SOURCE", "mongo")
@@ -0,0 +1,7 @@
+from ..event_source import EventSource
+
+# NOTE: sources are only imported when used, their modules are slow to import
+EventSource.register_lazy("dumps", "backd.sources.dumps:DumpEventSource")
+EventSource.register_lazy("memory", "backd.sources.memory:MemoryEventSource")
+EventSource.register_lazy("mongo", "backd.sources.mongo:MongoEventSource")
+EventSource.register_lazy("parquet", "backd.sources.parquet:ParquetEventSource")
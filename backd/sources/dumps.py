@@ -0,0 +1,116 @@
+from functools import lru_cache
+from os import path
+from typing import Dict, Iterable, List
+
+from .. import dumps, relevance, settings, utils
+from ..entities import event_position
+from ..event_source import EventSource
+from ..pipeline import PrefetchingStream
+from ..protocol import skip_until
+from ..relevance import EventInterest
+from ..resumable import ResumeToken
+from ..timestamps import BlockTimestamps
+
+
+@EventSource.register("dumps")
+class DumpEventSource(EventSource):
+    """Reads the raw data dumps directly, see :mod:`backd.dumps`
+
+    Each events file is decompressed and parsed by its own worker thread and
+    the sorted streams of all files are merged in replay order
+
+    :param data_path: directory of the dumps, ``settings.DUMPS_PATH`` by default
+    """
+
+    # number of chunks buffered for each events file
+    prefetch_depth = 4
+    can_count = False
+
+    def __init__(self, data_path: str = None):
+        if data_path is None:
+            data_path = settings.DUMPS_PATH
+        self.data_path = data_path
+
+    def count_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> int:
+        # NOTE: counting would require reading all the dumps once more
+        return None
+
+    def fetch_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        projection: dict = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Iterable[dict]:
+        if collection == "events":
+            return self.fetch_events(min_block, max_block, interests, resume_token)
+        return dumps.in_block_range(self.read_rows(collection), min_block, max_block)
+
+    def fetch_events(
+        self,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Iterable[dict]:
+        streams = [
+            PrefetchingStream(
+                self.read_events(filepath, min_block, max_block, interests),
+                name=path.basename(filepath),
+                depth=self.prefetch_depth,
+            )
+            for filepath in dumps.list_event_files(self.data_path)
+        ]
+        events = utils.merge_sorted_streams(*streams, key=event_position)
+        return skip_until(events, resume_token)
+
+    def read_events(
+        self,
+        filepath: str,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> Iterable[dict]:
+        events = dumps.in_block_range(dumps.read_events(filepath), min_block, max_block)
+        if relevance.is_unrestricted(interests):
+            return events
+        return (event for event in events if relevance.matches(interests, event))
+
+    def read_rows(self, collection: str) -> Iterable[dict]:
+        def get_path(filename: str) -> str:
+            return path.join(self.data_path, filename)
+
+        if collection == "ds_values":
+            return dumps.read_ds_values(
+                get_path(dumps.DS_VALUES_FILE), dumps.DS_VALUES_ADDRESS
+            )
+        if collection == "chi_values":
+            return dumps.read_int_values(get_path(dumps.CHI_VALUES_FILE), "chi")
+        if collection == "blocks":
+            return dumps.read_blocks(get_path(dumps.BLOCKS_FILE))
+        if collection == "prices":
+            prices = dumps.read_prices(get_path(dumps.PRICES_FILE))
+            return dumps.align_prices(prices, self.get_block_timestamps())
+        raise ValueError(f"no dump for collection {collection}")
+
+    def fetch_dsr_rates(self) -> List[dict]:
+        return dumps.read_dsr_rates()
+
+    @lru_cache(maxsize=None)
+    def get_last_blocks(self, event: str) -> Dict[str, int]:
+        # NOTE: requires a full pass over the events the first time
+        return dumps.read_last_blocks(self.data_path).get(event, {})
+
+    @lru_cache(maxsize=None)
+    def get_block_timestamps(self) -> BlockTimestamps:
+        return dumps.read_block_timestamps(path.join(self.data_path, dumps.BLOCKS_FILE))
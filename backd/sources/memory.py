@@ -0,0 +1,88 @@
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+from bson import Decimal128
+
+from .. import relevance
+from ..entities import event_position
+from ..event_source import EventSource
+from ..protocol import skip_until
+from ..relevance import EventInterest
+from ..resumable import ResumeToken
+from ..timestamps import BlockTimestamps
+
+
+@EventSource.register("memory")
+class MemoryEventSource(EventSource):
+    """Serves collections held in memory, e.g. for hermetic tests and benchmarks
+
+    :param collections: rows of each collection, sorted on creation
+    """
+
+    # NOTE: the stored rows are yielded as is and must not be modified
+    yields_owned_rows = False
+
+    def __init__(self, collections: Dict[str, List[dict]] = None):
+        self.collections = {}
+        for name, rows in (collections or {}).items():
+            key = event_position if name == "events" else _get_block
+            self.collections[name] = sorted(rows, key=key)
+
+    def count_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> int:
+        rows = self.fetch_rows(collection, min_block, max_block, interests=interests)
+        return sum(1 for _row in rows)
+
+    def fetch_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        projection: dict = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Iterable[dict]:
+        rows = (
+            row
+            for row in self.collections.get(collection, [])
+            if (min_block is None or row["blockNumber"] >= min_block)
+            and (max_block is None or row["blockNumber"] <= max_block)
+        )
+        if collection == "events":
+            rows = skip_until(rows, resume_token)
+            if not relevance.is_unrestricted(interests):
+                rows = (row for row in rows if relevance.matches(interests, row))
+        return rows
+
+    def fetch_dsr_rates(self) -> List[dict]:
+        return [
+            {"blockNumber": row["blockNumber"], "rate": _to_decimal(row["rate"])}
+            for row in self.collections.get("dsr", [])
+        ]
+
+    def get_last_blocks(self, event: str) -> Dict[str, int]:
+        last_blocks = {}
+        for row in self.collections.get("events", []):
+            if row["event"] == event:
+                last_blocks[row["address"].lower()] = row["blockNumber"]
+        return last_blocks
+
+    def get_block_timestamps(self) -> BlockTimestamps:
+        return BlockTimestamps.from_rows(self.collections.get("blocks", []))
+
+
+def _get_block(row: dict) -> int:
+    return row["blockNumber"]
+
+
+def _to_decimal(value) -> Decimal:
+    if isinstance(value, Decimal128):
+        return value.to_decimal()
+    return Decimal(value)
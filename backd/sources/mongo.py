@@ -0,0 +1,132 @@
+from typing import Dict, Iterable, List
+
+import pymongo
+
+from .. import catalog, db, relevance, timestamps
+from ..event_source import EventSource
+from ..relevance import EventInterest
+from ..resumable import ResumableCursor, ResumeToken
+from ..tokens.dai import utils as dai_utils
+
+
+@EventSource.register("mongo")
+class MongoEventSource(EventSource):
+    """Reads the collections of the MongoDB database in ``settings.DATABASE_URL``"""
+
+    def count_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> int:
+        """Counts the rows of ``collection`` using the catalog if available.
+        Interests restricting addresses or arguments are only applied to the
+        blocks not covered by the catalog, so the count is then an upper bound.
+        The collection is counted directly if its catalog is stale
+        """
+        stats = catalog.load_current(collection)
+        if stats is None:
+            return self.count_rows_in_db(collection, min_block, max_block, interests)
+        return stats.count_between(
+            min_block,
+            max_block,
+            events=relevance.event_names(interests),
+            count_range=lambda first, last: self.count_rows_in_db(
+                collection, first, last, interests
+            ),
+        )
+
+    def count_rows_in_db(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> int:
+        condition = self.make_block_range_condition(min_block, max_block)
+        event_filter = relevance.compile_filter(interests)
+        if not event_filter:
+            return db.db[collection].count_documents(condition)
+        condition.update(event_filter)
+        return db.db[collection].count_documents(
+            condition, collation=relevance.COLLATION
+        )
+
+    def fetch_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        projection: dict = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Iterable[dict]:
+        """The cursor is reopened if it is lost, see
+        :class:`backd.resumable.ResumableCursor`
+        """
+        sort_key = db.SORT_KEY if collection == "events" else "blockNumber"
+        event_filter = relevance.compile_filter(interests)
+        collation = relevance.COLLATION if event_filter else None
+
+        def make_cursor(condition: dict) -> pymongo.CursorType:
+            cursor = (
+                db.get_collection(collection, raw=lazy)
+                .find(
+                    condition,
+                    projection=projection,
+                    no_cursor_timeout=True,
+                    collation=collation,
+                )
+                .sort(sort_key)
+            )
+            if batch_size:
+                cursor = cursor.batch_size(batch_size)
+            return cursor
+
+        condition = self.make_block_range_condition(min_block, max_block)
+        condition.update(event_filter)
+        fields = [key for key, _order in db.SORT_KEY]
+        if collection != "events":
+            # NOTE: other collections have at most one row per block
+            fields = ["blockNumber"]
+        return ResumableCursor(
+            make_cursor, condition, fields, resume_token=resume_token
+        )
+
+    def fetch_dsr_rates(self) -> List[dict]:
+        return dai_utils.fetch_dsr_rates()
+
+    def get_last_blocks(self, event: str) -> Dict[str, int]:
+        stats = catalog.load_current("events")
+        if stats is not None and stats.last_blocks.get(event):
+            return stats.last_blocks[event]
+        cursor = db.db.events.aggregate(
+            [
+                {"$match": {"event": event}},
+                {
+                    "$group": {
+                        "_id": {"$toLower": "$address"},
+                        "block": {"$max": "$blockNumber"},
+                    }
+                },
+            ]
+        )
+        return {row["_id"]: row["block"] for row in cursor}
+
+    def get_block_timestamps(self) -> timestamps.BlockTimestamps:
+        return timestamps.get_block_timestamps()
+
+    def make_block_range_condition(
+        self, min_block: int = None, max_block: int = None
+    ) -> dict:
+        block_number = {}
+        if min_block:
+            block_number.update({"$gte": min_block})
+        if max_block is not None:
+            block_number.update({"$lte": max_block})
+        if not block_number:
+            return {}
+        return {"blockNumber": block_number}
@@ -0,0 +1,78 @@
+from os import path
+from typing import Dict, Iterable, List
+
+from .. import columnar, relevance, settings
+from ..event_source import EventSource
+from ..protocol import skip_until
+from ..relevance import EventInterest
+from ..resumable import ResumeToken
+from ..timestamps import BlockTimestamps
+
+
+@EventSource.register("parquet")
+class ParquetEventSource(EventSource):
+    """Reads the Parquet files written by ``backd convert-events``
+
+    :param data_path: directory of the files, ``settings.PARQUET_PATH`` by default
+    """
+
+    def __init__(self, data_path: str = None):
+        if data_path is None:
+            data_path = settings.PARQUET_PATH
+        self.data_path = data_path
+
+    def count_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        interests: List[EventInterest] = None,
+    ) -> int:
+        directory = path.join(self.data_path, collection)
+        if relevance.is_unrestricted(interests):
+            return columnar.count_collection(directory, min_block, max_block)
+        rows = self.fetch_rows(collection, min_block, max_block, interests=interests)
+        return sum(1 for _row in rows)
+
+    def fetch_rows(
+        self,
+        collection: str,
+        min_block: int = None,
+        max_block: int = None,
+        projection: dict = None,
+        lazy: bool = False,
+        batch_size: int = None,
+        interests: List[EventInterest] = None,
+        resume_token: ResumeToken = None,
+    ) -> Iterable[dict]:
+        # NOTE: Parquet files are already stripped of unused fields
+        # and decoded one record batch at a time
+        directory = path.join(self.data_path, collection)
+        rows = skip_until(
+            columnar.read_collection(directory, min_block, max_block), resume_token
+        )
+        if relevance.is_unrestricted(interests):
+            return rows
+        return (row for row in rows if relevance.matches(interests, row))
+
+    def fetch_dsr_rates(self) -> List[dict]:
+        return [
+            {"blockNumber": row["blockNumber"], "rate": row["rate"].to_decimal()}
+            for row in self.fetch_rows("dsr")
+        ]
+
+    def get_last_blocks(self, event: str) -> Dict[str, int]:
+        directory = path.join(self.data_path, "events")
+        rows = columnar.read_collection(
+            directory,
+            columns=["address", "blockNumber"],
+            filters=[("event", "==", event)],
+        )
+        last_blocks = {}
+        for row in rows:
+            address = row["address"].lower()
+            last_blocks[address] = max(last_blocks.get(address, 0), row["blockNumber"])
+        return last_blocks
+
+    def get_block_timestamps(self) -> BlockTimestamps:
+        return BlockTimestamps.from_rows(self.fetch_rows("blocks"))
@@ -0,0 +1,179 @@
+"""Compact index of block timestamps
+
+The timestamps of all blocks are stored as two sorted ``int64`` arrays,
+block numbers and unix timestamps, saved as ``.npy`` files and memory-mapped
+when loaded. Lookups in both directions are binary searches and work on
+whole arrays at once.
+"""
+
+import datetime as dt
+import json
+import os
+from os import path
+from typing import TYPE_CHECKING, Iterable, Union
+
+import numpy as np
+
+from . import catalog, db, settings
+from .logger import logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+BLOCKS_FILENAME = "blocks.npy"
+TIMESTAMPS_FILENAME = "timestamps.npy"
+METADATA_FILENAME = "metadata.json"
+
+# returned by lookups of timestamps after the last known block
+NO_BLOCK = -1
+
+ArrayLike = Union[np.ndarray, Iterable[int]]
+
+
+class BlockTimestamps:
+    """Timestamps of a sorted set of blocks
+
+    :param blocks: sorted block numbers
+    :param timestamps: unix timestamp of each of ``blocks``
+    """
+
+    def __init__(self, blocks: np.ndarray, timestamps: np.ndarray):
+        if len(blocks) != len(timestamps):
+            raise ValueError("blocks and timestamps must have the same length")
+        self.blocks = blocks
+        self.timestamps = timestamps
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> "BlockTimestamps":
+        """Builds the index from ``blockNumber`` and ``timestamp`` rows"""
+        pairs = np.array(
+            [(row["blockNumber"], int(row["timestamp"])) for row in rows],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        pairs = pairs[np.argsort(pairs[:, 0], kind="stable")]
+        return cls(np.ascontiguousarray(pairs[:, 0]), np.ascontiguousarray(pairs[:, 1]))
+
+    @classmethod
+    def build(cls) -> "BlockTimestamps":
+        projection = db.make_projection(["blockNumber", "timestamp"])
+        rows = db.db.blocks.find(projection=projection).sort("blockNumber")
+        return cls.from_rows(rows)
+
+    def save(self, directory: str, version: int = None):
+        os.makedirs(directory, exist_ok=True)
+        np.save(path.join(directory, BLOCKS_FILENAME), self.blocks)
+        np.save(path.join(directory, TIMESTAMPS_FILENAME), self.timestamps)
+        with open(path.join(directory, METADATA_FILENAME), "w") as f:
+            json.dump(self.describe(version), f)
+
+    def describe(self, version: int = None) -> dict:
+        """Metadata saved with the index to detect when it is out of date"""
+        max_block = int(self.blocks[-1]) if len(self) else None
+        return {"version": version, "count": len(self), "max_block": max_block}
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "BlockTimestamps":
+        mmap_mode = "r" if mmap else None
+        return cls(
+            np.load(path.join(directory, BLOCKS_FILENAME), mmap_mode=mmap_mode),
+            np.load(path.join(directory, TIMESTAMPS_FILENAME), mmap_mode=mmap_mode),
+        )
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def __contains__(self, block: int) -> bool:
+        return bool(self.contains(np.array([block], dtype=np.int64))[0])
+
+    def _find(self, blocks: ArrayLike):
+        blocks = np.asarray(blocks, dtype=np.int64)
+        indexes = np.searchsorted(self.blocks, blocks)
+        found = indexes < len(self.blocks)
+        found[found] = self.blocks[indexes[found]] == blocks[found]
+        return indexes, found
+
+    def contains(self, blocks: ArrayLike) -> np.ndarray:
+        """Returns a boolean mask of the ``blocks`` present in the index"""
+        _indexes, found = self._find(blocks)
+        return found
+
+    def timestamps_of(self, blocks: ArrayLike) -> np.ndarray:
+        """Returns the unix timestamps of ``blocks``
+
+        :raises KeyError: if one of the blocks is not in the index
+        """
+        indexes, found = self._find(blocks)
+        if not found.all():
+            missing = np.asarray(blocks)[~found]
+            raise KeyError(f"unknown blocks: {missing[:10].tolist()}")
+        return np.asarray(self.timestamps[indexes])
+
+    def timestamp_of(self, block: int) -> int:
+        return int(self.timestamps_of([block])[0])
+
+    def datetime_of(self, block: int) -> dt.datetime:
+        return dt.datetime.fromtimestamp(self.timestamp_of(block), dt.timezone.utc)
+
+    def to_datetime_index(self, blocks: ArrayLike) -> "pd.DatetimeIndex":
+        """Converts ``blocks`` into timezone-aware dates"""
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        return pd.to_datetime(self.timestamps_of(blocks), unit="s", utc=True)
+
+    def blocks_at(self, timestamps: ArrayLike) -> np.ndarray:
+        """Returns the first block mined at or after each of ``timestamps``,
+        or ``NO_BLOCK`` for timestamps after the last block
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        indexes = np.searchsorted(self.timestamps, timestamps, side="left")
+        result = np.full(len(timestamps), NO_BLOCK, dtype=np.int64)
+        found = indexes < len(self.blocks)
+        result[found] = self.blocks[indexes[found]]
+        return result
+
+    def block_at(self, timestamp: int) -> int:
+        return int(self.blocks_at([timestamp])[0])
+
+
+def _read_metadata(directory: str) -> dict:
+    try:
+        with open(path.join(directory, METADATA_FILENAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def is_up_to_date(metadata: dict, version: int, max_block: int, count: int) -> bool:
+    """Whether an index saved with ``metadata`` covers the blocks collection,
+    known by its catalog ``version`` if any, or else by its last block and
+    number of blocks
+    """
+    if version is not None:
+        return metadata.get("version") == version
+    return metadata.get("max_block") == max_block and metadata.get("count") == count
+
+
+def _is_saved_index_current(directory: str, version: int) -> bool:
+    if not path.exists(path.join(directory, BLOCKS_FILENAME)):
+        return False
+    max_block, count = None, None
+    if version is None:
+        # NOTE: blocks stored without the catalog, compare with the collection
+        max_block = catalog.find_max_block("blocks")
+        count = db.db.blocks.estimated_document_count()
+    return is_up_to_date(_read_metadata(directory), version, max_block, count)
+
+
+def get_block_timestamps(
+    directory: str = settings.BLOCK_TIMESTAMPS_PATH,
+) -> BlockTimestamps:
+    """Returns the memory-mapped index of block timestamps, rebuilding it
+    when the blocks collection changed according to the catalog, or to the
+    collection itself when it is not in the catalog
+    """
+    version = catalog.data_version().get("blocks")
+    if _is_saved_index_current(directory, version):
+        return BlockTimestamps.load(directory)
+    logger.info("building block timestamps index in %s", directory)
+    BlockTimestamps.build().save(directory, version=version)
+    return BlockTimestamps.load(directory)
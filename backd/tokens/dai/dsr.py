@@ -1,25 +1,45 @@
-from typing import List
+from typing import List, Union
 from decimal import Decimal
 
+import numpy as np
 
 from ... import constants
-from . import utils
+from ...event_source import EventSource
+from . import rates
+from .rates import RateIndex
 
 
 DSR_DIVISOR = Decimal(10) ** constants.DSR_DECIMALS
 
 
 class DSR:
-    def __init__(self, dsr_rates: List[dict]):
-        self.dsr_rates = sorted(dsr_rates, key=lambda row: -row["blockNumber"])
+    """DSR rates by block, as ray integers
 
-    def get(self, block_number: int):
-        for rate_info in self.dsr_rates:
-            if rate_info["blockNumber"] <= block_number:
-                return rate_info["rate"]
-        return self.dsr_rates[-1]["rate"]
+    :param dsr_rates: ``blockNumber`` and ``rate`` rows
+    :param index: already built index of the rates, used instead of ``dsr_rates``
+    """
+
+    def __init__(self, dsr_rates: List[dict] = None, index: RateIndex = None):
+        if index is None:
+            index = RateIndex.from_rows(dsr_rates or [])
+        self.index = index
+
+    def __setstate__(self, state: dict):
+        # NOTE: DSRs pickled before the index stored the rows sorted by block
+        if "dsr_rates" in state:
+            state = {"index": RateIndex.from_rows(state["dsr_rates"])}
+        self.__dict__.update(state)
+
+    def get(self, block_number: int) -> int:
+        return self.index.get(block_number)
+
+    def get_many(self, blocks: rates.ArrayLike) -> np.ndarray:
+        return self.index.get_many(blocks)
 
     @classmethod
-    def create(cls):
-        dsr_rates = utils.fetch_dsr_rates()
-        return cls(dsr_rates=dsr_rates)
+    def create(cls, source: Union[str, EventSource] = None):
+        """Creates the DSR with the rates of ``source``, see
+        :func:`backd.event_source.get_source`. The rates are loaded once and
+        shared with the other DSRs of the same source
+        """
+        return cls(index=rates.get_dsr_index(source))
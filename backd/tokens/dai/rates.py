@@ -0,0 +1,124 @@
+"""Block-indexed rates of the DAI Savings Rate contract
+
+The DSR changes rarely compared to the number of blocks at which it is
+read, so it is kept as sorted block numbers and the rate set at each of
+them. The rate at a block is the last one set at or before it, found with a
+binary search.
+
+Indexes are loaded once per event source and shared by the whole process,
+:func:`clear` drops them when the underlying data changed.
+"""
+
+import weakref
+from bisect import bisect_right
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+
+from ... import settings
+from ...event_source import EventSource, get_source
+
+RAY = 10 ** 27
+
+ArrayLike = Union[np.ndarray, Iterable[int]]
+
+
+def to_int(value) -> int:
+    """Converts a rate stored as ``Decimal128``, decimal, string or int"""
+    if hasattr(value, "to_decimal"):
+        value = value.to_decimal()
+    if isinstance(value, str):
+        value = Decimal(value)
+    return int(value)
+
+
+class RateIndex:
+    """Rates set at a sorted set of blocks
+
+    :param blocks: sorted block numbers
+    :param rates: rate set at each of ``blocks``, as ray integers which may
+        not fit in 64 bits
+    """
+
+    def __init__(self, blocks: List[int], rates: List[int]):
+        if len(blocks) != len(rates):
+            raise ValueError("blocks and rates must have the same length")
+        self.blocks = blocks
+        self.rates = rates
+        self._block_array = np.array(blocks, dtype=np.int64)
+        self._rate_array = np.array(rates, dtype=object)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict], field: str = "rate") -> "RateIndex":
+        """Builds the index from ``blockNumber`` and ``field`` rows"""
+        pairs = sorted((row["blockNumber"], to_int(row[field])) for row in rows)
+        return cls([block for block, _ in pairs], [rate for _, rate in pairs])
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def __getstate__(self):
+        return {"blocks": self.blocks, "rates": self.rates}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["blocks"], state["rates"])
+
+    def get(self, block_number: int) -> int:
+        """Returns the rate at ``block_number``. Blocks before the first rate
+        use the first rate
+        """
+        if not self.rates:
+            raise LookupError("no rates in index")
+        # NOTE: bisect on the list is faster than numpy for a single block
+        index = bisect_right(self.blocks, block_number) - 1
+        return self.rates[max(index, 0)]
+
+    def get_many(self, blocks: ArrayLike) -> np.ndarray:
+        """Returns the rates at each of ``blocks`` as an array of integers"""
+        if not self.rates:
+            raise LookupError("no rates in index")
+        blocks = np.asarray(blocks, dtype=np.int64)
+        indexes = np.searchsorted(self._block_array, blocks, side="right") - 1
+        return self._rate_array[np.maximum(indexes, 0)]
+
+
+_named_indexes: Dict[Tuple[str, str], RateIndex] = {}
+_source_indexes: "weakref.WeakKeyDictionary[EventSource, Dict[str, RateIndex]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_index(
+    kind: str,
+    source: Union[str, EventSource],
+    build: Callable[[EventSource], RateIndex],
+) -> RateIndex:
+    if isinstance(source, EventSource):
+        indexes = _source_indexes.setdefault(source, {})
+        if kind not in indexes:
+            indexes[kind] = build(source)
+        return indexes[kind]
+    if source is None:
+        source = settings.EVENT_SOURCE
+    key = (kind, source)
+    if key not in _named_indexes:
+        _named_indexes[key] = build(get_source(source))
+    return _named_indexes[key]
+
+
+def _build_dsr_index(source: EventSource) -> RateIndex:
+    return RateIndex.from_rows(source.fetch_dsr_rates())
+
+
+def get_dsr_index(source: Union[str, EventSource] = None) -> RateIndex:
+    """Returns the shared index of the DSR rates of ``source``, see
+    :func:`backd.event_source.get_source`
+    """
+    return _get_index("dsr", source, _build_dsr_index)
+
+
+def clear():
+    """Drops all the shared indexes, e.g. after new rates were stored"""
+    _named_indexes.clear()
+    _source_indexes.clear()
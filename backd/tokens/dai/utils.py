@@ -1,10 +1,12 @@
 from typing import Union
 from decimal import Decimal
 
+import numpy as np
 from bson import Decimal128
 
 from ... import constants
-from ...db import db
+from ... import db
+from .rates import RAY
 
 
 SECONDS_PER_DAY = 60 * 60 * 24
@@ -20,8 +22,18 @@ def compute_apy(dsr: Union[int, str, Decimal, Decimal128]):
     return ((dsr / DECIMALS - 1) * SECONDS_PER_DAY + 1) ** DAYS_IN_YEAR
 
 
+def compute_apys(dsrs) -> np.ndarray:
+    """Computes the APY of each of ``dsrs`` at once, e.g. the rates returned by
+    :meth:`backd.tokens.dai.rates.RateIndex.get_many`, as floats
+    """
+    # NOTE: the difference to RAY is exact, only the per-second rate is a float
+    dsrs = np.asarray(dsrs, dtype=object)
+    per_second = (dsrs - RAY).astype(np.float64) / RAY
+    return (per_second * SECONDS_PER_DAY + 1) ** DAYS_IN_YEAR
+
+
 def fetch_dsr_rates():
     return [
         {"blockNumber": row["blockNumber"], "rate": row["rate"].to_decimal()}
-        for row in db.dsr.find()
+        for row in db.db.dsr.find()
     ]
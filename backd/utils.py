@@ -1,21 +1,61 @@
+import gc
 import heapq
+from contextlib import contextmanager
+from typing import IO
 
 
 def merge_sorted_streams(*streams, key=lambda x: x):
+    # heap entries are reused for the whole life of their stream and the
+    # stream index breaks ties so that values are never compared
     values = []
+    for index, stream in enumerate(streams):
+        iterator = iter(stream)
+        for value in iterator:
+            values.append([key(value), index, value, iterator])
+            break
+    heapq.heapify(values)
 
-    def _add_next(iterator):
-        try:
-            value = next(iterator)
-            sort_key = key(value)
-            heapq.heappush(values, (sort_key, value, iterator))
-        except StopIteration:
-            pass
+    while len(values) > 1:
+        entry = values[0]
+        yield entry[2]
+        for value in entry[3]:
+            entry[0] = key(value)
+            entry[2] = value
+            heapq.heapreplace(values, entry)
+            break
+        else:
+            heapq.heappop(values)
 
-    for stream in streams:
-        iterator = iter(stream)
-        _add_next(iterator)
-    while values:
-        _sort_key, value, iterator = heapq.heappop(values)
+    if values:
+        _sort_key, _index, value, iterator = values[0]
         yield value
-        _add_next(iterator)
+        yield from iterator
+
+
+@contextmanager
+def deferred_gc():
+    """Disables automatic garbage collection, e.g. during a long replay
+
+    Objects allocated before entering are moved to the permanent generation
+    so they are never scanned again. Callers are expected to run
+    ``gc.collect(1)`` at points where little is alive, such as between blocks,
+    and a full ``gc.collect()`` from time to time to free older cycles.
+    """
+    gc.collect()
+    gc.freeze()
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+        gc.unfreeze()
+
+
+def open_file(filepath: str, mode: str = "r") -> IO:
+    """Opens a local, remote or compressed file with ``smart_open``"""
+    # NOTE: smart_open is slow to import and only needed when reading dumps
+    from smart_open import open as smart_open  # pylint: disable=import-outside-toplevel
+
+    return smart_open(filepath, mode)
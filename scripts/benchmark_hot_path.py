@@ -0,0 +1,116 @@
+"""Measures the throughput of the merge → normalize → process hot path
+
+Compares the original path (PointInTime sort keys, copied events) with the
+allocation-free one (packed sort keys, in-place normalization, recycled
+positions and deferred garbage collection) on synthetic events.
+"""
+
+import argparse
+import heapq
+import time
+
+from backd import utils
+from backd.entities import PointInTime, State, event_position
+from backd.event_processor import Processor
+from backd.hook import Hooks
+
+
+parser = argparse.ArgumentParser(prog="benchmark-hot-path")
+parser.add_argument(
+    "-n", "--events", type=int, default=500_000, help="number of events to replay"
+)
+parser.add_argument(
+    "-r", "--repeat", type=int, default=3, help="number of runs of each path"
+)
+
+
+class NoopProcessor(Processor):
+    def _process_event(self, state, event):
+        pass
+
+
+def legacy_merge_sorted_streams(*streams, key=lambda x: x):
+    values = []
+
+    def _add_next(iterator):
+        try:
+            value = next(iterator)
+            heapq.heappush(values, (key(value), value, iterator))
+        except StopIteration:
+            pass
+
+    for stream in streams:
+        _add_next(iter(stream))
+    while values:
+        _sort_key, value, iterator = heapq.heappop(values)
+        yield value
+        _add_next(iterator)
+
+
+def generate_events(count: int):
+    # synthetic main events with 10 events per block and a price every block
+    for i in range(count):
+        yield {
+            "event": "Transfer",
+            "address": "0xABCDEF0123456789ABCDEF0123456789ABCDEF01",
+            "returnValues": {
+                "from": "0x0123456789ABCDEF0123456789ABCDEF01234567",
+                "to": "0x89ABCDEF0123456789ABCDEF0123456789ABCDEF",
+                "amount": str(i),
+            },
+            "blockNumber": 10_000_000 + i // 10,
+            "transactionIndex": i % 10,
+            "logIndex": i % 10,
+        }
+
+
+def generate_prices(count: int):
+    for block in range(10_000_000, 10_000_000 + count // 10):
+        yield {
+            "event": "ExternalPriceUpdated",
+            "address": "0xPRICE",
+            "returnValues": {"price": block, "symbol": "ETH"},
+            "blockNumber": block,
+            "transactionIndex": -10,
+            "logIndex": -10,
+        }
+
+
+def run_legacy(count: int):
+    events = legacy_merge_sorted_streams(
+        generate_events(count), generate_prices(count), key=PointInTime.from_event
+    )
+    NoopProcessor(hooks=Hooks()).process_events(State("benchmark"), events)
+
+
+def run_hot_path(count: int):
+    events = utils.merge_sorted_streams(
+        generate_events(count), generate_prices(count), key=event_position
+    )
+    processor = NoopProcessor(hooks=Hooks())
+    processor.process_events(
+        State("benchmark"), events, in_place=True, gc_interval=1000
+    )
+
+
+def measure(func, count: int, repeat: int) -> float:
+    total_events = count + count // 10
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(count)
+        best = min(best, time.perf_counter() - start)
+    return total_events / best
+
+
+def main():
+    args = parser.parse_args()
+    legacy = measure(run_legacy, args.events, args.repeat)
+    hot_path = measure(run_hot_path, args.events, args.repeat)
+    print(f"legacy path: {legacy:,.0f} events/s")
+    print(f"hot path:    {hot_path:,.0f} events/s")
+    print(f"speedup:     {hot_path / legacy:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Measures the startup time of the command line interface
+
+Each command runs in a fresh interpreter so that nothing is already imported.
+Fails if the best run of a command exceeds its budget, to catch imports of
+pandas, matplotlib, pyarrow or a database connection sneaking back into the
+startup path.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+
+COMMANDS = {
+    "import": [sys.executable, "-c", "import backd.cli"],
+    "help": [sys.executable, "-c", "from backd import cli; cli.run()", "--help"],
+    "command-help": [
+        sys.executable,
+        "-c",
+        "from backd import cli; cli.run()",
+        "process-all-events",
+        "--help",
+    ],
+}
+
+
+parser = argparse.ArgumentParser(prog="benchmark-startup")
+parser.add_argument(
+    "-r", "--repeat", type=int, default=5, help="number of runs of each command"
+)
+parser.add_argument(
+    "-b", "--budget", type=float, default=0.6, help="maximum time in seconds"
+)
+
+
+def measure(command, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    args = parser.parse_args()
+    failed = False
+    for name, command in COMMANDS.items():
+        elapsed = measure(command, args.repeat)
+        status = "ok" if elapsed <= args.budget else "over budget"
+        failed = failed or elapsed > args.budget
+        print(f"{name:15} {elapsed * 1000:8.1f}ms  {status}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,92 @@
+"""Samples on-chain oracle prices to validate the emulated Compound oracles
+
+The output is resumable: running the script again with the same seed and
+output file only fetches the blocks missing from the file.
+"""
+
 import argparse
 import os
-import random
-import json
 
-from web3 import Web3
-from web3.providers.auto import load_provider_from_uri
-from web3.exceptions import BadFunctionCallOutput
 import pymongo
 
-from backd.db import db
+from backd import db, json_rpc
 from backd.entities import Oracle
-from backd.protocols.compound import constants
-from backd.logger import logger
-
-
-GET_UNDERLYING_PRICE_ABI = {
-    "constant": True,
-    "inputs": [
-        {
-            "name": "cToken",
-            "type": "address"
-        }
-    ],
-    "name": "getUnderlyingPrice",
-    "outputs": [
-        {
-            "name": "",
-            "type": "uint256"
-        }
-    ],
-    "payable": False,
-    "stateMutability": "view",
-    "type": "function"
-}
-CTOKENS = [Web3.toChecksumAddress(market["address"])
-           for market in constants.MARKETS]
-
-
-WEB3_URI = os.environ.get(
-    "WEB3_PROVIDER_URI", "http://satoshi.doc.ic.ac.uk:8545")
+from backd.protocols.compound import constants, price_sampler
 
 
-DEFAULT_SAMPLES_COUNT = 50
-
-web3 = Web3(provider=load_provider_from_uri(WEB3_URI))
-
-first_block = list(db.events.find({"event": "NewComptroller"}).sort(
-    [("blockNumber", pymongo.ASCENDING)]).limit(1))[0]["blockNumber"]
-last_block = list(db.events.find().sort(
-    [("blockNumber", pymongo.DESCENDING)]).limit(1))[0]["blockNumber"]
+WEB3_URI = os.environ.get("WEB3_PROVIDER_URI", "http://satoshi.doc.ic.ac.uk:8545")
 
+DEFAULT_SAMPLES_COUNT = 50
+DEFAULT_SEED = 42
 
-oracles = Oracle.registered()
 # contract does not have getUnderlyingPrice
-oracles.remove("0x02557a5e05defeffd4cae6d83ea3d173b272c904")
-oracles = [web3.toChecksumAddress(address) for address in oracles]
-
-
-def call_contract(address, block, asset):
-    contract = web3.eth.contract(address=address, abi=[
-        GET_UNDERLYING_PRICE_ABI])
-    try:
-        result = contract.functions.getUnderlyingPrice(asset).call(
-            block_identifier=block)
-        return int(result)
-    except BadFunctionCallOutput:
-        return None
-
-
-def fetch_results(fout, samples_count):
-    sample_blocks = sorted(random.sample(
-        range(first_block, last_block), samples_count))
-
-    for i, block in enumerate(sample_blocks):
-        if i % 5 == 0:
-            logger.info("progress: %s/%s", i, len(sample_blocks))
-        prices = []
-        for address in oracles:
-            for asset in CTOKENS:
-                result = call_contract(address, block, asset)
-                if result:
-                    price = {"address": address,
-                             "asset": asset, "price": result}
-                    prices.append(price)
-        row = {"block": block, "prices": prices}
-        print(json.dumps(row), file=fout)
+EXCLUDED_ORACLES = ["0x02557a5e05defeffd4cae6d83ea3d173b272c904"]
+
+
+parser = argparse.ArgumentParser(prog="fetch-sample-prices")
+parser.add_argument(
+    "-n",
+    "--sample-count",
+    type=int,
+    default=DEFAULT_SAMPLES_COUNT,
+    help="number of blocks to sample",
+)
+parser.add_argument("-o", "--output", required=True, help="output JSONL file")
+parser.add_argument(
+    "--seed", type=int, default=DEFAULT_SEED, help="seed of the sampled blocks"
+)
+parser.add_argument("--uri", default=WEB3_URI, help="JSON-RPC endpoint")
+parser.add_argument("--first-block", type=int, help="first block to sample from")
+parser.add_argument("--last-block", type=int, help="last block to sample from")
+parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=json_rpc.DEFAULT_BATCH_SIZE,
+    help="number of calls per JSON-RPC request",
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=json_rpc.DEFAULT_CONCURRENCY,
+    help="number of JSON-RPC requests in flight",
+)
+parser.add_argument(
+    "--retries",
+    type=int,
+    default=json_rpc.DEFAULT_RETRIES,
+    help="number of retries of a failed request",
+)
+
+
+def find_first_block() -> int:
+    cursor = db.db.events.find({"event": "NewComptroller"})
+    return cursor.sort("blockNumber", pymongo.ASCENDING).limit(1)[0]["blockNumber"]
+
+
+def find_last_block() -> int:
+    cursor = db.db.events.find()
+    return cursor.sort("blockNumber", pymongo.DESCENDING).limit(1)[0]["blockNumber"]
 
 
 def main():
-    parser = argparse.ArgumentParser(prog="fetch-sample-prices")
-    parser.add_argument("-n", "--sample-count", default=DEFAULT_SAMPLES_COUNT,
-                        help="number of blocks to sample")
-    parser.add_argument("-o", "--output", required=True,
-                        help="output JSON file")
     args = parser.parse_args()
-
-    with open(args.output, "w") as f:
-        fetch_results(f, args.sample_count)
+    first_block = args.first_block or find_first_block()
+    last_block = args.last_block or find_last_block()
+    blocks = price_sampler.sample_blocks(
+        first_block, last_block, args.sample_count, seed=args.seed
+    )
+    oracles = [
+        address for address in Oracle.registered() if address not in EXCLUDED_ORACLES
+    ]
+    ctokens = [market["address"] for market in constants.MARKETS]
+    client = json_rpc.BatchClient(
+        args.uri,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        retries=args.retries,
+    )
+    with client:
+        price_sampler.run_sampling(client, blocks, oracles, ctokens, args.output)
 
 
 if __name__ == "__main__":
@@ -4,7 +4,7 @@ import json
 
 os.environ.setdefault("BACKD_ENV", "test")
 
-from backd import settings  # pylint: disable=wrong-import-position
+from backd import ingest, settings  # pylint: disable=wrong-import-position
 from backd.db import db  # pylint: disable=wrong-import-position
 from scripts.store_int_results import (  # pylint: disable=wrong-import-position
     import_int_values,
@@ -19,6 +19,5 @@ import_int_values(
 )
 
 with open(path.join(FIXTURES_PATH, "compound-dummy-events.jsonl")) as f:
-    for line in f:
-        event = json.loads(line)
-        db.events.insert_one(event)
+    events = [json.loads(line) for line in f]
+ingest.store_documents("events", events)
@@ -15,12 +15,14 @@ zcat "$data_path/blocks.csv.gz" | mongoimport --db=backd-data --collection=block
 echo "Inserting prices"
 python scripts/store_prices.py "$data_path/ethusdt.csv"
 echo "Inserting all events"
-find "$data_path/events" -name "*.jsonl.gz" -print0 | xargs -0 zcat | mongoimport --db=backd-data --collection=events
+backd ingest "$data_path/events" --no-indices
 echo "Inserting DSR rates"
 python scripts/store_int_results.py data/dsr-rates.json -c dsr -f rate
 echo "Inserting chi values"
 python scripts/store_int_results.py "$data_path/compound/chi-values.jsonl.gz" -c chi_values -f chi
 echo "Inserting DS Values"
 python scripts/store_ds_values.py "$data_path/compound/medianizer-peek-full.jsonl.gz" -a 0x729D19f657BD0614b4985Cf1D82531c67569197B
-echo "Creating indices"
-backd create-indices
+echo "Creating indexes"
+backd indexes
+echo "Building catalog"
+backd catalog --rebuild
@@ -1,12 +1,6 @@
 import argparse
-import json
-from decimal import Decimal
 
-from bson import Decimal128
-
-from smart_open import open as smart_open
-
-from backd.db import db
+from backd import dumps, ingest
 
 
 parser = argparse.ArgumentParser(prog="store-usdc-prices")
@@ -18,26 +12,8 @@ parser.add_argument("-a", "--address", required=True, help="address of the contr
 
 
 def import_ds_values(input_file, address, collection):
-    collection = db[collection]
-
-    current_price = None
-    with smart_open(input_file) as f:
-        for line in f:
-            parsed = json.loads(line)
-            price, is_set = parsed.get("result", [parsed.get("price"), True])
-            if not price:
-                raise ValueError("invalid format, price not found")
-            if not is_set:
-                price = "0"
-            if price != current_price:
-                current_price = price
-                collection.insert_one(
-                    {
-                        "blockNumber": parsed["block"],
-                        "price": Decimal128(Decimal(int(current_price, 16))),
-                        "address": address,
-                    }
-                )
+    documents = list(dumps.read_ds_values(input_file, address))
+    ingest.store_documents(collection, documents)
 
 
 def main():
@@ -1,12 +1,6 @@
 import argparse
-import json
-from decimal import Decimal
 
-from bson import Decimal128
-
-from smart_open import open as smart_open
-
-from backd.db import db
+from backd import dumps, ingest
 
 
 parser = argparse.ArgumentParser(prog="store-int-result")
@@ -18,26 +12,8 @@ parser.add_argument("-f", "--field", required=True, help="field to store int res
 
 
 def import_int_values(input_file, collection, field):
-    collection = db[collection]
-
-    current_value = None
-    with smart_open(input_file) as f:
-        for line in f:
-            parsed = json.loads(line)
-            value = parsed.get("result", parsed.get(field))
-            if not value:
-                raise ValueError(f"invalid format, {field} not found")
-            block = parsed.get("block", parsed.get("blockNumber"))
-            if not block:
-                raise ValueError("invalid format, block number not found")
-            if value != current_value:
-                current_value = value
-                collection.insert_one(
-                    {
-                        "blockNumber": block,
-                        field: Decimal128(Decimal(current_value)),
-                    }
-                )
+    documents = list(dumps.read_int_values(input_file, field))
+    ingest.store_documents(collection, documents)
 
 
 def main():
@@ -20,7 +20,8 @@ setup(
             "jupyter",
             "pytest",
             "web3",
-        ]
+        ],
+        "parquet": ["pyarrow"],
     },
     entry_points={
         "console_scripts": ["backd=backd.cli:run"],
@@ -1,5 +1,7 @@
 from os import path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import json
+import threading
 from decimal import Decimal as D
 
 import pytest
@@ -105,9 +107,70 @@ class DummyInterestRateModel(JumpRateModel):
 
 @Oracle.register("0xab23")
 class DummyOracle(Oracle):
-    pass
+    def get_underlying_price(self, ctoken: str) -> int:
+        return self.get_price(ctoken)
 
 
 @Oracle.register("0xabab54")
 class DummyUniswapOracle(UniswapAnchorView):
     pass
+
+
+class StandInNode(ThreadingHTTPServer):
+    """Local stand-in for the JSON-RPC server of an Ethereum node
+
+    ``eth_call`` returns the block number plus the last byte of the called
+    address, reverts when calling ``REVERTING_ADDRESS`` and the first
+    ``failures`` requests are answered with an HTTP error
+    """
+
+    REVERTING_ADDRESS = "0x" + "ee" * 20
+
+    def __init__(self, failures: int = 0):
+        super().__init__(("127.0.0.1", 0), StandInNodeHandler)
+        self.failures = failures
+        self.requests = []
+
+    @property
+    def url(self) -> str:
+        return "http://{0}:{1}".format(*self.server_address)
+
+    def handle_call(self, request: dict) -> dict:
+        response = {"jsonrpc": "2.0", "id": request["id"]}
+        call, block = request["params"]
+        if call["to"] == self.REVERTING_ADDRESS:
+            response["error"] = {"code": -32000, "message": "execution reverted"}
+        else:
+            value = int(block, 16) + int(call["data"][-2:], 16)
+            response["result"] = "0x" + hex(value)[2:].rjust(64, "0")
+        return response
+
+
+class StandInNodeHandler(BaseHTTPRequestHandler):
+    def do_POST(self):  # pylint: disable=invalid-name
+        length = int(self.headers["Content-Length"])
+        requests = json.loads(self.rfile.read(length))
+        self.server.requests.append(requests)
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            self.send_error(503)
+            return
+        body = json.dumps([self.server.handle_call(r) for r in requests]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def stand_in_node():
+    server = StandInNode()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,77 @@
+import pytest
+
+from backd import analytics
+
+
+MINER_ROW = {
+    "_id": "0xminer",
+    "blocks": 3,
+    "liquidations": 6,
+    "liquidators": [
+        {"liquidator": "0xb", "liquidations": 1},
+        {"liquidator": "0xa", "liquidations": 4},
+        {"liquidator": "0xc", "liquidations": 1},
+    ],
+}
+
+
+def test_liquidations_pipeline():
+    pipeline = analytics.liquidations_pipeline("liquidator")
+    assert pipeline[0] == {"$match": {"event": "LiquidateBorrow"}}
+    assert pipeline[1]["$group"]["_id"] == {"$toLower": "$returnValues.liquidator"}
+    assert not any("$lookup" in stage for stage in pipeline)
+
+    pipeline = analytics.liquidations_pipeline("day")
+    stages = [next(iter(stage)) for stage in pipeline]
+    assert stages == ["$match", "$group", "$lookup", "$unwind", "$group", "$sort"]
+    assert "$dateToString" in pipeline[4]["$group"]["_id"]
+
+    with pytest.raises(ValueError):
+        analytics.liquidations_pipeline("transaction")
+
+
+def test_volume_pipeline():
+    pipeline = analytics.volume_pipeline(["Mint", "Borrow"], "month")
+    assert pipeline[0] == {"$match": {"event": {"$in": ["Mint", "Borrow"]}}}
+    branches = pipeline[1]["$group"]["amount"]["$sum"]["$toDecimal"]["$switch"]
+    assert [b["then"] for b in branches["branches"]] == [
+        "$returnValues.borrowAmount",
+        "$returnValues.mintAmount",
+    ]
+
+    with pytest.raises(ValueError):
+        analytics.volume_pipeline(["Transfer"])
+
+
+def test_liquidator_miner_pipeline():
+    pipeline = analytics.liquidator_miner_pipeline(top=10)
+    assert pipeline[-1] == {"$limit": 10}
+    assert pipeline[-2] == {"$sort": {"blocks": -1, "_id": 1}}
+
+
+def test_flatten():
+    assert analytics.flatten({"_id": "0xa", "count": 2}) == {"key": "0xa", "count": 2}
+    row = {"_id": {"period": "2020-01-01", "market": "0xa"}, "count": 2}
+    assert analytics.flatten(row) == {
+        "period": "2020-01-01",
+        "market": "0xa",
+        "count": 2,
+    }
+
+
+def test_liquidator_miner_rows():
+    rows = list(analytics.liquidator_miner_rows([MINER_ROW], n=2))
+    assert [(r["liquidator"], r["liquidations"]) for r in rows] == [
+        ("0xa", 4),
+        ("0xb", 1),
+    ]
+    assert rows[0]["miner_blocks"] == 3
+
+
+def test_format_latex():
+    lines = list(analytics.format_latex([MINER_ROW], n=2))
+    assert len(lines) == 3
+    assert lines[0].startswith(r"\multirow{2}{*}{\contractaddr{0xminer}} & ")
+    assert lines[0].endswith(r"\contractaddr{0xa} &   4\\")
+    assert lines[1].strip().startswith(r"&       & \contractaddr{0xb}")
+    assert lines[2] == r"\hline"
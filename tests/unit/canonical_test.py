@@ -0,0 +1,92 @@
+import pytest
+
+from backd import canonical, normalizer
+from backd.entities import event_position
+
+from tests.fixtures import get_event
+
+
+def test_encode_int():
+    for value in [0, 1, -1, 2 ** 63 - 1, -(2 ** 63), 10 ** 30, -(10 ** 30), 2 ** 255]:
+        encoded = canonical.encode_int(value)
+        if isinstance(encoded, bytes):
+            assert abs(value) >= 2 ** 63 - 1
+            encoded = canonical.decode_int(encoded)
+        assert encoded == value
+
+
+def test_encode_value():
+    assert canonical.encode_value("0xA12b3C") == "0xa12b3c"
+    assert canonical.encode_value("123") == 123
+    assert canonical.encode_value("-5") == -5
+    assert canonical.encode_value("ETH") == "ETH"
+    assert canonical.encode_value(True) is True
+    assert canonical.encode_value(["0xAB", "10"]) == ["0xab", 10]
+    big = canonical.encode_value(str(10 ** 30))
+    assert canonical.decode_value(big) == 10 ** 30
+
+
+def test_unpack_position(compound_redeem_event):
+    position = event_position(compound_redeem_event)
+    assert canonical.unpack_position(position) == (10590848, 114, 110)
+    assert canonical.unpack_position(
+        event_position({"blockNumber": 5, "transactionIndex": -10, "logIndex": -1})
+    ) == (5, -10, -1)
+
+
+def test_block_range_condition():
+    assert canonical.block_range_condition() == {}
+    condition = canonical.block_range_condition(2, 3)["_id"]
+    position = event_position(
+        {"blockNumber": 3, "transactionIndex": 300, "logIndex": 400}
+    )
+    assert condition["$gte"] <= position < condition["$lt"]
+
+
+def test_event_types():
+    event_types = canonical.EventTypes(["Mint"])
+    assert event_types.get_code("Mint") == 0
+    assert event_types.get_code("Redeem") == 1
+    assert event_types.get_name(1) == "Redeem"
+
+
+def test_encode_decode_event(compound_redeem_event, compound_dummy_events):
+    event_types = canonical.EventTypes()
+    document = canonical.encode_event(compound_redeem_event, event_types)
+    assert set(document) == {"_id", "e", "a", "v", "h"}
+    assert "0" not in document["v"]
+    assert document["v"]["redeemAmount"] == 10 ** 18
+
+    event = canonical.decode_event(document, event_types)
+    assert normalizer.normalize_event(event) is event
+    assert event["event"] == "Redeem"
+    assert event["address"] == compound_redeem_event["address"].lower()
+    assert event["transactionHash"] == compound_redeem_event["transactionHash"]
+    assert event["returnValues"] == {
+        "redeemer": "0x00000000001876eb1444c986fd502e618c587430",
+        "redeemAmount": 10 ** 18,
+        "redeemTokens": 4862880740,
+    }
+
+    new_comptroller_event = get_event(compound_dummy_events, "NewComptroller")
+    document = canonical.encode_event(new_comptroller_event, event_types)
+    assert "h" not in document
+    event = canonical.decode_event(document, event_types)
+    assert event["returnValues"]["newComptroller"] == "0xc2a1"
+    assert event["logIndex"] == new_comptroller_event["logIndex"]
+
+
+def test_encode_events(compound_redeem_event):
+    event_types = canonical.EventTypes()
+    second_event = {**compound_redeem_event, "logIndex": 111}
+    events = [compound_redeem_event, {"blockNumber": 1}, second_event]
+    documents = list(canonical.encode_events(events, event_types))
+    assert len(documents) == 2
+
+    with pytest.raises(ValueError):
+        list(canonical.encode_events([second_event, second_event], event_types))
+
+    # NOTE: would collide with another position if packed without check
+    overflowing_event = {**compound_redeem_event, "logIndex": 2 ** 16}
+    with pytest.raises(ValueError):
+        list(canonical.encode_events([overflowing_event], event_types))
@@ -0,0 +1,63 @@
+from backd.catalog import ALL_KEY, BUCKET_SIZE, CollectionStats
+
+
+def make_stats(compound_dummy_events):
+    stats = CollectionStats("events")
+    for event in compound_dummy_events:
+        stats.add(event)
+    return stats
+
+
+def test_collection_stats_add(compound_dummy_events):
+    stats = make_stats(compound_dummy_events)
+    assert stats.count == len(compound_dummy_events)
+    assert stats.min_block == min(e["blockNumber"] for e in compound_dummy_events)
+    assert stats.max_block == max(e["blockNumber"] for e in compound_dummy_events)
+    assert sum(stats.buckets[0].values()) == len(compound_dummy_events)
+    accrue_interest = [
+        e for e in compound_dummy_events if e["event"] == "AccrueInterest"
+    ]
+    assert set(stats.last_blocks["AccrueInterest"]) == {
+        e["address"].lower() for e in accrue_interest
+    }
+
+    rows = CollectionStats("blocks")
+    rows.add({"blockNumber": 5, "timestamp": 10})
+    assert rows.buckets == {0: {ALL_KEY: 1}}
+    assert not rows.last_blocks
+
+
+def test_count_between():
+    stats = CollectionStats("events")
+    for block in [1, 2, BUCKET_SIZE + 1, 2 * BUCKET_SIZE + 3]:
+        stats.add({"event": "Mint", "address": "0xa", "blockNumber": block})
+    stats.add({"event": "Borrow", "address": "0xa", "blockNumber": 3})
+
+    assert stats.count_between() == 5
+    assert stats.count_between(events={"Mint"}) == 4
+
+    ranges = []
+
+    def count_range(first, last):
+        ranges.append((first, last))
+        return 1
+
+    assert stats.count_between(2, BUCKET_SIZE + 5, count_range=count_range) == 2
+    assert ranges == [(2, BUCKET_SIZE - 1), (BUCKET_SIZE, BUCKET_SIZE + 5)]
+    assert stats.count_between(BUCKET_SIZE, 2 * BUCKET_SIZE - 1) == 1
+
+
+def test_document_roundtrip(compound_dummy_events):
+    stats = make_stats(compound_dummy_events)
+    stats.version = 3
+    document = stats.to_document()
+    assert all(isinstance(key, str) for key in document["buckets"])
+    assert CollectionStats.from_document(document) == stats
+
+
+def test_is_current(compound_dummy_events):
+    stats = make_stats(compound_dummy_events)
+    assert stats.is_current(stats.max_block, stats.count)
+    # e.g. events inserted without going through the catalog
+    assert not stats.is_current(stats.max_block + 1, stats.count + 1)
+    assert not stats.is_current(stats.max_block, stats.count + 1)
@@ -0,0 +1,62 @@
+import tempfile
+from decimal import Decimal
+
+import pytest
+from bson import Decimal128
+
+from backd import columnar
+
+
+@pytest.fixture
+def temp_dir():
+    directory = tempfile.TemporaryDirectory(prefix="backd-")
+    yield directory.name
+    directory.cleanup()
+
+
+@pytest.fixture
+def documents():
+    return [
+        {"blockNumber": 5, "price": Decimal128(Decimal("1.5")), "symbol": "ETH"},
+        {"blockNumber": 9, "price": Decimal128(Decimal("2")), "symbol": "ETH"},
+        {"blockNumber": 10, "price": Decimal128(Decimal("3")), "extra": {"a": [1]}},
+        {"blockNumber": 25, "price": Decimal128(Decimal("4")), "symbol": "ETH"},
+    ]
+
+
+def test_partition_filename():
+    filename = columnar.partition_filename(200, 100)
+    assert filename == "0000000200-0000000299.parquet"
+    assert columnar.parse_partition_filename(filename) == (200, 299)
+
+
+def test_write_collection(temp_dir, documents):
+    assert columnar.write_collection(documents, temp_dir, partition_size=10) == 4
+    partitions = columnar.list_partitions(temp_dir)
+    assert [(start, end) for start, end, _ in partitions] == [
+        (0, 9),
+        (10, 19),
+        (20, 29),
+    ]
+    assert len(columnar.list_partitions(temp_dir, min_block=10, max_block=19)) == 1
+
+    with pytest.raises(ValueError):
+        columnar.write_collection(documents[::-1], temp_dir, partition_size=10)
+
+
+def test_read_collection(temp_dir, documents):
+    columnar.write_collection(documents, temp_dir, partition_size=10)
+    assert list(columnar.read_collection(temp_dir)) == documents
+    assert list(columnar.read_collection(temp_dir, min_block=9, max_block=10)) == (
+        documents[1:3]
+    )
+    rows = columnar.read_collection(temp_dir, filters=[("symbol", "==", "ETH")])
+    assert [row["blockNumber"] for row in rows] == [5, 9, 25]
+
+
+def test_count_collection(temp_dir, documents):
+    columnar.write_collection(documents, temp_dir, partition_size=10)
+    assert columnar.count_collection(temp_dir) == 4
+    assert columnar.count_collection(temp_dir, min_block=9) == 3
+    assert columnar.count_collection(temp_dir, max_block=20) == 3
+    assert columnar.count_collection(temp_dir, min_block=11, max_block=20) == 0
@@ -3,3 +3,11 @@ from backd import db
 
 def test_count_events():
     assert db.count_events() == len(list(db.iterate_events()))
+
+
+def test_make_projection():
+    assert db.make_projection(["event", "address"]) == {
+        "event": True,
+        "address": True,
+        "_id": False,
+    }
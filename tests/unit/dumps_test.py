@@ -0,0 +1,106 @@
+import gzip
+import json
+from decimal import Decimal
+
+from backd import dumps
+from backd.timestamps import BlockTimestamps
+
+
+def write_json_lines(filepath, rows):
+    with gzip.open(filepath, "wt") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+
+def test_read_events(tmp_path, compound_dummy_events):
+    filepath = str(tmp_path / "events.jsonl.gz")
+    rows = [{**e, "raw": {"data": "0x"}} for e in compound_dummy_events]
+    write_json_lines(filepath, rows)
+    assert list(dumps.read_events(filepath)) == compound_dummy_events
+
+
+def test_read_int_values(tmp_path):
+    filepath = str(tmp_path / "chi-values.jsonl.gz")
+    rows = [
+        {"block": 10, "result": "100"},
+        {"block": 11, "result": "100"},
+        {"block": 12, "result": "105"},
+    ]
+    write_json_lines(filepath, rows)
+    values = list(dumps.read_int_values(filepath, "chi"))
+    assert [v["blockNumber"] for v in values] == [10, 12]
+    assert values[1]["chi"].to_decimal() == Decimal(105)
+
+
+def test_read_ds_values(tmp_path):
+    filepath = str(tmp_path / "medianizer.jsonl.gz")
+    rows = [
+        {"block": 10, "result": ["0x10", True]},
+        {"block": 11, "result": ["0x10", True]},
+        {"block": 12, "result": ["0x10", False]},
+    ]
+    write_json_lines(filepath, rows)
+    values = list(dumps.read_ds_values(filepath, "0xABC"))
+    assert [v["blockNumber"] for v in values] == [10, 12]
+    assert [int(v["price"].to_decimal()) for v in values] == [16, 0]
+    assert values[0]["address"] == "0xABC"
+
+
+def test_read_block_timestamps(tmp_path):
+    filepath = str(tmp_path / "blocks.csv.gz")
+    with gzip.open(filepath, "wt") as f:
+        f.write("blockNumber,timestamp\n11,1015\n10,1000\n")
+    block_timestamps = dumps.read_block_timestamps(filepath)
+    assert block_timestamps.blocks.tolist() == [10, 11]
+    assert block_timestamps.timestamp_of(11) == 1015
+
+
+def test_read_and_align_prices(tmp_path):
+    filepath = str(tmp_path / "ethusdt.csv")
+    with open(filepath, "w") as f:
+        f.write("symbol,close,close_time\n")
+        f.write("ETHUSDT,200.5,1970-01-01 00:16:50+00\n")
+        f.write("ETHUSDT,199.5,1970-01-01 00:16:40+00\n")
+        f.write("ETHUSDT,201.5,1970-01-01 00:16:55+00\n")
+        f.write("ETHUSDT,300,1970-01-01 01:00:00+00\n")
+    prices = dumps.read_prices(filepath)
+    assert [p["price"].to_decimal() for p in prices] == [
+        Decimal("199.5"),
+        Decimal("200.5"),
+        Decimal("201.5"),
+        Decimal("300"),
+    ]
+
+    block_timestamps = BlockTimestamps.from_rows(
+        [{"blockNumber": 10, "timestamp": 1000}, {"blockNumber": 11, "timestamp": 1015}]
+    )
+    aligned = dumps.align_prices(prices, block_timestamps)
+    assert [p["blockNumber"] for p in aligned] == [10, 11]
+    assert aligned[1]["price"].to_decimal() == Decimal("201.5")
+
+
+def test_in_block_range():
+    rows = [{"blockNumber": block} for block in [1, 2, 3, 4]]
+    selected = dumps.in_block_range(rows, min_block=2, max_block=3)
+    assert [row["blockNumber"] for row in selected] == [2, 3]
+
+
+def test_read_last_blocks(tmp_path, compound_dummy_events):
+    events_path = tmp_path / dumps.EVENTS_DIRECTORY
+    events_path.mkdir()
+    filepath = str(events_path / "events.jsonl.gz")
+    write_json_lines(filepath, compound_dummy_events)
+    expected = dumps.compute_last_blocks([filepath])
+    assert dumps.read_last_blocks(str(tmp_path)) == expected
+
+    # cached until the events change
+    cache_path = tmp_path / dumps.LAST_BLOCKS_FILE
+    cached = json.loads(cache_path.read_text())
+    cached["last_blocks"] = {"Mint": {"0xabc": 1}}
+    cache_path.write_text(json.dumps(cached))
+    assert dumps.read_last_blocks(str(tmp_path)) == {"Mint": {"0xabc": 1}}
+
+    write_json_lines(filepath, compound_dummy_events[:-1])
+    assert dumps.read_last_blocks(str(tmp_path)) == dumps.compute_last_blocks(
+        [filepath]
+    )
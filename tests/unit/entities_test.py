@@ -1,3 +1,4 @@
+import pickle
 from decimal import Decimal
 
 import pytest
@@ -10,7 +11,10 @@ from backd.entities import (
     Oracle,
     Oracles,
     PointInTime,
+    State,
     UserBalances,
+    UserTable,
+    event_position,
 )
 
 
@@ -27,11 +31,88 @@ def test_point_in_time_order():
     assert PointInTime(1, 2, 1) < PointInTime(1, 2, 3)
 
 
+def test_event_position():
+    def make_event(block, transaction_index, log_index):
+        return {
+            "blockNumber": block,
+            "transactionIndex": transaction_index,
+            "logIndex": log_index,
+        }
+
+    events = [
+        make_event(1, 2, 3),
+        make_event(2, -1000, -1000),
+        make_event(2, -10, -10),
+        make_event(2, -1, -2),
+        make_event(2, -1, -1),
+        make_event(2, 0, 0),
+        make_event(2, 0, 1),
+        make_event(10_000_000, 200, 300),
+    ]
+    positions = [event_position(event) for event in events]
+    assert positions == sorted(positions)
+    assert len(set(positions)) == len(positions)
+
+    assert event_position(make_event(1, 32767, -32768)) > 0
+    for transaction_index, log_index in [(32768, 0), (0, 32768), (-32769, 0)]:
+        with pytest.raises(ValueError):
+            event_position(make_event(1, transaction_index, log_index))
+
+
 def test_user_borrowed_at():
     user = MarketUser(balances=UserBalances(total_borrowed=100))
     assert user.borrowed_at(11 * 10 ** 17) == 110
 
 
+def test_user_table_views():
+    users = UserTable()
+    user = users["0xabc"]
+    assert user.balances.token_balance == 0
+    assert user.borrow_index == 10 ** 18
+    assert not user.entered
+    assert user.borrowed_at(10 ** 18) == 0
+    assert len(users) == 0 and "0xabc" not in users
+
+    user.balances.total_borrowed = 100
+    user.entered = True
+    assert len(users) == 1 and "0xabc" in users
+    row = users.find_row("0xabc")
+    assert users.total_borrowed[row] == 100
+    assert users.entered[row]
+    assert users["0xabc"].borrowed_at(11 * 10 ** 17) == 110
+    assert list(users) == ["0xabc"]
+
+
+def test_markets_share_accounts(markets: Markets):
+    market = Market("0xABC123")
+    market.users["0xuser"].balances.token_balance = 5
+    markets[0].users["0xother"].balances.token_balance = 1
+    markets.add_market(market)
+    assert market.users.accounts is markets.accounts
+    assert market.users["0xuser"].balances.token_balance == 5
+    assert len(markets.accounts) == 2
+
+    state = State("dummy", markets=markets)
+    assert state.compute_unique_users() == {"0xuser", "0xother"}
+
+    unpickled = pickle.loads(pickle.dumps(markets))
+    assert unpickled[3].users.accounts is unpickled.accounts
+    assert unpickled[3].users["0xuser"].balances.token_balance == 5
+
+
+def test_market_unpickle_users():
+    # states pickled before UserTable stored a dict of MarketUser
+    market = Market("0xa234")
+    state = dict(market.__dict__)
+    state["users"] = {"0xuser": MarketUser(UserBalances(10, 20), entered=True)}
+    restored = Market.__new__(Market)
+    restored.__setstate__(state)
+    user = restored.users["0xuser"]
+    assert user.balances.total_borrowed == 10
+    assert user.balances.token_balance == 20
+    assert user.entered
+
+
 def test_markets_find_market_by_address(markets: Markets):
     market = markets.find_by_address("0xA234")
     assert market == markets[0]
@@ -51,6 +132,14 @@ def test_markets_add_market(markets: Markets):
     with pytest.raises(ValueError):
         markets.add_market(new_market)
     assert len(markets) == 4
+    assert markets.find_by_address("0xabc123") is new_market
+
+
+def test_markets_pickle(markets: Markets):
+    unpickled = pickle.loads(pickle.dumps(markets))
+    assert unpickled == markets
+    unpickled.add_market(Market("0xABC123"))
+    assert unpickled.find_by_address("0xABC123").address == "0xabc123"
 
 
 def test_market_underlying_exchange_rate():
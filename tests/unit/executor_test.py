@@ -1,13 +1,39 @@
-from decimal import Decimal
+import copy
+import pickle
 from unittest.mock import patch
 
+import pytest
+
 from backd import executor
+from backd.hook import Hook
+from backd.protocols.compound.hooks import AccountHistory
+from backd.relevance import EventInterest
+from backd.sources.memory import MemoryEventSource
 
 from tests.fixtures import DUMMY_MARKETS_META
 
 
 MAIN_MARKET = "0x1A3B"
 
+CUSTOM_EVENT = {
+    "event": "CustomEvent",
+    "address": "0xC2A1",
+    "returnValues": {},
+    "blockNumber": 123,
+    "transactionIndex": 9,
+    "logIndex": 0,
+}
+
+
+@Hook.register("custom-event-recorder")
+class CustomEventRecorder(Hook):
+    def __init__(self):
+        self.blocks = []
+
+    def event_start(self, state, event):
+        if event["event"] == "CustomEvent":
+            self.blocks.append(event["blockNumber"])
+
 
 @patch("backd.protocols.compound.constants.MARKETS", DUMMY_MARKETS_META)
 def test_process_all_events():
@@ -15,4 +41,99 @@ def test_process_all_events():
     market = state.markets.find_by_address(MAIN_MARKET)
     liquidator_user_balance = market.users["0xab31"].balances
     assert liquidator_user_balance.token_balance == 55
-    assert market.collateral_factor == Decimal("0.4")
+    assert market.collateral_factor == 4 * 10 ** 17
+
+
+@patch("backd.protocols.compound.constants.MARKETS", DUMMY_MARKETS_META)
+def test_process_all_events_from_memory(compound_dummy_events, dsr_rates):
+    source = MemoryEventSource({"events": compound_dummy_events, "dsr": dsr_rates})
+    state = executor.process_all_events(
+        "compound", min_block=120, max_block=125, source=source
+    )
+    market = state.markets.find_by_address(MAIN_MARKET)
+    liquidator_user_balance = market.users["0xab31"].balances
+    assert liquidator_user_balance.token_balance == 55
+    assert market.collateral_factor == 4 * 10 ** 17
+
+
+@patch("backd.protocols.compound.constants.MARKETS", DUMMY_MARKETS_META)
+def test_process_all_events_keeps_source_rows(compound_dummy_events, dsr_rates):
+    source = MemoryEventSource({"events": compound_dummy_events, "dsr": dsr_rates})
+    events = copy.deepcopy(source.collections["events"])
+    executor.process_all_events("compound", max_block=125, source=source)
+    assert source.collections["events"] == events
+
+
+@patch("backd.protocols.compound.constants.MARKETS", DUMMY_MARKETS_META)
+def test_process_account_events(compound_dummy_events, dsr_rates):
+    new_oracle = {
+        "event": "NewPriceOracle",
+        "address": "0xC2A1",
+        "returnValues": {"newPriceOracle": "0xAB23"},
+        "blockNumber": 122,
+        "transactionIndex": 1,
+        "logIndex": 0,
+    }
+    events = [new_oracle] + compound_dummy_events
+    source = MemoryEventSource({"events": events, "dsr": dsr_rates})
+    hook = AccountHistory("0xAB31")
+    state = executor.process_account_events(
+        "compound", "0xAB31", hooks=[hook], max_block=125, source=source
+    )
+    market = state.markets.find_by_address(MAIN_MARKET)
+    assert market.users["0xab31"].balances.token_balance == 55
+    assert "0x1234a" not in market.users
+    assert [row["block"] for row in state.extra[hook.extra_key]] == [123, 124]
+
+    with pytest.raises(ValueError):
+        executor.process_account_events("compound", "0xdead", source=source)
+
+
+@patch("backd.protocols.compound.constants.MARKETS", DUMMY_MARKETS_META)
+def test_process_all_events_hook_events(compound_dummy_events, dsr_rates):
+    events = compound_dummy_events + [CUSTOM_EVENT]
+    source = MemoryEventSource({"events": events, "dsr": dsr_rates})
+
+    # the processor does not handle the event, hooks still receive it by default
+    hook = CustomEventRecorder()
+    executor.process_all_events("compound", hooks=[hook], max_block=125, source=source)
+    assert hook.blocks == [123]
+
+    hook = CustomEventRecorder()
+    executor.process_all_events(
+        "compound", hooks=[hook], max_block=125, relevant_only=True, source=source
+    )
+    assert hook.blocks == []
+
+    hook = CustomEventRecorder()
+    hook.interests = [EventInterest(events=["CustomEvent"])]
+    executor.process_all_events(
+        "compound", hooks=[hook], max_block=125, relevant_only=True, source=source
+    )
+    assert hook.blocks == [123]
+
+
+@patch("backd.protocols.compound.constants.MARKETS", DUMMY_MARKETS_META)
+def test_resume_with_hooks(compound_dummy_events, dsr_rates):
+    source = MemoryEventSource({"events": compound_dummy_events, "dsr": dsr_rates})
+    full_state = executor.process_all_events(
+        "compound", hooks=["borrowers"], max_block=124, source=source
+    )
+
+    state = executor.process_all_events(
+        "compound", hooks=["borrowers"], max_block=123, source=source
+    )
+    # NOTE: resumed from a pickle as with --resume
+    state = pickle.loads(pickle.dumps(state))
+    state = executor.process_all_events(
+        "compound",
+        hooks=["borrowers"],
+        max_block=124,
+        state=state,
+        resume_token=executor.get_resume_token(state),
+        source=source,
+    )
+    expected = full_state.extra["borrowers"]
+    assert state.extra["borrowers"].historical_count == expected.historical_count
+    assert state.extra["borrowers"].current_users == expected.current_users
+    assert list(expected.historical_count) == [122, 123, 124]
@@ -1,4 +1,4 @@
-from backd.entities import PointInTime, State
+from backd.entities import Market, PointInTime, State
 from backd.hook import Hook, Hooks, parse_hook
 
 
@@ -8,7 +8,7 @@ class DummyHook(Hook):
         self.num = 0
 
     def block_start(self, state: State, block_number: int):
-        state.markets.add_market(f"0x1234{self.num}")
+        state.markets.add_market(Market(f"0x1234{self.num}"))
         self.num += 1
 
 
@@ -22,6 +22,11 @@ class WithDependenciesHook(Hook):
         return ["dummy"]
 
 
+@Hook.register("with-fields")
+class WithFieldsHook(Hook):
+    required_fields = ["transactionHash", "blockHash"]
+
+
 @Hook.register("with-single-arg")
 class WithSingleArgHook(Hook):
     def __init__(self, num: int):
@@ -58,6 +63,12 @@ def test_hook_dependencies():
     assert len(hooks.hooks_info) == 2
 
 
+def test_hooks_required_fields():
+    assert Hooks(hooks=["dummy"]).required_fields == []
+    hooks = Hooks(hooks=["dummy", "with-fields", WithFieldsHook()])
+    assert hooks.required_fields == ["transactionHash", "blockHash"]
+
+
 def test_parse_hook():
     with_no_arg = parse_hook("dummy")
     assert isinstance(with_no_arg, DummyHook)
@@ -0,0 +1,87 @@
+from backd import indexes
+
+FETCH_IXSCAN = {
+    "stage": "FETCH",
+    "inputStage": {
+        "stage": "IXSCAN",
+        "indexName": "blockNumber_1",
+        "indexBounds": {"blockNumber": ["[10000000, 10100000]"]},
+    },
+}
+
+FULL_IXSCAN = {
+    "stage": "FETCH",
+    "inputStage": {
+        "stage": "IXSCAN",
+        "indexName": "blockNumber_1",
+        "indexBounds": {"blockNumber": ["[MinKey, MaxKey]"]},
+    },
+}
+
+
+def make_query():
+    return indexes.Query("range", "blocks", {"blockNumber": {"$gte": 1}})
+
+
+def test_index_names_unique():
+    names = [
+        (index.collection, index.to_model().document["name"])
+        for index in indexes.INDEXES
+    ]
+    assert len(names) == len(set(names))
+
+
+def test_index_to_model():
+    index = indexes.get_index("event_address_ci")
+    document = index.to_model(background=False).document
+    assert document["collation"] == {"locale": "en", "strength": 2}
+    assert document["background"] is False
+    assert indexes.get_index("borrower_block_ci") is not None
+
+
+def test_analyze_plan_index_scan():
+    explanation = {"queryPlanner": {"winningPlan": FETCH_IXSCAN}}
+    plan = indexes.analyze_plan(make_query(), explanation)
+    assert plan.stages == ["FETCH", "IXSCAN"]
+    assert plan.indexes == ["blockNumber_1"]
+    assert not plan.scans_collection
+
+
+def test_analyze_plan_collection_scan():
+    explanation = {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}
+    assert indexes.analyze_plan(make_query(), explanation).scans_collection
+
+    explanation = {"queryPlanner": {"winningPlan": FULL_IXSCAN}}
+    plan = indexes.analyze_plan(make_query(), explanation)
+    assert plan.unbounded_indexes == ["blockNumber_1"]
+    assert plan.scans_collection
+
+
+def test_analyze_plan_aggregate():
+    explanation = {
+        "stages": [
+            {"$cursor": {"queryPlanner": {"winningPlan": {"queryPlan": FETCH_IXSCAN}}}},
+            {"$group": {}},
+        ]
+    }
+    plan = indexes.analyze_plan(make_query(), explanation)
+    assert plan.indexes == ["blockNumber_1"]
+
+    explanation = {
+        "queryPlanner": {
+            "winningPlan": {
+                "stage": "OR",
+                "inputStages": [FETCH_IXSCAN, {"stage": "COLLSCAN"}],
+            }
+        }
+    }
+    assert indexes.analyze_plan(make_query(), explanation).scans_collection
+
+
+def test_builtin_queries():
+    queries = indexes.builtin_queries("compound")
+    names = [query.name for query in queries]
+    assert len(names) == len(set(names))
+    assert "relevant-events" in names
+    relevant = next(q for q in queries if q.name == "relevant-events")
+    assert relevant.collation == {"locale": "en", "strength": 2}
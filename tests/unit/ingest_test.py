@@ -0,0 +1,69 @@
+import gzip
+import json
+import os
+
+from backd import ingest
+
+
+def write_dump(filepath, documents):
+    with gzip.open(filepath, "wt") as f:
+        for document in documents:
+            f.write(json.dumps(document) + "\n")
+
+
+def test_list_files(tmp_path):
+    (tmp_path / "nested").mkdir()
+    write_dump(tmp_path / "b.jsonl.gz", [])
+    write_dump(tmp_path / "nested" / "a.jsonl.gz", [])
+    (tmp_path / "notes.txt").write_text("ignored")
+    files = ingest.list_files([str(tmp_path)])
+    assert files == sorted(
+        [str(tmp_path / "b.jsonl.gz"), str(tmp_path / "nested" / "a.jsonl.gz")]
+    )
+
+
+def test_is_loaded(tmp_path):
+    filepath = str(tmp_path / "events.jsonl.gz")
+    write_dump(filepath, [{"blockNumber": 1}])
+    assert not ingest.is_loaded({}, filepath)
+    watermarks = {filepath: ingest.get_file_signature(filepath)}
+    assert ingest.is_loaded(watermarks, filepath)
+
+    write_dump(filepath, [{"blockNumber": 1}, {"blockNumber": 2}])
+    os.utime(filepath, (0, 0))
+    assert not ingest.is_loaded(watermarks, filepath)
+
+
+def test_index_watermarks(tmp_path):
+    filepath = str(tmp_path / "events.jsonl.gz")
+    write_dump(filepath, [{"blockNumber": 1}])
+    signature = ingest.get_file_signature(filepath)
+    documents = [
+        {
+            "_id": ingest.watermark_id("events", filepath),
+            "path": filepath,
+            "collection": "events",
+            **signature,
+        },
+        # written before watermarks were keyed by collection
+        {"_id": "/old/prices.jsonl.gz", "collection": "prices", **signature},
+    ]
+    watermarks = ingest.index_watermarks(documents, "events")
+    assert ingest.is_loaded(watermarks, filepath)
+    # the same file is not loaded in another collection yet
+    assert not ingest.is_loaded(ingest.index_watermarks(documents, "blocks"), filepath)
+    assert list(ingest.index_watermarks(documents, "prices")) == [
+        "/old/prices.jsonl.gz"
+    ]
+
+
+def test_chunk():
+    assert list(ingest.chunk(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(ingest.chunk([], 2)) == []
+
+
+def test_read_documents(tmp_path):
+    filepath = str(tmp_path / "events.jsonl.gz")
+    documents = [{"blockNumber": 1, "event": "Mint"}, {"blockNumber": 2}]
+    write_dump(filepath, documents)
+    assert list(ingest.read_documents(filepath)) == documents
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from backd.json_rpc import BatchClient, JSONRPCError, TransportError
+
+
+def make_call(address, block):
+    return ("eth_call", [{"to": address, "data": "0x01"}, hex(block)])
+
+
+def test_call_many(stand_in_node):
+    calls = [make_call("0x" + "11" * 20, block) for block in range(10)]
+    calls.append(make_call(stand_in_node.REVERTING_ADDRESS, 10))
+    with BatchClient(stand_in_node.url, batch_size=4, concurrency=2) as client:
+        results = asyncio.run(client.call_many(calls))
+    assert [int(r, 16) for r in results[:10]] == [block + 1 for block in range(10)]
+    assert isinstance(results[10], JSONRPCError)
+    assert results[10].code == -32000
+    assert sorted(len(batch) for batch in stand_in_node.requests) == [3, 4, 4]
+
+
+def test_call_batch_retries(stand_in_node):
+    stand_in_node.failures = 2
+    with BatchClient(stand_in_node.url, retries=2, backoff=0.01) as client:
+        results = asyncio.run(client.call_batch([make_call("0x" + "11" * 20, 1)]))
+    assert int(results[0], 16) == 2
+    assert len(stand_in_node.requests) == 3
+
+    stand_in_node.failures = 2
+    with BatchClient(stand_in_node.url, retries=1, backoff=0.01) as client:
+        with pytest.raises(TransportError):
+            asyncio.run(client.call_batch([make_call("0x" + "11" * 20, 1)]))
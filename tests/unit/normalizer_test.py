@@ -1,3 +1,6 @@
+import bson
+from bson.raw_bson import RawBSONDocument
+
 from backd import normalizer
 
 from tests.fixtures import get_event
@@ -20,3 +23,39 @@ def test_normalize_event(compound_dummy_events):
     normalized_event = normalizer.normalize_event(new_comptroller_event)
     assert normalized_event["address"] == "0x1a3b"
     assert normalized_event["returnValues"]["newComptroller"] == "0xc2a1"
+
+
+def test_normalize_event_in_place(compound_dummy_events):
+    new_comptroller_event = dict(get_event(compound_dummy_events, "NewComptroller"))
+    new_comptroller_event["returnValues"] = dict(new_comptroller_event["returnValues"])
+    normalized_event = normalizer.normalize_event(new_comptroller_event, in_place=True)
+    assert normalized_event is new_comptroller_event
+    assert normalized_event["address"] == "0x1a3b"
+    assert normalized_event["returnValues"]["newComptroller"] == "0xc2a1"
+
+
+def test_normalize_raw_event(compound_dummy_events):
+    new_comptroller_event = get_event(compound_dummy_events, "NewComptroller")
+    raw_event = RawBSONDocument(bson.encode(new_comptroller_event))
+    for in_place in [False, True]:
+        normalized_event = normalizer.normalize_event(raw_event, in_place=in_place)
+        assert isinstance(normalized_event, normalizer.LazyNormalizedEvent)
+        assert normalized_event["address"] == "0x1a3b"
+        assert normalized_event["returnValues"]["newComptroller"] == "0xc2a1"
+        assert normalized_event.get("blockNumber") == raw_event["blockNumber"]
+
+
+def test_lazy_normalized_event_only_reads_accessed_fields():
+    class RecordingDocument(dict):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.accessed = []
+
+        def __getitem__(self, key):
+            self.accessed.append(key)
+            return super().__getitem__(key)
+
+    values = RecordingDocument(a="0xAB", b="0xCD")
+    event = normalizer.LazyNormalizedEvent({"address": "0xEF", "returnValues": values})
+    assert event["returnValues"]["a"] == "0xab"
+    assert values.accessed == ["a"]
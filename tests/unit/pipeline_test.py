@@ -0,0 +1,85 @@
+import pytest
+
+from backd.pipeline import Pipeline, PrefetchingStream
+
+
+def failing_stream():
+    yield 1
+    raise RuntimeError("cursor lost")
+
+
+class RecordingCursor:
+    """Iterates over ``count`` numbers and records whether it was closed"""
+
+    def __init__(self, count: int):
+        self.count = count
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.count == 0:
+            raise StopIteration
+        self.count -= 1
+        return self.count
+
+    def close(self):
+        self.closed = True
+
+
+def test_prefetching_stream():
+    stream = PrefetchingStream(range(1000), name="numbers", depth=2, chunk_size=10)
+    assert list(stream) == list(range(1000))
+    assert stream.stats.name == "numbers"
+    assert stream.stats.items == 1000
+
+    with pytest.raises(ValueError):
+        PrefetchingStream(range(10), depth=0)
+
+
+def test_prefetching_stream_error():
+    with pytest.raises(RuntimeError):
+        list(PrefetchingStream(failing_stream()))
+
+
+def test_prefetching_stream_close():
+    stream = PrefetchingStream(iter(range(10 ** 6)), depth=1, chunk_size=1)
+    iterator = iter(stream)
+    assert next(iterator) == 0
+    iterator.close()
+    stream._thread.join(timeout=1)  # pylint: disable=protected-access
+    assert not stream._thread.is_alive()  # pylint: disable=protected-access
+
+
+def test_prefetching_stream_close_cursor():
+    cursor = RecordingCursor(10 ** 6)
+    stream = PrefetchingStream(cursor, depth=1, chunk_size=1)
+    iterator = iter(stream)
+    next(iterator)
+    iterator.close()
+    assert cursor.closed
+    assert not stream._thread.is_alive()  # pylint: disable=protected-access
+
+    # never iterated
+    cursor = RecordingCursor(10)
+    PrefetchingStream(cursor).close()
+    assert cursor.closed
+
+
+def test_pipeline_stopped_early():
+    cursors = {"odd": RecordingCursor(10 ** 6), "even": RecordingCursor(10 ** 6)}
+    pipeline = Pipeline(cursors, depth=1, chunk_size=4)
+    events = pipeline.merge(key=lambda x: -x)
+    # e.g. a hook raising in the middle of the replay
+    for _ in zip(range(10), events):
+        pass
+    pipeline.close()
+    assert all(cursor.closed for cursor in cursors.values())
+
+
+def test_pipeline():
+    pipeline = Pipeline({"odd": range(1, 100, 2), "even": range(0, 100, 2)}, depth=1)
+    assert list(pipeline.merge(key=lambda x: x)) == list(range(100))
+    assert [stats.name for stats in pipeline.stats] == ["odd", "even"]
+    assert [stats.items for stats in pipeline.stats] == [50, 50]
@@ -1,4 +1,10 @@
-from backd.entities import State
+import weakref
+
+import bson
+from bson.raw_bson import RawBSONDocument
+
+from backd.entities import PointInTime, State
+from backd import event_processor
 from backd.event_processor import Processor
 
 PROTOCOL_NAME = "dummy"
@@ -20,3 +26,63 @@ def test_process_event(markets, compound_redeem_event):
 
     # NOTE: should ignore when "event" is not here
     processor.process_event(state, {})
+
+
+def test_process_raw_event(markets, compound_redeem_event):
+    state = State(PROTOCOL_NAME, markets=markets)
+    processor = DummyProcessor()
+    raw_event = RawBSONDocument(bson.encode(compound_redeem_event))
+    processor.process_event(state, raw_event)
+    assert state.current_event_time.block_number == 10590848
+
+
+def test_process_event_in_place(markets, compound_redeem_event):
+    state = State(PROTOCOL_NAME, markets=markets)
+    processor = DummyProcessor()
+    first_event = {**compound_redeem_event, "returnValues": {}}
+    second_event = {**first_event, "logIndex": first_event["logIndex"] + 1}
+    third_event = {**first_event, "logIndex": first_event["logIndex"] + 2}
+    processor.process_events(
+        state, [first_event, second_event, third_event], in_place=True, gc_interval=1
+    )
+    assert state.last_event_time == PointInTime.from_event(second_event)
+    assert state.current_event_time == PointInTime.from_event(third_event)
+    assert first_event["address"] == compound_redeem_event["address"].lower()
+
+
+class Node:
+    def __init__(self):
+        self.parent = self
+
+
+class CycleProcessor(Processor):
+    """Keeps a reference cycle alive for a few blocks, long enough to be
+    promoted to the oldest generation, and checks it is freed later on
+    """
+
+    def __init__(self, last_block: int):
+        super().__init__()
+        self.last_block = last_block
+        self.node = None
+        self.node_ref = None
+        self.freed = None
+
+    def _process_event(self, state, event):
+        if event["blockNumber"] == 1:
+            self.node = Node()
+            self.node_ref = weakref.ref(self.node)
+        elif event["blockNumber"] == 5:
+            self.node = None
+        elif event["blockNumber"] == self.last_block:
+            self.freed = self.node_ref() is None
+
+
+def test_process_events_collects_old_cycles(compound_redeem_event):
+    last_block = 3 * event_processor.FULL_GC_RATIO
+    events = [
+        {**compound_redeem_event, "blockNumber": block}
+        for block in range(1, last_block + 1)
+    ]
+    processor = CycleProcessor(last_block)
+    processor.process_events(State(PROTOCOL_NAME), events, gc_interval=1)
+    assert processor.freed
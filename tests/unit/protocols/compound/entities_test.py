@@ -1,6 +1,13 @@
 import pytest
 
-from backd.protocols.compound.entities import InterestRateModels, CDaiMarket
+import pickle
+
+from backd.entities import Balances, Market
+from backd.protocols.compound.entities import (
+    CDaiMarket,
+    CompoundState,
+    InterestRateModels,
+)
 from backd.protocols.compound.interest_rate_models import InterestRateModel
 
 
@@ -21,3 +28,27 @@ def test_cdai_market():
     market.chi = 1002666559238981208366586326
     market.transfer_in(5076897499772332484176298)
     assert market.current_pie == 5076897499772332484176297
+
+
+def test_derived_values_cache(dsr):
+    market = Market("0xa234", balances=Balances(token_balance=10, total_underlying=20))
+    state = CompoundState(dsr=dsr)
+    state.markets.add_market(market)
+    state.oracles.current_address = "0xab23"
+    oracle = state.oracles.get_oracle("0xab23")
+    oracle.update_price("0xa234", 10 ** 18)
+    assert market.underlying_exchange_rate == 2 * 10 ** 18
+    assert state.ctoken_to_usd(10 ** 18, market) == 2 * 10 ** 18
+
+    # cached until the market or the oracles are touched
+    market.balances.total_underlying = 40
+    oracle.update_price("0xa234", 2 * 10 ** 18)
+    assert state.get_underlying_price(market) == 10 ** 18
+    assert market.underlying_exchange_rate == 2 * 10 ** 18
+    state.oracles.touch()
+    assert state.get_underlying_price("0xA234") == 2 * 10 ** 18
+    market.touch()
+    assert market.underlying_exchange_rate == 4 * 10 ** 18
+    assert state.ctoken_to_usd(10 ** 18, market) == 8 * 10 ** 18
+
+    assert "_derived_values" not in pickle.loads(pickle.dumps(state)).__dict__
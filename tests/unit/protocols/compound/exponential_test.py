@@ -0,0 +1,33 @@
+from decimal import Decimal
+
+from backd.protocols.compound import exponential
+
+
+def test_to_mantissa():
+    assert exponential.to_mantissa("0.75") == 75 * 10 ** 16
+    assert exponential.to_mantissa(Decimal("1")) == 10 ** 18
+    assert exponential.to_decimal(5 * 10 ** 17) == Decimal("0.5")
+
+
+def test_mul_exp():
+    half = 5 * 10 ** 17
+    assert exponential.mul_exp(half, half) == 25 * 10 ** 16
+    # rounded half up, as Exponential.mulExp
+    assert exponential.mul_exp(1, half) == 1
+    assert exponential.mul_exp(1, half - 1) == 0
+    assert exponential.mul_exp3(half, half, 4 * 10 ** 18) == 10 ** 18
+
+
+def test_mul_scalar_truncate():
+    assert exponential.mul_scalar_truncate(10 ** 17, 19) == 1
+    assert exponential.mul_scalar_truncate_add(10 ** 17, 19, 5) == 6
+    assert exponential.truncate(exponential.get_exp(2, 3)) == 0
+    assert exponential.get_exp(2, 3) == 666666666666666666
+
+
+def test_exact_large_values():
+    # values too large for the 28 digits of the default decimal context
+    exchange_rate = 206394940016530694621454013
+    price = 1003140000000000000000000000000
+    expected = (exchange_rate * price + 5 * 10 ** 17) // 10 ** 18
+    assert exponential.mul_exp(exchange_rate, price) == expected
@@ -1,3 +1,4 @@
+import pickle
 from unittest.mock import patch
 
 from backd.entities import Market, Markets
@@ -133,6 +134,19 @@ def test_uniswap_anchor_view():
     )
 
 
+def test_oracle_resolvers():
+    oracle = oracles.PriceOracleV14(Markets())
+    assert set(oracle.resolvers) == set(oracles.MARKETS_BY_CTOKEN)
+    eth_address = ctoken_address("ETH")
+    assert oracle.get_underlying_price(eth_address.upper(), usd_price=False) == int(
+        1e18
+    )
+
+    unpickled = pickle.loads(pickle.dumps(oracle))
+    assert unpickled.resolvers[eth_address]() == 10 ** 18
+    assert unpickled.get_underlying_price("0x01234") == 0
+
+
 def ctoken_address(symbol: str) -> str:
     return find_market(symbol)["address"]
 
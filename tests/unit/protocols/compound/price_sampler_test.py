@@ -0,0 +1,51 @@
+import json
+
+from backd.json_rpc import BatchClient, JSONRPCError
+from backd.protocols.compound import price_sampler
+
+
+ORACLE = "0x" + "11" * 20
+CTOKENS = ["0x" + "00" * 19 + "01", "0x" + "00" * 19 + "02"]
+
+
+def test_encode_get_underlying_price():
+    data = price_sampler.encode_get_underlying_price("0x" + "AB" * 20)
+    assert data == "0xfc57d4df" + "0" * 24 + "ab" * 20
+
+
+def test_decode_uint():
+    assert price_sampler.decode_uint("0x" + "0" * 62 + "10") == 16
+    assert price_sampler.decode_uint("0x") is None
+    assert price_sampler.decode_uint(JSONRPCError(-32000, "reverted")) is None
+
+
+def test_sample_blocks():
+    blocks = price_sampler.sample_blocks(100, 200, 10, seed=1)
+    assert blocks == sorted(blocks)
+    assert blocks == price_sampler.sample_blocks(100, 200, 10, seed=1)
+    assert all(100 <= block <= 200 for block in blocks)
+
+
+def test_run_sampling(stand_in_node, tmp_path):
+    output = str(tmp_path / "prices.jsonl")
+    oracles = [ORACLE, stand_in_node.REVERTING_ADDRESS]
+    with BatchClient(stand_in_node.url, batch_size=3) as client:
+        count = price_sampler.run_sampling(
+            client, [30, 10], oracles, CTOKENS, output, window=1
+        )
+        assert count == 2
+        with open(output) as f:
+            rows = [json.loads(line) for line in f]
+        assert [row["block"] for row in rows] == [10, 30]
+        assert rows[0]["prices"] == [
+            {"address": ORACLE, "asset": CTOKENS[0], "price": 11},
+            {"address": ORACLE, "asset": CTOKENS[1], "price": 12},
+        ]
+
+        requests_count = len(stand_in_node.requests)
+        count = price_sampler.run_sampling(
+            client, [10, 30, 40], oracles, CTOKENS, output
+        )
+        assert count == 1
+        assert len(stand_in_node.requests) == requests_count + 2
+    assert price_sampler.read_sampled_blocks(output) == {10, 30, 40}
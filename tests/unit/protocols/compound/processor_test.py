@@ -1,9 +1,8 @@
 # pylint: disable=redefined-outer-name
 
-from decimal import Decimal
-
 import pytest
 
+from backd import relevance
 from backd.entities import PointInTime
 from backd.protocols.compound import constants
 from backd.protocols.compound.entities import CompoundState as State
@@ -13,6 +12,7 @@ from tests.fixtures import (
     BORROW_MARKET,
     MAIN_MARKET,
     MAIN_ORACLE,
+    MAIN_TOKEN,
     MAIN_USER,
     get_event,
     get_events_until,
@@ -35,13 +35,13 @@ def test_new_comptroller(processor: CompoundProcessor, dsr, compound_dummy_event
     assert len(state.markets) == 0
     processor.process_event(state, new_comptroller_event)
     assert state.current_event_time == PointInTime(123, 9, 1)
-    assert state.close_factor == Decimal("0")
+    assert state.close_factor == 0
     assert len(state.markets) == 1
     market = state.markets.find_by_address(MAIN_MARKET)
     assert market.comptroller_address == "0xc2a1"
     assert not market.listed
-    assert market.reserve_factor == Decimal("0")
-    assert market.collateral_factor == Decimal("0")
+    assert market.reserve_factor == 0
+    assert market.collateral_factor == 0
 
 
 def test_new_interest_rate_model(
@@ -72,14 +72,14 @@ def test_new_reserve_factor(processor: CompoundProcessor, dsr, compound_dummy_ev
     state = State(dsr=dsr)
     processor.process_events(state, events)
     market = state.markets.find_by_address(MAIN_MARKET)
-    assert market.reserve_factor == Decimal("0.1")
+    assert market.reserve_factor == 10 ** 17
 
 
 def test_new_close_factor(processor: CompoundProcessor, dsr, compound_dummy_events):
     events = get_events_until(compound_dummy_events, "NewCloseFactor")
     state = State(dsr=dsr)
     processor.process_events(state, events)
-    assert state.close_factor == Decimal("0.5")
+    assert state.close_factor == 5 * 10 ** 17
 
 
 def test_new_collateral_factor(
@@ -89,7 +89,7 @@ def test_new_collateral_factor(
     state = State(dsr=dsr)
     processor.process_events(state, events)
     market = state.markets.find_by_address(MAIN_MARKET)
-    assert market.collateral_factor == Decimal("0.4")
+    assert market.collateral_factor == 4 * 10 ** 17
 
 
 def test_market_listed(processor: CompoundProcessor, dsr, compound_dummy_events):
@@ -121,8 +121,10 @@ def test_market_exited(processor: CompoundProcessor, dsr, compound_dummy_events)
 def test_mint(processor: CompoundProcessor, state: State, compound_dummy_events):
     mint_event = get_event(compound_dummy_events, "Mint")
     transfer_event = get_event(compound_dummy_events, "Transfer", index=1)
-    processor.process_events(state, [mint_event, transfer_event])
     market = state.markets.find_by_address(MAIN_MARKET)
+    version = market.version
+    processor.process_events(state, [mint_event, transfer_event])
+    assert market.version > version
     assert market.balances.total_underlying == 100
     assert market.balances.token_balance == 110
     assert market.balances.total_borrowed == 0
@@ -154,7 +156,7 @@ def test_accrue_interest(
     processor: CompoundProcessor, state: State, compound_dummy_events
 ):
     market = state.markets.find_by_address(BORROW_MARKET)
-    market.reserve_factor = Decimal("0.1")
+    market.reserve_factor = 10 ** 17
     accrue_interest_event = get_event(compound_dummy_events, "AccrueInterest")
     processor.process_event(state, accrue_interest_event)
     market = state.markets.find_by_address(BORROW_MARKET)
@@ -342,3 +344,72 @@ def test_process_all(processor: CompoundProcessor, state: State, compound_dummy_
 
     liquidator_user_balance = collateral_market.users["0xab31"].balances
     assert liquidator_user_balance.token_balance == 55
+
+
+def test_dispatch_table(processor: CompoundProcessor, state: State):
+    assert processor.handlers["SaiPriceSet"] == processor.process_sai_price_set
+    assert set(processor.handlers) == processor.handled_events()
+
+    unknown_event = {
+        "event": "UnknownEvent",
+        "address": MAIN_MARKET,
+        "returnValues": {},
+        "blockNumber": 1,
+        "transactionIndex": 0,
+        "logIndex": 0,
+    }
+    processor.process_event(state, unknown_event)
+    assert processor.handlers["UnknownEvent"] is None
+    assert "UnknownEvent" not in processor.handler_calls
+
+
+def test_handler_calls(
+    processor: CompoundProcessor, state: State, compound_dummy_events
+):
+    processor.process_events(state, compound_dummy_events)
+    assert processor.handler_calls["NewComptroller"] == sum(
+        e["event"] == "NewComptroller" for e in compound_dummy_events
+    )
+
+
+def test_get_interests(processor: CompoundProcessor, compound_dummy_events):
+    interests = processor.get_interests()
+    assert all(relevance.matches(interests, e) for e in compound_dummy_events)
+
+    user_transfer = {
+        "event": "Transfer",
+        "address": MAIN_TOKEN,
+        "returnValues": {"from": MAIN_USER, "to": "0xabcd", "amount": "10"},
+    }
+    assert not relevance.matches(interests, user_transfer)
+    assert not relevance.matches(interests, {**user_transfer, "event": "Approval"})
+
+    interests = processor.get_interests(markets=[MAIN_MARKET.lower()])
+    main_transfer = get_event(compound_dummy_events, "Transfer", index=1)
+    assert relevance.matches(interests, main_transfer)
+    borrow_transfer = get_event(compound_dummy_events, "Transfer", index=2)
+    assert not relevance.matches(interests, borrow_transfer)
+    price_posted = get_event(compound_dummy_events, "PricePosted")
+    assert relevance.matches(interests, price_posted)
+
+
+def test_get_account_interests(processor: CompoundProcessor, compound_dummy_events):
+    account_events = [
+        e
+        for e in compound_dummy_events
+        if relevance.matches(relevance.account_interests("0xab31"), e)
+    ]
+    assert processor.get_account_markets(account_events) == [
+        MAIN_MARKET.lower(),
+        BORROW_MARKET.lower(),
+    ]
+
+    interests = processor.get_account_interests("0xab31", account_events)
+    events = [e for e in compound_dummy_events if relevance.matches(interests, e)]
+    entered = get_event(compound_dummy_events, "MarketEntered")
+    assert entered not in events
+    user_transfer = get_event(compound_dummy_events, "Transfer")
+    assert user_transfer not in events
+    assert get_event(compound_dummy_events, "AccrueInterest") in events
+    assert get_event(compound_dummy_events, "LiquidateBorrow") in events
+    assert get_event(compound_dummy_events, "Transfer", index=7) in events
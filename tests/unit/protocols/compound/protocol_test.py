@@ -1,8 +1,24 @@
+import gzip
+import json
+import os
+import tempfile
+from os import path
+
 import pytest
+from bson import Decimal128
 
+from backd import columnar, dumps, replay_log
 from backd.protocols.compound.entities import CompoundState
 from backd.protocols.compound.processor import CompoundProcessor
-from backd.protocols.compound.protocol import CompoundProtocol
+from backd.protocols.compound.protocol import (
+    CompoundProtocol,
+    DumpCompoundProtocol,
+    ParquetCompoundProtocol,
+    RecordedCompoundProtocol,
+)
+from backd.relevance import EventInterest
+from backd.tokens.dai.dsr import DSR
+from tests.fixtures import MAIN_MARKET
 
 
 @pytest.fixture
@@ -10,6 +26,58 @@ def protocol():
     return CompoundProtocol()
 
 
+@pytest.fixture
+def parquet_protocol(compound_dummy_events, dsr_rates):
+    directory = tempfile.TemporaryDirectory(prefix="backd-")
+    columnar.write_collection(
+        compound_dummy_events, path.join(directory.name, "events")
+    )
+    dsr_rows = [
+        {"blockNumber": row["blockNumber"], "rate": Decimal128(row["rate"])}
+        for row in dsr_rates
+    ]
+    columnar.write_collection(dsr_rows, path.join(directory.name, "dsr"))
+    yield ParquetCompoundProtocol(directory.name)
+    directory.cleanup()
+
+
+@pytest.fixture
+def recorded_protocol(parquet_protocol: ParquetCompoundProtocol):
+    directory = tempfile.TemporaryDirectory(prefix="backd-")
+    replay_log.write_log(
+        parquet_protocol.iterate_events(max_block=125),
+        directory.name,
+        metadata={"dsr_rates": parquet_protocol.fetch_dsr_rates()},
+        frame_size=4,
+    )
+    yield RecordedCompoundProtocol(directory.name)
+    directory.cleanup()
+
+
+@pytest.fixture
+def dumps_protocol(compound_dummy_events):
+    directory = tempfile.TemporaryDirectory(prefix="backd-")
+
+    def write_json_lines(filename, rows):
+        filepath = path.join(directory.name, filename)
+        os.makedirs(path.dirname(filepath), exist_ok=True)
+        with gzip.open(filepath, "wt") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+    # events are split across files whose ranges overlap
+    write_json_lines("events/a.jsonl.gz", compound_dummy_events[::2])
+    write_json_lines("events/b.jsonl.gz", compound_dummy_events[1::2])
+    write_json_lines(dumps.CHI_VALUES_FILE, [{"block": 123, "result": "1000"}])
+    write_json_lines(dumps.DS_VALUES_FILE, [{"block": 122, "result": ["0xa", True]}])
+    with gzip.open(path.join(directory.name, dumps.BLOCKS_FILE), "wt") as f:
+        f.write("blockNumber,timestamp\n122,1000\n123,1015\n124,1030\n")
+    with open(path.join(directory.name, dumps.PRICES_FILE), "w") as f:
+        f.write("symbol,close,close_time\nETHUSDT,200,1970-01-01 00:16:50+00\n")
+    yield DumpCompoundProtocol(directory.name)
+    directory.cleanup()
+
+
 def test_create_processor(protocol: CompoundProtocol):
     assert isinstance(protocol.create_processor(), CompoundProcessor)
 
@@ -52,6 +120,115 @@ def test_iterate_events(protocol: CompoundProtocol, compound_dummy_events):
     )
 
 
+def test_parquet_create_empty_state(parquet_protocol: ParquetCompoundProtocol):
+    state = parquet_protocol.create_empty_state()
+    assert isinstance(state, CompoundState)
+    assert isinstance(state.dsr, DSR)
+
+
+def test_parquet_get_max_block(parquet_protocol: ParquetCompoundProtocol):
+    assert parquet_protocol.get_max_block() == 123
+
+
+def test_parquet_count_events(
+    parquet_protocol: ParquetCompoundProtocol, compound_dummy_events
+):
+    expected = count_events(compound_dummy_events, 0, 125)
+    assert parquet_protocol.count_events(max_block=125) == expected
+
+    expected = count_events(compound_dummy_events, 123, 123)
+    assert parquet_protocol.count_events(min_block=123, max_block=123) == expected
+
+
+def test_parquet_iterate_events(
+    parquet_protocol: ParquetCompoundProtocol, compound_dummy_events
+):
+    events = list(parquet_protocol.iterate_events(max_block=10 ** 18))
+    assert len(events) == len(compound_dummy_events) + 1
+    assert all(
+        get_timestamp(events[i]) <= get_timestamp(events[i + 1])
+        for i in range(len(events) - 1)
+    )
+    assert events[0] == compound_dummy_events[0]
+
+    events = list(parquet_protocol.iterate_events(min_block=124, max_block=125))
+    assert len(events) == count_events(compound_dummy_events, 124, 125)
+
+
+def test_parquet_iterate_relevant_events(
+    parquet_protocol: ParquetCompoundProtocol, compound_dummy_events
+):
+    interests = [EventInterest(events=["Transfer"], addresses=[MAIN_MARKET])]
+    events = list(parquet_protocol.iterate_events(max_block=125, interests=interests))
+    expected = [
+        e
+        for e in compound_dummy_events
+        if e["event"] == "Transfer" and e["address"].lower() == MAIN_MARKET.lower()
+    ]
+    assert [e for e in events if e["event"] == "Transfer"] == expected
+    count = parquet_protocol.count_events(max_block=125, interests=interests)
+    assert count == len(events)
+
+
+def test_parquet_iterate_events_resume(parquet_protocol: ParquetCompoundProtocol):
+    events = list(parquet_protocol.iterate_events(max_block=125))
+    token = get_timestamp(events[10])
+    resumed = parquet_protocol.iterate_events(max_block=125, resume_token=token)
+    assert list(resumed) == events[11:]
+
+
+def test_recorded_create_empty_state(recorded_protocol: RecordedCompoundProtocol):
+    state = recorded_protocol.create_empty_state()
+    assert isinstance(state.dsr, DSR)
+
+
+def test_recorded_iterate_events(
+    recorded_protocol: RecordedCompoundProtocol,
+    parquet_protocol: ParquetCompoundProtocol,
+):
+    expected = list(parquet_protocol.iterate_events(max_block=125))
+    events = list(recorded_protocol.iterate_events())
+    assert [get_timestamp(e) for e in events] == [get_timestamp(e) for e in expected]
+    assert recorded_protocol.count_events() == len(expected)
+    assert recorded_protocol.get_max_block() == expected[-1]["blockNumber"]
+
+    events = list(recorded_protocol.iterate_events(min_block=124, max_block=125))
+    assert len(events) == recorded_protocol.count_events(124, 125)
+    assert len(events) == sum(1 for e in expected if 124 <= e["blockNumber"] <= 125)
+
+
+def test_recorded_iterate_events_resume(recorded_protocol: RecordedCompoundProtocol):
+    events = list(recorded_protocol.iterate_events())
+    token = get_timestamp(events[10])
+    resumed = recorded_protocol.iterate_events(resume_token=token)
+    assert list(resumed) == events[11:]
+
+
+def test_dumps_iterate_events(
+    dumps_protocol: DumpCompoundProtocol, compound_dummy_events
+):
+    assert dumps_protocol.get_max_block() == 123
+    assert dumps_protocol.count_events() is None
+
+    events = list(dumps_protocol.iterate_events(max_block=124))
+    assert all(
+        get_timestamp(events[i]) < get_timestamp(events[i + 1])
+        for i in range(len(events) - 1)
+    )
+    replayed = [e for e in events if e["transactionIndex"] >= 0]
+    assert replayed == compound_dummy_events
+    side_events = {e["event"]: e["blockNumber"] for e in events if e not in replayed}
+    assert side_events == {
+        "ChiUpdated": 123,
+        "InvertedPricePosted": 122,
+        "ExternalPriceUpdated": 123,
+        "TimestampUpdated": 124,
+    }
+
+    events = list(dumps_protocol.iterate_events(min_block=123, max_block=123))
+    assert all(e["blockNumber"] == 123 for e in events)
+
+
 def count_events(compound_dummy_events, min_block, max_block):
     return sum(
         1
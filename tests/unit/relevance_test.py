@@ -0,0 +1,83 @@
+from backd import relevance
+from backd.relevance import EventInterest
+
+from tests.fixtures import get_event
+
+
+def make_event(name, address, **values):
+    return {"event": name, "address": address, "returnValues": values}
+
+
+def test_event_interest_matches():
+    interest = EventInterest(events=["Transfer"], addresses=["0xABC"])
+    assert interest.matches(make_event("Transfer", "0xabc"))
+    assert not interest.matches(make_event("Transfer", "0xdef"))
+    assert not interest.matches(make_event("Mint", "0xabc"))
+
+    interest = EventInterest(excluded_addresses=["0xabc"])
+    assert not interest.matches(make_event("Transfer", "0xABC"))
+    assert interest.matches(make_event("Transfer", "0xdef"))
+
+    interest = EventInterest(arguments={"from": ["0x1"], "to": ["0x1"]})
+    assert interest.matches(make_event("Transfer", "0xabc", to="0x1"))
+    assert not interest.matches(make_event("Transfer", "0xabc", to="0x2"))
+
+    assert EventInterest().is_unrestricted
+
+
+def test_compile():
+    interest = EventInterest(
+        events=["Transfer"],
+        addresses=["0xABC"],
+        excluded_addresses=["0xdef"],
+        arguments={"from": ["0x1"]},
+    )
+    assert interest.compile() == {
+        "event": {"$in": ["Transfer"]},
+        "address": {"$in": ["0xabc"], "$nin": ["0xdef"]},
+        "$or": [{"returnValues.from": {"$in": ["0x1"]}}],
+    }
+    fields = {"event": "e", "address": "a", "returnValues": "v"}
+    assert EventInterest(events=["Mint", "Other"]).compile(
+        fields, event_codes={"Mint": 3}
+    ) == {"e": {"$in": [3]}}
+
+
+def test_compile_filter():
+    assert relevance.compile_filter(None) == {}
+    assert relevance.compile_filter([]) == {}
+    assert relevance.compile_filter([EventInterest(), EventInterest(["Mint"])]) == {}
+    assert relevance.compile_filter([EventInterest(["Mint"])]) == {
+        "event": {"$in": ["Mint"]}
+    }
+    assert relevance.compile_filter(
+        [EventInterest(["Mint"]), EventInterest(["Borrow"])]
+    ) == {"$or": [{"event": {"$in": ["Mint"]}}, {"event": {"$in": ["Borrow"]}}]}
+
+
+def test_matches(compound_dummy_events):
+    event = get_event(compound_dummy_events, "NewComptroller")
+    assert relevance.matches(None, event)
+    assert relevance.matches([EventInterest(["NewComptroller"])], event)
+    assert not relevance.matches([EventInterest(["Mint"])], event)
+
+
+def test_event_names():
+    assert relevance.event_names(None) is None
+    assert relevance.event_names([EventInterest(["Mint"]), EventInterest()]) is None
+    assert relevance.event_names(
+        [EventInterest(["Mint"]), EventInterest(addresses=["0xa"])]
+    ) is None
+    interests = [EventInterest(["Mint"]), EventInterest(["Borrow", "Mint"])]
+    assert relevance.event_names(interests) == {"Mint", "Borrow"}
+
+
+def test_account_interests():
+    interests = relevance.account_interests("0xABC")
+    assert relevance.matches(interests, make_event("Mint", "0x1", minter="0xabc"))
+    assert relevance.matches(interests, make_event("Transfer", "0x1", to="0xabc"))
+    assert not relevance.matches(interests, make_event("Mint", "0x1", minter="0xdef"))
+    assert not relevance.matches(interests, make_event("Redeem", "0x1", minter="0xabc"))
+
+    interests = relevance.account_interests("0xabc", events=["Borrow"])
+    assert interests == [EventInterest(["Borrow"], arguments={"borrower": ["0xabc"]})]
@@ -0,0 +1,70 @@
+import tempfile
+
+import pytest
+
+from backd import replay_log
+from backd.normalizer import NORMALIZED_KEY
+from backd.replay_log import ReplayLog
+
+
+@pytest.fixture
+def log_dir():
+    directory = tempfile.TemporaryDirectory(prefix="backd-")
+    yield directory.name
+    directory.cleanup()
+
+
+def count_between(events, min_block, max_block):
+    return sum(1 for e in events if min_block <= e["blockNumber"] <= max_block)
+
+
+def test_write_log(compound_dummy_events, log_dir):
+    count = replay_log.write_log(
+        compound_dummy_events, log_dir, metadata={"dsr_rates": []}, frame_size=5
+    )
+    assert count == len(compound_dummy_events)
+
+    log = ReplayLog(log_dir)
+    assert log.metadata["count"] == count
+    assert log.metadata["dsr_rates"] == []
+    assert log.metadata["min_block"] == compound_dummy_events[0]["blockNumber"]
+    assert log.metadata["max_block"] == compound_dummy_events[-1]["blockNumber"]
+    # frames never split a block
+    last_blocks = log.index[:-1, replay_log.LAST_BLOCK]
+    first_blocks = log.index[1:, replay_log.FIRST_BLOCK]
+    assert (last_blocks < first_blocks).all()
+
+
+def test_iterate_events(compound_dummy_events, log_dir):
+    replay_log.write_log(compound_dummy_events, log_dir, frame_size=5)
+    log = ReplayLog(log_dir)
+
+    events = list(log.iterate_events())
+    assert len(events) == len(compound_dummy_events)
+    assert all(e[NORMALIZED_KEY] for e in events)
+    assert [e["logIndex"] for e in events] == [
+        e["logIndex"] for e in compound_dummy_events
+    ]
+    assert events[0]["address"] == compound_dummy_events[0]["address"].lower()
+
+    events = list(log.iterate_events(min_block=124, max_block=125))
+    assert len(events) == count_between(compound_dummy_events, 124, 125)
+    assert all(124 <= e["blockNumber"] <= 125 for e in events)
+
+
+def test_count_events(compound_dummy_events, log_dir):
+    replay_log.write_log(compound_dummy_events, log_dir, frame_size=3)
+    log = ReplayLog(log_dir)
+    assert log.count_events() == len(compound_dummy_events)
+    blocks = sorted({e["blockNumber"] for e in compound_dummy_events})
+    for min_block in blocks:
+        for max_block in blocks:
+            expected = count_between(compound_dummy_events, min_block, max_block)
+            assert log.count_events(min_block, max_block) == expected
+
+
+def test_empty_log(log_dir):
+    assert replay_log.write_log([], log_dir) == 0
+    log = ReplayLog(log_dir)
+    assert list(log.iterate_events()) == []
+    assert log.count_events() == 0
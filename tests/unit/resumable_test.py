@@ -0,0 +1,101 @@
+import pytest
+from pymongo.errors import AutoReconnect, CursorNotFound
+
+from backd import resumable
+from backd.resumable import ResumableCursor, make_after_condition
+
+FIELDS = ["blockNumber", "transactionIndex", "logIndex"]
+
+
+def matches(document, condition):
+    for key, value in condition.items():
+        if key == "$or":
+            if not any(matches(document, c) for c in value):
+                return False
+        elif key == "$and":
+            if not all(matches(document, c) for c in value):
+                return False
+        elif isinstance(value, dict):
+            if "$gt" in value and not document[key] > value["$gt"]:
+                return False
+            if "$gte" in value and not document[key] >= value["$gte"]:
+                return False
+        elif document[key] != value:
+            return False
+    return True
+
+
+class FlakyCursor:
+    def __init__(self, documents, error=None, fail_after=None):
+        self.documents = iter(documents)
+        self.error = error
+        self.fail_after = fail_after
+        self.returned = 0
+
+    def next(self):
+        if self.fail_after is not None and self.returned == self.fail_after:
+            raise self.error
+        self.returned += 1
+        return next(self.documents)
+
+    def close(self):
+        pass
+
+
+def make_documents():
+    return [
+        {"blockNumber": b, "transactionIndex": t, "logIndex": l}
+        for b in range(3)
+        for t in range(2)
+        for l in range(2)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def no_delay(monkeypatch):
+    monkeypatch.setattr(resumable, "RETRY_DELAY", 0)
+
+
+def test_make_after_condition():
+    documents = make_documents()
+    token = (1, 0, 1)
+    condition = make_after_condition(FIELDS, token)
+    after = [d for d in documents if matches(d, condition)]
+    assert after == [d for d in documents if tuple(d.values()) > token]
+    assert make_after_condition(["_id"], (5,)) == {"_id": {"$gt": 5}}
+
+
+def test_resumable_cursor():
+    documents = make_documents()
+    errors = [CursorNotFound("lost"), AutoReconnect("blip")]
+    conditions = []
+
+    def make_cursor(condition):
+        conditions.append(condition)
+        rows = [d for d in documents if matches(d, condition)]
+        error = errors.pop(0) if errors else None
+        return FlakyCursor(rows, error, fail_after=3 if error else None)
+
+    cursor = ResumableCursor(make_cursor, {"blockNumber": {"$gte": 0}}, FIELDS)
+    assert list(cursor) == documents
+    assert cursor.reopened == 2
+    assert cursor.resume_token == (2, 1, 1)
+    assert "$and" in conditions[-1]
+
+
+def test_resumable_cursor_token():
+    documents = make_documents()
+
+    def make_cursor(condition):
+        return FlakyCursor([d for d in documents if matches(d, condition)])
+
+    cursor = ResumableCursor(make_cursor, {}, FIELDS, resume_token=(1, 1, 0))
+    assert list(cursor) == documents[7:]
+
+
+def test_resumable_cursor_gives_up():
+    def make_cursor(_condition):
+        return FlakyCursor(make_documents(), CursorNotFound("lost"), fail_after=0)
+
+    with pytest.raises(CursorNotFound):
+        list(ResumableCursor(make_cursor, {}, FIELDS, max_retries=2))
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from backd.series import BlockSeries, SideStreams
+
+
+def make_series(name, rows, transaction_index, integer_values=False):
+    def make_event(block, value):
+        return {
+            "event": name,
+            "value": value,
+            "blockNumber": block,
+            "transactionIndex": transaction_index,
+            "logIndex": transaction_index,
+        }
+
+    return BlockSeries.from_rows(
+        name,
+        rows,
+        lambda row: row["value"],
+        make_event,
+        transaction_index=transaction_index,
+        log_index=transaction_index,
+        integer_values=integer_values,
+    )
+
+
+def make_event(block, transaction_index=0):
+    return {
+        "event": "Main",
+        "blockNumber": block,
+        "transactionIndex": transaction_index,
+    }
+
+
+def get_position(event):
+    return (event["blockNumber"], event["transactionIndex"])
+
+
+def test_block_series():
+    rows = [{"blockNumber": 1, "value": 10}, {"blockNumber": 3, "value": 30}]
+    series = make_series("ints", rows, -1, integer_values=True)
+    assert len(series) == 2
+    assert series.blocks.dtype == np.int64
+    event = series.event_at(1)
+    assert event["blockNumber"] == 3 and isinstance(event["blockNumber"], int)
+    assert event["value"] == 30 and isinstance(event["value"], int)
+
+    assert len(make_series("empty", [], -1, integer_values=True)) == 0
+
+    with pytest.raises(ValueError):
+        BlockSeries("bad", np.array([1, 2]), [1], make_event, -1, -1)
+
+
+def test_side_streams_splice():
+    timestamps = make_series(
+        "timestamps",
+        [{"blockNumber": b, "value": b * 10} for b in range(1, 8)],
+        -1000,
+        integer_values=True,
+    )
+    prices = make_series(
+        "prices", [{"blockNumber": 2, "value": 2}, {"blockNumber": 9, "value": 9}], -10
+    )
+    side = SideStreams([prices, timestamps])
+    assert len(side) == 9
+
+    events = [make_event(2), make_event(2, 1), make_event(5), make_event(8)]
+    spliced = list(side.splice(iter(events)))
+    assert len(spliced) == len(events) + len(side)
+    positions = [get_position(event) for event in spliced]
+    assert positions == sorted(positions)
+    assert [e["event"] for e in spliced[:5]] == [
+        "timestamps",
+        "timestamps",
+        "prices",
+        "Main",
+        "Main",
+    ]
+    assert spliced[-1]["event"] == "prices"
+
+    assert [get_position(e) for e in side] == sorted(get_position(e) for e in side)
+
+
+def test_side_streams_empty():
+    side = SideStreams([])
+    events = [make_event(1), make_event(2)]
+    assert list(side.splice(events)) == events
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+import pytest
+
+from backd.event_source import get_source
+from backd.relevance import EventInterest
+from backd.sources.memory import MemoryEventSource
+
+
+@pytest.fixture
+def source(compound_dummy_events):
+    blocks = [
+        {"blockNumber": 123, "timestamp": 1015},
+        {"blockNumber": 122, "timestamp": 1000},
+    ]
+    dsr = [{"blockNumber": 100, "rate": "1000000000000000000000000000"}]
+    events = list(reversed(compound_dummy_events))
+    return MemoryEventSource({"events": events, "blocks": blocks, "dsr": dsr})
+
+
+def test_get_source(source):
+    assert get_source(source) is source
+    assert isinstance(get_source("memory"), MemoryEventSource)
+
+
+def test_fetch_rows(source, compound_dummy_events):
+    assert list(source.fetch_rows("events")) == compound_dummy_events
+    rows = list(source.fetch_rows("events", min_block=123, max_block=123))
+    assert rows == [e for e in compound_dummy_events if e["blockNumber"] == 123]
+    assert source.count_rows("events", 123, 123) == len(rows)
+    assert list(source.fetch_rows("prices")) == []
+
+
+def test_fetch_rows_interests_and_resume(source, compound_dummy_events):
+    interests = [EventInterest(events=["Transfer"])]
+    rows = list(source.fetch_rows("events", interests=interests))
+    assert rows == [e for e in compound_dummy_events if e["event"] == "Transfer"]
+
+    first = compound_dummy_events[10]
+    token = (first["blockNumber"], first["transactionIndex"], first["logIndex"])
+    rows = list(source.fetch_rows("events", resume_token=token))
+    assert rows == compound_dummy_events[11:]
+
+
+def test_fetch_dsr_rates(source):
+    rates = source.fetch_dsr_rates()
+    assert rates == [{"blockNumber": 100, "rate": Decimal(10) ** 27}]
+
+
+def test_get_last_blocks(source, compound_dummy_events):
+    last_blocks = source.get_last_blocks("AccrueInterest")
+    expected = {
+        e["address"].lower(): e["blockNumber"]
+        for e in compound_dummy_events
+        if e["event"] == "AccrueInterest"
+    }
+    assert last_blocks == expected
+
+
+def test_get_block_timestamps(source):
+    block_timestamps = source.get_block_timestamps()
+    assert block_timestamps.blocks.tolist() == [122, 123]
+    assert block_timestamps.timestamp_of(123) == 1015
@@ -0,0 +1,32 @@
+from unittest.mock import MagicMock, patch
+
+from backd import catalog
+from backd.catalog import CollectionStats
+from backd.sources.mongo import MongoEventSource
+
+
+def make_stats():
+    stats = CollectionStats("events")
+    for block in [1, 2, 3]:
+        stats.add({"event": "Mint", "address": "0xa", "blockNumber": block})
+    return stats
+
+
+def count_rows(max_block, count):
+    database = MagicMock()
+    database.db["events"].estimated_document_count.return_value = count
+    source = MongoEventSource()
+    with patch.object(catalog, "db", database), patch.object(
+        catalog, "load", return_value=make_stats()
+    ), patch.object(catalog, "find_max_block", return_value=max_block), patch.object(
+        source, "count_rows_in_db", return_value=42
+    ) as count_rows_in_db:
+        return source.count_rows("events"), count_rows_in_db.called
+
+
+def test_count_rows_uses_current_catalog():
+    assert count_rows(max_block=3, count=3) == (3, False)
+
+
+def test_count_rows_ignores_stale_catalog():
+    assert count_rows(max_block=4, count=4) == (42, True)
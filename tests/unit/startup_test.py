@@ -0,0 +1,61 @@
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ["pandas", "matplotlib", "pyarrow", "smart_open", "pymongo", "numpy"]
+
+CHECK_IMPORTS = f"""
+import json, sys
+import backd.cli
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+from backd import db
+print(json.dumps({{"loaded": loaded, "client": db._client is not None}}))
+"""
+
+CHECK_PROTOCOLS = """
+import backd.cli
+from backd.protocol import Protocol
+print(" ".join(Protocol.registered()))
+"""
+
+CHECK_LAZY_ENTITIES = """
+import backd.cli
+from backd.event_source import EventSource
+from backd.hook import Hook
+from backd.protocol import Protocol
+print(Protocol.get("compound-dumps").registered_name)
+print(EventSource.get("memory").registered_name)
+print(Hook.get("account-history").registered_name)
+"""
+
+
+def test_cli_startup_is_lazy():
+    output = subprocess.run(
+        [sys.executable, "-c", CHECK_IMPORTS],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    result = json.loads(output)
+    assert result["loaded"] == []
+    assert not result["client"]
+
+
+def test_protocols_registered():
+    output = subprocess.run(
+        [sys.executable, "-c", CHECK_PROTOCOLS],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert "compound" in output.split()
+
+
+def test_lazy_entities_resolved():
+    output = subprocess.run(
+        [sys.executable, "-c", CHECK_LAZY_ENTITIES],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert output.split() == ["compound-dumps", "memory", "account-history"]
@@ -0,0 +1,70 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from backd import timestamps
+from backd.timestamps import NO_BLOCK, BlockTimestamps
+
+
+@pytest.fixture
+def block_timestamps():
+    rows = [
+        {"blockNumber": 12, "timestamp": "1030"},
+        {"blockNumber": 10, "timestamp": 1000},
+        {"blockNumber": 11, "timestamp": 1015},
+        {"blockNumber": 14, "timestamp": 1060},
+    ]
+    return BlockTimestamps.from_rows(rows)
+
+
+def test_from_rows(block_timestamps):
+    assert block_timestamps.blocks.tolist() == [10, 11, 12, 14]
+    assert block_timestamps.timestamps.tolist() == [1000, 1015, 1030, 1060]
+
+
+def test_contains(block_timestamps):
+    assert 11 in block_timestamps
+    assert 13 not in block_timestamps
+    mask = block_timestamps.contains([9, 10, 13, 14, 15])
+    assert mask.tolist() == [False, True, False, True, False]
+
+
+def test_timestamps_of(block_timestamps):
+    assert block_timestamps.timestamps_of([14, 10]).tolist() == [1060, 1000]
+    assert block_timestamps.timestamp_of(12) == 1030
+    with pytest.raises(KeyError):
+        block_timestamps.timestamps_of([10, 13])
+
+
+def test_to_datetime_index(block_timestamps):
+    index = block_timestamps.to_datetime_index(np.array([10, 11]))
+    assert index[0] == dt.datetime.fromtimestamp(1000, dt.timezone.utc)
+    assert index[1] == dt.datetime.fromtimestamp(1015, dt.timezone.utc)
+    assert block_timestamps.datetime_of(10) == index[0]
+
+
+def test_blocks_at(block_timestamps):
+    blocks = block_timestamps.blocks_at([900, 1000, 1001, 1059, 1060, 1061])
+    assert blocks.tolist() == [10, 10, 11, 14, 14, NO_BLOCK]
+    assert block_timestamps.block_at(1016) == 12
+
+
+def test_save_load(block_timestamps, tmp_path):
+    block_timestamps.save(str(tmp_path), version=3)
+    loaded = BlockTimestamps.load(str(tmp_path))
+    assert isinstance(loaded.blocks, np.memmap)
+    assert loaded.blocks.tolist() == block_timestamps.blocks.tolist()
+    assert loaded.timestamp_of(14) == 1060
+
+
+def test_is_up_to_date(block_timestamps):
+    metadata = block_timestamps.describe()
+    assert metadata == {"version": None, "count": 4, "max_block": 14}
+    assert timestamps.is_up_to_date(metadata, None, 14, 4)
+    # blocks added without updating the catalog
+    assert not timestamps.is_up_to_date(metadata, None, 15, 5)
+
+    metadata = block_timestamps.describe(version=3)
+    assert timestamps.is_up_to_date(metadata, 3, None, None)
+    assert not timestamps.is_up_to_date(metadata, 4, 14, 4)
@@ -18,3 +18,15 @@ from backd.tokens.dai.dsr import DSR, DSR_DIVISOR
 def test_dsr_get(dummy_dsr_rates, block_number, expected):
     dsr = DSR(dummy_dsr_rates)
     assert dsr.get(block_number) == expected
+
+
+def test_dsr_get_many(dummy_dsr_rates):
+    dsr = DSR(dummy_dsr_rates)
+    rates = dsr.get_many([99, 104, 105, 112])
+    assert rates.tolist() == [dsr.get(b) for b in [99, 104, 105, 112]]
+
+
+def test_dsr_old_pickle(dummy_dsr_rates):
+    dsr = DSR.__new__(DSR)
+    dsr.__setstate__({"dsr_rates": dummy_dsr_rates})
+    assert dsr.get(106) == D("1.1") * DSR_DIVISOR
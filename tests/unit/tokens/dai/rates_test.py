@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+from bson import Decimal128
+
+from backd.sources.memory import MemoryEventSource
+from backd.tokens.dai import rates, utils
+from backd.tokens.dai.rates import RAY, RateIndex
+
+
+def make_source(dummy_dsr_rates):
+    source = MemoryEventSource()
+    source.fetch_dsr_rates = lambda: dummy_dsr_rates
+    return source
+
+
+def test_rate_index_get():
+    index = RateIndex.from_rows(
+        [{"blockNumber": 20, "rate": "3"}, {"blockNumber": 10, "rate": 2}]
+    )
+    assert index.blocks == [10, 20]
+    assert [index.get(b) for b in [5, 10, 19, 20, 25]] == [2, 2, 2, 3, 3]
+    assert index.get_many([5, 10, 19, 20, 25]).tolist() == [2, 2, 2, 3, 3]
+    assert rates.to_int(Decimal128(str(RAY))) == RAY
+
+
+def test_rate_index_large_rates():
+    index = RateIndex([1], [RAY * 10 ** 10 + 1])
+    assert index.get_many([1])[0] == RAY * 10 ** 10 + 1
+
+
+def test_shared_indexes(dummy_dsr_rates):
+    source = make_source(dummy_dsr_rates)
+    index = rates.get_dsr_index(source)
+    assert rates.get_dsr_index(source) is index
+    assert index.get(106) == Decimal("1.1") * RAY
+    rates.clear()
+    assert rates.get_dsr_index(source) is not index
+
+
+def test_compute_apys():
+    dsrs = [RAY, 1000000001547125957863212448, 1000000003022265980097387650]
+    apys = utils.compute_apys(dsrs)
+    for dsr, apy in zip(dsrs, apys):
+        assert abs(float(utils.compute_apy(dsr)) - apy) < 1e-12
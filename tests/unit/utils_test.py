@@ -1,3 +1,5 @@
+import gc
+
 from backd import utils
 
 
@@ -7,3 +9,18 @@ def test_merge_sorted_streams():
 
     result = list(utils.merge_sorted_streams(["lb", "fbc", "ibcd"], ["z", "obcde", "nbcdef"], key=len))
     assert result == ["z", "lb", "fbc", "ibcd", "obcde", "nbcdef"]
+
+
+def test_merge_sorted_streams_ties():
+    first = [{"k": 1, "s": "a"}, {"k": 2, "s": "a"}]
+    second = [{"k": 1, "s": "b"}, {"k": 3, "s": "b"}]
+    result = utils.merge_sorted_streams(first, second, [], key=lambda x: x["k"])
+    result = [(v["k"], v["s"]) for v in result]
+    assert result == [(1, "a"), (1, "b"), (2, "a"), (3, "b")]
+
+
+def test_deferred_gc():
+    assert gc.isenabled()
+    with utils.deferred_gc():
+        assert not gc.isenabled()
+    assert gc.isenabled()